@@ -1,10 +1,18 @@
 from flask_admin import Admin, AdminIndexView
 from flask_admin.contrib.sqla import ModelView
+from flask_admin.contrib.sqla.ajax import QueryAjaxModelLoader
 from flask import redirect, url_for, request, abort
 from flask_admin.form import Select2Field
 from flask_login import current_user
+from sqlalchemy import or_
+from sqlalchemy.orm import undefer, joinedload
+from busca import condicao_nome
 from models import *
 
+# Itens por página dos selects AJAX (o Select2 pede mais ao rolar)
+AJAX_POR_PAGINA = 20
+AJAX_MAXIMO = 50
+
 
 #Configurando acessibilidade da página admin e models
 class AdminIndex(AdminIndexView):
@@ -45,36 +53,124 @@ class AdminModelView(ModelView):
     def inaccessible_callback(self, name, **kwargs):
         return redirect(url_for('login', next=request.url))
 
+    # Relacionamentos usados pelos column_formatters, carregados na mesma
+    # query da listagem (evita uma query por célula)
+    column_joinedload = ()
+
+    def get_query(self):
+        query = super().get_query()
+        if self.column_joinedload:
+            query = query.options(*(joinedload(relacao) for relacao in self.column_joinedload))
+        return query
+
+class CarregadorAjax(QueryAjaxModelLoader):
+    """Select2 remoto: busca no servidor, páginas em ordem estável e rótulo legível.
+
+    Usado nos campos que apontam para tabelas grandes (atletas, usuários,
+    imagens, equipes, cidades), para o formulário não carregar a tabela toda.
+    """
+
+    def __init__(self, name, model, rotulo, ordem, condicao=None, **options):
+        options.setdefault("page_size", AJAX_POR_PAGINA)
+        super().__init__(name, db.session, model, **options)
+        self.rotulo = rotulo
+        self.ordem = ordem
+        self.condicao = condicao
+
+    def format(self, model):
+        if not model:
+            return None
+        return getattr(model, self.pk), self.rotulo(model)
+
+    def get_list(self, term, offset=0, limit=AJAX_POR_PAGINA):
+        query = self.get_query()
+
+        termo = (term or "").strip()
+        if termo:
+            if self.condicao:
+                query = query.filter(self.condicao(termo))
+            else:
+                query = query.filter(or_(*(campo.icontains(termo, autoescape=True) for campo in self._cached_fields)))
+
+        limite = min(max(limit or AJAX_POR_PAGINA, 1), AJAX_MAXIMO)
+        return (
+            query.order_by(*self.ordem, getattr(self.model, self.pk))
+            .offset(max(offset or 0, 0))
+            .limit(limite)
+            .all()
+        )
+
+def nome_completo(primeiro, ultimo):
+    return f"{primeiro} {ultimo}" if ultimo else primeiro
+
+def ajax_atleta(nome):
+    return CarregadorAjax(
+        nome, Atleta,
+        rotulo=lambda a: nome_completo(a.firstname_atleta, a.lastname_atleta),
+        ordem=(Atleta.firstname_atleta, Atleta.lastname_atleta),
+        condicao=lambda termo: condicao_nome("atleta", termo),
+        fields=["firstname_atleta", "lastname_atleta"],
+        placeholder="Buscar atleta...",
+    )
+
+def ajax_equipe(nome):
+    return CarregadorAjax(
+        nome, Equipe,
+        rotulo=lambda e: e.nome_equipe,
+        ordem=(Equipe.nome_equipe,),
+        condicao=lambda termo: condicao_nome("equipe", termo),
+        fields=["nome_equipe"],
+        placeholder="Buscar equipe...",
+    )
+
+def ajax_usuario(nome):
+    return CarregadorAjax(
+        nome, Usuario,
+        rotulo=lambda u: f"{u.firstname_usuario} {u.lastname_usuario}",
+        ordem=(Usuario.firstname_usuario, Usuario.lastname_usuario),
+        fields=["firstname_usuario", "lastname_usuario", "email"],
+        placeholder="Buscar usuário...",
+    )
+
+def ajax_imagem(nome):
+    return CarregadorAjax(
+        nome, Imagem,
+        rotulo=lambda i: i.name or f"Imagem {i.id}",
+        ordem=(Imagem.name,),
+        fields=["name"],
+        placeholder="Buscar imagem...",
+    )
+
+def ajax_cidade(nome):
+    return CarregadorAjax(
+        nome, Cidade,
+        rotulo=lambda c: c.nome_cidade,
+        ordem=(Cidade.nome_cidade,),
+        fields=["nome_cidade"],
+        placeholder="Buscar cidade...",
+    )
+
 class ProjetoAdmin(AdminModelView):
     # Colunas que aparecem no formulário
     form_columns = [
         "nome_projeto",
         "descricao",
         "is_active",
-        "cidade_id",
-        "responsavel_id",
-        "logo_id",
+        "cidade",
+        "responsavel",
+        "logo",
     ]
 
-    # Campos do formulário com Select2Field
-    form_extra_fields = {
-        "cidade_id": Select2Field(
-            "Cidade",
-            coerce=int,
-            choices=lambda: [(c.id, c.nome_cidade) for c in Cidade.query.order_by(Cidade.nome_cidade).all()]
-        ),
-        "responsavel_id": Select2Field(
-            "Responsável",
-            coerce=int,
-            choices=lambda: [(u.id, f"{u.firstname_usuario} {u.lastname_usuario}") for u in Usuario.query.all()]
-        ),
-        "logo_id": Select2Field(
-            "Logo (Imagem)",
-            coerce=int,
-            allow_blank=True,
-            blank_text="Sem logo",
-            choices=lambda: [(i.id, i.name or f"Imagem {i.id}") for i in Imagem.query.all()]
-        ),
+    # Selects AJAX (busca no servidor)
+    form_ajax_refs = {
+        "cidade": ajax_cidade("cidade"),
+        "responsavel": ajax_usuario("responsavel"),
+        "logo": ajax_imagem("logo"),
+    }
+
+    form_args = {
+        "responsavel": {"label": "Responsável"},
+        "logo": {"label": "Logo (Imagem)"},
     }
 
     # Colunas que aparecem na lista
@@ -89,10 +185,16 @@ class ProjetoAdmin(AdminModelView):
         "last_edited",
     ]
 
+    column_joinedload = (Projeto.cidade, Projeto.responsavel)
+
+    # descricao é deferred no model, mas aparece na listagem
+    def get_query(self):
+        return super().get_query().options(undefer(Projeto.descricao))
+
     # Formatadores para mostrar os nomes legíveis
     column_formatters = {
-        "cidade_id": lambda v, c, m, p: Cidade.query.get(m.cidade_id).nome_cidade if m.cidade_id else "",
-        "responsavel_id": lambda v, c, m, p: f"{Usuario.query.get(m.responsavel_id).firstname_usuario} {Usuario.query.get(m.responsavel_id).lastname_usuario}" if m.responsavel_id else "",
+        "cidade_id": lambda v, c, m, p: m.cidade.nome_cidade if m.cidade_id else "",
+        "responsavel_id": lambda v, c, m, p: f"{m.responsavel.firstname_usuario} {m.responsavel.lastname_usuario}" if m.responsavel_id else "",
     }
 
 class AtletaAdmin(AdminModelView):
@@ -120,11 +222,13 @@ class AtletaAdmin(AdminModelView):
         "rg": "RG"
     }
 
+    column_joinedload = (Atleta.equipe, Atleta.status)
+
     column_formatters = {
         "equipe_id": lambda v, c, m, p:
-            Equipe.query.get(m.equipe_id).nome_equipe if m.equipe_id else "-",
+            m.equipe.nome_equipe if m.equipe_id else "-",
         "status_id": lambda v, c, m, p:
-            Status.query.get(m.status_id).nome_status if m.status_id else "-"
+            m.status.nome_status if m.status_id else "-"
     }
 
     form_columns = [
@@ -138,7 +242,7 @@ class AtletaAdmin(AdminModelView):
         "data_nascimento",
         "telefone1",
         "telefone2",
-        "equipe_id",
+        "equipe",
         "sexo_id",
         "modalidade_id",
         "posicao_id",
@@ -147,15 +251,11 @@ class AtletaAdmin(AdminModelView):
         "status_id",
     ]
 
+    form_ajax_refs = {
+        "equipe": ajax_equipe("equipe"),
+    }
+
     form_extra_fields = {
-        "equipe_id": Select2Field(
-            "Equipe",
-            coerce=int,
-            choices=lambda: [
-                (e.id, e.nome_equipe)
-                for e in Equipe.query.order_by(Equipe.nome_equipe).all()
-            ]
-        ),
         "sexo_id": Select2Field(
             "Sexo",
             coerce=int,
@@ -190,7 +290,20 @@ class AtletaAdmin(AdminModelView):
 
 class EquipeAdmin(AdminModelView):
 
-    form_columns = ["nome_equipe", "projeto_id", "tecnico_id", "is_active", "logo_id"]
+    # Os relacionamentos (tecnico, logo) ficam fora da listagem
+    column_list = ["id", "nome_equipe", "is_active", "created_at", "last_edited"]
+
+    form_columns = ["nome_equipe", "projeto_id", "tecnico", "is_active", "logo"]
+
+    form_ajax_refs = {
+        "tecnico": ajax_usuario("tecnico"),
+        "logo": ajax_imagem("logo"),
+    }
+
+    form_args = {
+        "tecnico": {"label": "Técnico"},
+        "logo": {"label": "Logo (Imagem)"},
+    }
 
     form_extra_fields = {
         "projeto_id": Select2Field(
@@ -198,29 +311,16 @@ class EquipeAdmin(AdminModelView):
             coerce=int,
             choices=lambda: [(p.id, p.nome_projeto) for p in Projeto.query.all()]
         ),
-        "tecnico_id": Select2Field(
-            "Técnico",
-            coerce=int,
-            choices=lambda: [
-                (u.id, f"{u.firstname_usuario} {u.lastname_usuario}")
-                for u in Usuario.query.all()
-            ]
-        ),
-        "logo_id": Select2Field(
-            "Logo (Imagem)",
-            coerce=int,
-            allow_blank=True,
-            blank_text="Sem logo",
-            choices=lambda: [(i.id, i.name or f"Imagem {i.id}") for i in Imagem.query.all()]
-        ),
     }
 
 class CidadeAdmin(AdminModelView):
 
     column_list = ["id", "nome_cidade", "estado_id"]
 
+    column_joinedload = (Cidade.estado,)
+
     column_formatters = {
-        "estado_id": lambda v, c, m, p: Estado.query.get(m.estado_id).nome_estado if m.estado_id else ""
+        "estado_id": lambda v, c, m, p: m.estado.nome_estado if m.estado_id else ""
     }
 
     form_columns = ["nome_cidade", "estado_id"]
@@ -244,65 +344,52 @@ class TransferenciaAdmin(AdminModelView):
         "created_at",
     ]
 
+    column_joinedload = (Transferencia.atleta, Transferencia.equipe_origem, Transferencia.equipe_destino, Transferencia.responsavel)
+
     column_formatters = {
         "atleta_id": lambda v, c, m, p:
-            f"{Atleta.query.get(m.atleta_id).firstname_atleta} "
-            f"{Atleta.query.get(m.atleta_id).lastname_atleta}",
+            f"{m.atleta.firstname_atleta} "
+            f"{m.atleta.lastname_atleta}",
         "equipe_origem_id": lambda v, c, m, p:
-            Equipe.query.get(m.equipe_origem_id).nome_equipe,
+            m.equipe_origem.nome_equipe,
         "equipe_destino_id": lambda v, c, m, p:
-            Equipe.query.get(m.equipe_destino_id).nome_equipe,
+            m.equipe_destino.nome_equipe,
         "responsavel_id": lambda v, c, m, p:
-            f"{Usuario.query.get(m.responsavel_id).firstname_usuario}"
+            f"{m.responsavel.firstname_usuario}"
     }
 
     form_columns = [
-        "atleta_id",
+        "atleta",
         "projeto_origem_id",
-        "equipe_origem_id",
+        "equipe_origem",
         "projeto_destino_id",
-        "equipe_destino_id",
+        "equipe_destino",
         "motivo",
-        "responsavel_id",
+        "responsavel",
     ]
 
+    form_ajax_refs = {
+        "atleta": ajax_atleta("atleta"),
+        "equipe_origem": ajax_equipe("equipe_origem"),
+        "equipe_destino": ajax_equipe("equipe_destino"),
+        "responsavel": ajax_usuario("responsavel"),
+    }
+
+    form_args = {
+        "responsavel": {"label": "Responsável"},
+    }
+
     form_extra_fields = {
-        "atleta_id": Select2Field(
-            "Atleta",
-            coerce=int,
-            choices=lambda: [
-                (a.id, f"{a.firstname_atleta} {a.lastname_atleta}")
-                for a in Atleta.query.all()
-            ]
-        ),
         "projeto_origem_id": Select2Field(
             "Projeto Origem",
             coerce=int,
             choices=lambda: [(p.id, p.nome_projeto) for p in Projeto.query.all()]
         ),
-        "equipe_origem_id": Select2Field(
-            "Equipe Origem",
-            coerce=int,
-            choices=lambda: [(e.id, e.nome_equipe) for e in Equipe.query.all()]
-        ),
         "projeto_destino_id": Select2Field(
             "Projeto Destino",
             coerce=int,
             choices=lambda: [(p.id, p.nome_projeto) for p in Projeto.query.all()]
         ),
-        "equipe_destino_id": Select2Field(
-            "Equipe Destino",
-            coerce=int,
-            choices=lambda: [(e.id, e.nome_equipe) for e in Equipe.query.all()]
-        ),
-        "responsavel_id": Select2Field(
-            "Responsável",
-            coerce=int,
-            choices=lambda: [
-                (u.id, f"{u.firstname_usuario} {u.lastname_usuario}")
-                for u in Usuario.query.all()
-            ]
-        ),
     }
 
 class AtletaHistoricoAdmin(AdminModelView):
@@ -317,59 +404,50 @@ class AtletaHistoricoAdmin(AdminModelView):
         "created_at",
     ]
 
+    column_joinedload = (AtletaHistorico.atleta, AtletaHistorico.projeto, AtletaHistorico.equipe, AtletaHistorico.status)
+
     column_formatters = {
         "atleta_id": lambda v, c, m, p:
-            f"{Atleta.query.get(m.atleta_id).firstname_atleta} "
-            f"{Atleta.query.get(m.atleta_id).lastname_atleta}",
+            f"{m.atleta.firstname_atleta} "
+            f"{m.atleta.lastname_atleta}",
         "projeto_id": lambda v, c, m, p:
-            Projeto.query.get(m.projeto_id).nome_projeto,
+            m.projeto.nome_projeto,
         "equipe_id": lambda v, c, m, p:
-            Equipe.query.get(m.equipe_id).nome_equipe,
+            m.equipe.nome_equipe,
         "status_id": lambda v, c, m, p:
-            Status.query.get(m.status_id).nome_status,
+            m.status.nome_status,
     }
 
     form_columns = [
-        "atleta_id",
+        "atleta",
         "projeto_id",
-        "equipe_id",
+        "equipe",
         "status_id",
         "motivo",
-        "responsavel_id",
+        "responsavel",
     ]
 
+    form_ajax_refs = {
+        "atleta": ajax_atleta("atleta"),
+        "equipe": ajax_equipe("equipe"),
+        "responsavel": ajax_usuario("responsavel"),
+    }
+
+    form_args = {
+        "responsavel": {"label": "Responsável"},
+    }
+
     form_extra_fields = {
-        "atleta_id": Select2Field(
-            "Atleta",
-            coerce=int,
-            choices=lambda: [
-                (a.id, f"{a.firstname_atleta} {a.lastname_atleta}")
-                for a in Atleta.query.all()
-            ]
-        ),
         "projeto_id": Select2Field(
             "Projeto",
             coerce=int,
             choices=lambda: [(p.id, p.nome_projeto) for p in Projeto.query.all()]
         ),
-        "equipe_id": Select2Field(
-            "Equipe",
-            coerce=int,
-            choices=lambda: [(e.id, e.nome_equipe) for e in Equipe.query.all()]
-        ),
         "status_id": Select2Field(
             "Status",
             coerce=int,
             choices=lambda: [(s.id, s.nome_status) for s in Status.query.all()]
         ),
-        "responsavel_id": Select2Field(
-            "Responsável",
-            coerce=int,
-            choices=lambda: [
-                (u.id, f"{u.firstname_usuario} {u.lastname_usuario}")
-                for u in Usuario.query.all()
-            ]
-        ),
     }
 
 class AtletaEnderecoAdmin(AdminModelView):
@@ -390,42 +468,30 @@ class AtletaEnderecoAdmin(AdminModelView):
         "cidade_id": "Cidade",
     }
 
+    column_joinedload = (AtletaEndereco.atleta, AtletaEndereco.cidade)
+
     column_formatters = {
         "atleta_id": lambda v, c, m, p:
-            f"{Atleta.query.get(m.atleta_id).firstname_atleta} "
-            f"{Atleta.query.get(m.atleta_id).lastname_atleta}"
+            f"{m.atleta.firstname_atleta} "
+            f"{m.atleta.lastname_atleta}"
             if m.atleta_id else "-",
         "cidade_id": lambda v, c, m, p:
-            Cidade.query.get(m.cidade_id).nome_cidade if m.cidade_id else "-"
+            m.cidade.nome_cidade if m.cidade_id else "-"
     }
 
     form_columns = [
-        "atleta_id",
+        "atleta",
         "logradouro",
         "numero",
         "complemento",
         "bairro",
-        "cidade_id",
+        "cidade",
         "cep",
     ]
 
-    form_extra_fields = {
-        "atleta_id": Select2Field(
-            "Atleta",
-            coerce=int,
-            choices=lambda: [
-                (a.id, f"{a.firstname_atleta} {a.lastname_atleta}")
-                for a in Atleta.query.all()
-            ]
-        ),
-        "cidade_id": Select2Field(
-            "Cidade",
-            coerce=int,
-            choices=lambda: [
-                (c.id, c.nome_cidade)
-                for c in Cidade.query.all()
-            ]
-        ),
+    form_ajax_refs = {
+        "atleta": ajax_atleta("atleta"),
+        "cidade": ajax_cidade("cidade"),
     }
 
 class ImagemAdmin(AdminModelView):
@@ -452,44 +518,30 @@ class BlogPostAdmin(AdminModelView):
         "updated_at": "Atualizado em",
     }
 
+    column_joinedload = (BlogPost.autor, BlogPost.imagem)
+
     column_formatters = {
         "autor_id": lambda v, c, m, p:
-            Usuario.query.get(m.autor_id).firstname_usuario
+            m.autor.firstname_usuario
             if m.autor_id else "-",
 
         "imagem_id": lambda v, c, m, p:
-            Imagem.query.get(m.imagem_id).name
+            m.imagem.name
             if m.imagem_id else "-"
     }
 
     form_columns = [
-        "autor_id",
+        "autor",
         "titulo",
         "subtitulo",
         "texto",
-        "imagem_id",
+        "imagem",
         "link_acao",
     ]
 
-    form_extra_fields = {
-        "autor_id": Select2Field(
-            "Autor",
-            coerce=int,
-            choices=lambda: [
-                (u.id, f"{u.firstname_usuario} {u.lastname_usuario}")
-                for u in Usuario.query.all()
-            ]
-        ),
-        "imagem_id": Select2Field(
-            "Imagem",
-            coerce=int,
-            allow_blank=True,
-            blank_text="Sem imagem",
-            choices=lambda: [
-                (i.id, i.name or f"Imagem {i.id}")
-                for i in Imagem.query.all()
-            ]
-        ),
+    form_ajax_refs = {
+        "autor": ajax_usuario("autor"),
+        "imagem": ajax_imagem("imagem"),
     }
 
 
@@ -0,0 +1,161 @@
+import os
+import tempfile
+from flask import Response, send_file, stream_with_context
+
+# Tamanho dos blocos ao transmitir objetos do S3
+TAMANHO_BLOCO = 64 * 1024
+
+class ArmazenamentoLocal:
+    """Guarda os arquivos no disco, endereçados pelo hash do conteúdo.
+
+    O arquivo de hash `abcdef...` fica em `<raiz>/ab/cd/abcdef...`, evitando
+    diretórios com milhares de entradas. Como o caminho depende só do
+    conteúdo, salvar o mesmo arquivo duas vezes não duplica nada.
+    """
+
+    def __init__(self, raiz):
+        self.raiz = raiz
+
+    def caminho(self, chave):
+        return os.path.join(self.raiz, chave[:2], chave[2:4], chave)
+
+    def salvar(self, chave, dados):
+        caminho = self.caminho(chave)
+        if os.path.exists(caminho):
+            return
+
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+
+        # Escreve em arquivo temporário e renomeia (nunca expõe arquivo pela metade)
+        fd, temporario = tempfile.mkstemp(dir=os.path.dirname(caminho))
+        with os.fdopen(fd, "wb") as arquivo:
+            arquivo.write(dados)
+        os.replace(temporario, caminho)
+
+    def ler(self, chave):
+        with open(self.caminho(chave), "rb") as arquivo:
+            return arquivo.read()
+
+    def existe(self, chave):
+        return os.path.exists(self.caminho(chave))
+
+    def remover(self, chave):
+        if self.existe(chave):
+            os.remove(self.caminho(chave))
+
+    def resposta(self, chave, mimetype):
+        # send_file usa X-Sendfile quando USE_X_SENDFILE está ativo
+        return send_file(self.caminho(chave), mimetype=mimetype, conditional=False, etag=False)
+
+class ArmazenamentoS3:
+    """Guarda os arquivos em um bucket compatível com S3.
+
+    `cliente` precisa oferecer `put_object`, `get_object`, `head_object` e
+    `delete_object` com a assinatura do boto3 (o `ClienteS3Local` abaixo
+    satisfaz essa interface sem depender de rede).
+    """
+
+    def __init__(self, cliente, bucket, prefixo="imagens/"):
+        self.cliente = cliente
+        self.bucket = bucket
+        self.prefixo = prefixo
+
+    def _key(self, chave):
+        return f"{self.prefixo}{chave[:2]}/{chave}"
+
+    def salvar(self, chave, dados):
+        if self.existe(chave):
+            return
+        self.cliente.put_object(Bucket=self.bucket, Key=self._key(chave), Body=dados)
+
+    def ler(self, chave):
+        # O Body precisa ser fechado (devolve a conexão ao pool / o arquivo no ClienteS3Local)
+        corpo = self.cliente.get_object(Bucket=self.bucket, Key=self._key(chave))["Body"]
+        try:
+            return corpo.read()
+        finally:
+            corpo.close()
+
+    def existe(self, chave):
+        try:
+            self.cliente.head_object(Bucket=self.bucket, Key=self._key(chave))
+            return True
+        except Exception:
+            return False
+
+    def remover(self, chave):
+        self.cliente.delete_object(Bucket=self.bucket, Key=self._key(chave))
+
+    def resposta(self, chave, mimetype):
+        corpo = self.cliente.get_object(Bucket=self.bucket, Key=self._key(chave))["Body"]
+
+        def gerar():
+            # Fecha também quando o cliente desconecta no meio da resposta
+            try:
+                while True:
+                    bloco = corpo.read(TAMANHO_BLOCO)
+                    if not bloco:
+                        break
+                    yield bloco
+            finally:
+                corpo.close()
+
+        return Response(stream_with_context(gerar()), mimetype=mimetype)
+
+class ClienteS3Local:
+    """Substituto local de um cliente S3 (desenvolvimento), gravando no disco."""
+
+    def __init__(self, raiz):
+        self.raiz = raiz
+
+    def _caminho(self, Bucket, Key):
+        return os.path.join(self.raiz, Bucket, *Key.split("/"))
+
+    def put_object(self, Bucket, Key, Body):
+        caminho = self._caminho(Bucket, Key)
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        with open(caminho, "wb") as arquivo:
+            arquivo.write(Body)
+        return {}
+
+    def get_object(self, Bucket, Key):
+        return {"Body": open(self._caminho(Bucket, Key), "rb")}
+
+    def head_object(self, Bucket, Key):
+        caminho = self._caminho(Bucket, Key)
+        if not os.path.exists(caminho):
+            raise FileNotFoundError(Key)
+        return {"ContentLength": os.path.getsize(caminho)}
+
+    def delete_object(self, Bucket, Key):
+        caminho = self._caminho(Bucket, Key)
+        if os.path.exists(caminho):
+            os.remove(caminho)
+        return {}
+
+def init_armazenamento(app):
+    """Configura o backend de arquivos a partir de ARMAZENAMENTO_IMAGENS.
+
+    - "banco" (padrão): mantém os bytes na coluna `imagens.img`;
+    - "local": disco em ARMAZENAMENTO_DIR;
+    - "s3": bucket S3_BUCKET (boto3, S3_ENDPOINT_URL opcional);
+    - "s3-local": interface S3 gravando em ARMAZENAMENTO_DIR.
+    """
+
+    tipo = app.config.get("ARMAZENAMENTO_IMAGENS", "banco")
+    raiz = app.config.get("ARMAZENAMENTO_DIR") or os.path.join(app.instance_path, "imagens")
+
+    if tipo == "local":
+        armazenamento = ArmazenamentoLocal(raiz)
+    elif tipo == "s3":
+        import boto3  # dependência opcional, só necessária com S3
+
+        cliente = boto3.client("s3", endpoint_url=app.config.get("S3_ENDPOINT_URL"))
+        armazenamento = ArmazenamentoS3(cliente, app.config["S3_BUCKET"])
+    elif tipo == "s3-local":
+        armazenamento = ArmazenamentoS3(ClienteS3Local(raiz), app.config.get("S3_BUCKET") or "voleihub")
+    else:
+        armazenamento = None
+
+    app.extensions["armazenamento"] = armazenamento
+    return armazenamento
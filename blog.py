@@ -0,0 +1,172 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+from flask import get_template_attribute
+from sqlalchemy import and_, or_
+from elenco import codificar_cursor, decodificar_cursor
+from imagens import carregar_versoes_imagens
+from referencias import CacheReferencias, registrar_invalidacao
+from models import *
+
+# Posts por página do feed (/blog e /blog/posts/)
+LIMITE_PADRAO = 10
+LIMITE_MAXIMO = 50
+
+# Cartões renderizados; edições feitas em outro processo são detectadas pelo
+# updated_at e pelo hash da imagem (a URL dela é versionada), só a troca de
+# nome do autor espera o TTL
+TTL_PADRAO = 600
+MAX_CARTOES = 500
+
+@dataclass(frozen=True)
+class PaginaBlog:
+    """Uma página do feed do blog (keyset em (created_at, id), mais novos primeiro)."""
+
+    itens: list = field(default_factory=list)
+    proximo_cursor: str | None = None
+    cartoes: dict = field(default_factory=dict)
+
+@dataclass(frozen=True)
+class CartaoPost:
+    """HTML do cartão de um post, sem a parte que depende do usuário (menu de edição)."""
+
+    updated_at: datetime
+    imagem_hash: str | None
+    cabecalho: str
+    corpo: str
+
+cartoes = CacheReferencias(ttl=TTL_PADRAO, max_itens=MAX_CARTOES)
+
+def init_blog(app):
+    cartoes.ttl = app.config.get("BLOG_CARTOES_TTL", TTL_PADRAO)
+    cartoes.invalidar()
+
+def _query_posts():
+    return (
+        db.session.query(
+            BlogPost.id,
+            BlogPost.autor_id,
+            BlogPost.imagem_id,
+            BlogPost.titulo,
+            BlogPost.subtitulo,
+            BlogPost.resumo,
+            BlogPost.link_acao,
+            BlogPost.created_at,
+            BlogPost.updated_at,
+            Usuario.firstname_usuario,
+            Imagem.hash.label("imagem_hash"),
+        )
+        .outerjoin(Usuario, Usuario.id == BlogPost.autor_id)
+        .outerjoin(Imagem, Imagem.id == BlogPost.imagem_id)
+    )
+
+def _formatar_post(row, pode_editar):
+    if row.updated_at != row.created_at:
+        data_atualizacao = row.updated_at.strftime("%d/%m/%Y")
+    else:
+        data_atualizacao = None
+
+    return {
+        "id": row.id,
+        "autor": row.firstname_usuario.title() if row.firstname_usuario else "Desconhecido",
+        "data_criacao": row.created_at.strftime("%d/%m/%Y"),
+        "data_atualizacao": data_atualizacao,
+        "can_edit": pode_editar(row),
+        "imagem_id": row.imagem_id,
+        "titulo": row.titulo,
+        "subtitulo": row.subtitulo,
+        "resumo": row.resumo,
+        "resumo_cortado": row.resumo.endswith("…"),
+        "link_acao": row.link_acao,
+    }
+
+def _renderizar_cartao(row, post, imagens_pagina):
+    # Um miss carrega os hashes de todas as imagens da página de uma vez (ficam em `g`)
+    carregar_versoes_imagens(imagens_pagina)
+
+    return CartaoPost(
+        updated_at=row.updated_at,
+        imagem_hash=row.imagem_hash,
+        cabecalho=get_template_attribute("blog/_cartao.html", "cabecalho")(post),
+        corpo=get_template_attribute("blog/_cartao.html", "corpo")(post),
+    )
+
+def _cartao(row, post, imagens_pagina):
+    """Cartão do cache, chaveado pelo id do post e validado pelo updated_at e pelo hash da imagem.
+
+    A imagem pode mudar sem mexer no post (admin, tarefa `processar_imagem`).
+    """
+
+    carregar = lambda: _renderizar_cartao(row, post, imagens_pagina)
+
+    cartao = cartoes.obter(row.id, carregar)
+    if (cartao.updated_at, cartao.imagem_hash) != (row.updated_at, row.imagem_hash):
+        cartoes.invalidar(row.id)
+        cartao = cartoes.obter(row.id, carregar)
+
+    return cartao
+
+def _decodificar_cursor(cursor):
+    # Mesmo formato de cursor do elenco: [created_at em ISO, id]
+    posicao = decodificar_cursor(cursor)
+    if posicao is None:
+        return None
+
+    try:
+        return datetime.fromisoformat(posicao[0]), posicao[1]
+    except ValueError:
+        return None
+
+def carregar_pagina_blog(pode_editar, limite=LIMITE_PADRAO, cursor=None):
+    """Uma página do feed com autor e resumo em uma única query (sem o texto completo).
+
+    `pode_editar(post)` recebe cada linha (com `autor_id`) e define o
+    `can_edit` do item. `cursor` é o `proximo_cursor` da página anterior.
+    `cartoes` traz o HTML de cada post (id -> CartaoPost) para blog/_posts.html.
+    """
+
+    limite = max(1, min(limite or LIMITE_PADRAO, LIMITE_MAXIMO))
+
+    feed_query = _query_posts()
+
+    posicao = _decodificar_cursor(cursor) if cursor else None
+    if posicao:
+        created_at, post_id = posicao
+        feed_query = feed_query.filter(or_(
+            BlogPost.created_at < created_at,
+            and_(BlogPost.created_at == created_at, BlogPost.id < post_id)
+        ))
+
+    # Busca um item a mais para saber se existe próxima página
+    rows = feed_query.order_by(BlogPost.created_at.desc(), BlogPost.id.desc()).limit(limite + 1).all()
+
+    proximo_cursor = None
+    if len(rows) > limite:
+        ultimo = rows[limite - 1]
+        proximo_cursor = codificar_cursor(ultimo.created_at.isoformat(), ultimo.id)
+
+    rows = rows[:limite]
+    itens = [_formatar_post(row, pode_editar) for row in rows]
+
+    imagens_pagina = [row.imagem_id for row in rows]
+    cartoes_pagina = {row.id: _cartao(row, post, imagens_pagina) for row, post in zip(rows, itens)}
+
+    return PaginaBlog(itens=itens, proximo_cursor=proximo_cursor, cartoes=cartoes_pagina)
+
+def carregar_post(post_id, pode_editar):
+    """Post com o texto completo (página de detalhe) ou None."""
+
+    row = (
+        _query_posts()
+        .add_columns(BlogPost.texto)
+        .filter(BlogPost.id == post_id)
+        .first()
+    )
+
+    if row is None:
+        return None
+
+    post = _formatar_post(row, pode_editar)
+    post["texto"] = row.texto
+    return post
+
+registrar_invalidacao(cartoes, "posts_alterados", lambda obj: (obj.id,) if isinstance(obj, BlogPost) else None)
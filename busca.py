@@ -0,0 +1,311 @@
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from sqlalchemy import text, literal, literal_column, func, or_, case, union_all, select, table
+from escopo import Escopo
+from models import *
+
+# Paginação da busca unificada (/buscar)
+LIMITE_PADRAO = 20
+LIMITE_MAXIMO = 50
+MIN_CARACTERES = 2
+
+TIPOS = ("projeto", "equipe", "atleta")
+
+# SQLite: o rowid de busca_fts codifica o tipo nos 2 bits mais baixos
+# (rowid = id * 4 + código), para os triggers acharem a linha sem varrer a tabela
+CODIGO_TIPO = {"projeto": 1, "equipe": 2, "atleta": 3}
+TIPO_CODIGO = {codigo: tipo for tipo, codigo in CODIGO_TIPO.items()}
+
+# Tabela FTS5 e triggers que a mantêm sincronizada (SQLite). A migration
+# cria a mesma estrutura; `flask reindexar-busca` recria tudo, por exemplo
+# depois de uma migration em batch que recriou projetos/equipes/atletas.
+DDL_FTS = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS busca_fts USING fts5(titulo, tokenize = 'unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS busca_projetos_ai AFTER INSERT ON projetos BEGIN INSERT INTO busca_fts(rowid, titulo) VALUES (new.id * 4 + 1, new.nome_projeto); END",
+    "CREATE TRIGGER IF NOT EXISTS busca_projetos_au AFTER UPDATE OF nome_projeto ON projetos BEGIN UPDATE busca_fts SET titulo = new.nome_projeto WHERE rowid = new.id * 4 + 1; END",
+    "CREATE TRIGGER IF NOT EXISTS busca_projetos_ad AFTER DELETE ON projetos BEGIN DELETE FROM busca_fts WHERE rowid = old.id * 4 + 1; END",
+    "CREATE TRIGGER IF NOT EXISTS busca_equipes_ai AFTER INSERT ON equipes BEGIN INSERT INTO busca_fts(rowid, titulo) VALUES (new.id * 4 + 2, new.nome_equipe); END",
+    "CREATE TRIGGER IF NOT EXISTS busca_equipes_au AFTER UPDATE OF nome_equipe ON equipes BEGIN UPDATE busca_fts SET titulo = new.nome_equipe WHERE rowid = new.id * 4 + 2; END",
+    "CREATE TRIGGER IF NOT EXISTS busca_equipes_ad AFTER DELETE ON equipes BEGIN DELETE FROM busca_fts WHERE rowid = old.id * 4 + 2; END",
+    "CREATE TRIGGER IF NOT EXISTS busca_atletas_ai AFTER INSERT ON atletas BEGIN INSERT INTO busca_fts(rowid, titulo) VALUES (new.id * 4 + 3, new.firstname_atleta || ' ' || coalesce(new.lastname_atleta, '')); END",
+    "CREATE TRIGGER IF NOT EXISTS busca_atletas_au AFTER UPDATE OF firstname_atleta, lastname_atleta ON atletas BEGIN UPDATE busca_fts SET titulo = new.firstname_atleta || ' ' || coalesce(new.lastname_atleta, '') WHERE rowid = new.id * 4 + 3; END",
+    "CREATE TRIGGER IF NOT EXISTS busca_atletas_ad AFTER DELETE ON atletas BEGIN DELETE FROM busca_fts WHERE rowid = old.id * 4 + 3; END",
+]
+
+POPULAR_FTS = [
+    "DELETE FROM busca_fts",
+    "INSERT INTO busca_fts(rowid, titulo) SELECT id * 4 + 1, nome_projeto FROM projetos",
+    "INSERT INTO busca_fts(rowid, titulo) SELECT id * 4 + 2, nome_equipe FROM equipes",
+    "INSERT INTO busca_fts(rowid, titulo) SELECT id * 4 + 3, firstname_atleta || ' ' || coalesce(lastname_atleta, '') FROM atletas",
+]
+
+@dataclass(frozen=True)
+class ResultadoBusca:
+    tipo: str
+    id: int
+    titulo: str
+    subtitulo: str | None = None
+    rank: float = 0.0
+
+@dataclass(frozen=True)
+class PaginaBusca:
+    """Uma página da busca unificada, em ordem de relevância."""
+
+    itens: list = field(default_factory=list)
+    pagina: int = 1
+    proxima_pagina: int | None = None
+
+def normalizar(texto):
+    """Minúsculas, sem acentos e com espaços simples ("  José " -> "jose")."""
+
+    texto = unicodedata.normalize("NFKD", texto or "")
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return " ".join(texto.lower().split())
+
+def _dialeto():
+    return db.session.get_bind().dialect.name
+
+# Cache (por processo) da existência de busca_fts em cada banco SQLite
+_fts_disponivel = {}
+
+def _usa_fts():
+    engine = db.session.get_bind()
+    if engine.dialect.name != "sqlite":
+        return False
+
+    chave = str(engine.url)
+    if chave not in _fts_disponivel:
+        _fts_disponivel[chave] = db.session.execute(
+            text("SELECT 1 FROM sqlite_master WHERE name = 'busca_fts'")
+        ).first() is not None
+
+    return _fts_disponivel[chave]
+
+def reindexar(conexao=None):
+    """(Re)cria a tabela FTS5 e os triggers (SQLite) e repopula o índice."""
+
+    conexao = conexao or db.session.connection()
+    if conexao.dialect.name != "sqlite":
+        return False
+
+    for comando in DDL_FTS + POPULAR_FTS:
+        conexao.exec_driver_sql(comando)
+
+    _fts_disponivel.clear()
+    return True
+
+def incluir_no_autogenerate(objeto, nome, tipo, refletido, comparado_com):
+    """`include_object` do Alembic: ignora busca_fts e as tabelas internas do FTS5."""
+
+    return not (tipo == "table" and refletido and nome.startswith("busca_fts"))
+
+# --- Expressões de texto por tipo ---
+
+def _coluna_texto(tipo):
+    if tipo == "projeto":
+        return Projeto.nome_projeto
+    if tipo == "equipe":
+        return Equipe.nome_equipe
+    return Atleta.firstname_atleta.concat(literal_column("' '")).concat(func.coalesce(Atleta.lastname_atleta, literal_column("''")))
+
+def _modelo(tipo):
+    return {"projeto": Projeto, "equipe": Equipe, "atleta": Atleta}[tipo]
+
+def _texto_pg(tipo):
+    # Mesma expressão dos índices GIN da migration (f_unaccent é um wrapper IMMUTABLE de unaccent)
+    return func.f_unaccent(func.lower(_coluna_texto(tipo)))
+
+def _consulta_fts(termo):
+    # Cada palavra vira um prefixo entre aspas ("jo"* "sil"*): todas precisam aparecer
+    palavras = re.findall(r"\w+", termo)
+    return " ".join(f'"{palavra}"*' for palavra in palavras)
+
+def _consulta_fts_exata(termo):
+    # Todas as palavras inteiras ("joao1" não casa com "Joao12")
+    return " ".join(f'"{palavra}"' for palavra in re.findall(r"\w+", termo))
+
+def _consulta_fts_inicio(termo):
+    # Título começando pelo termo ("joao1 sil" -> ^"joao1 sil"*)
+    return '^"' + " ".join(re.findall(r"\w+", termo)) + '"*'
+
+def _ids_fts(tipo, termo):
+    return select(literal_column("rowid / 4")).select_from(table("busca_fts")).where(
+        text("busca_fts MATCH :consulta_fts").bindparams(consulta_fts=_consulta_fts(termo)),
+        literal_column("rowid % 4") == CODIGO_TIPO[tipo],
+    )
+
+def condicao_nome(tipo, q):
+    """Condição SQL "nome contém q" para Projeto/Equipe/Atleta que aproveita o índice de busca.
+
+    Postgres: trigram (pg_trgm) sobre o nome sem acento; SQLite com FTS5:
+    prefixo das palavras; outros casos: ILIKE simples.
+    """
+
+    termo = normalizar(q)
+    modelo = _modelo(tipo)
+
+    if _dialeto() == "postgresql":
+        return _texto_pg(tipo).icontains(termo, autoescape=True)
+
+    if _usa_fts() and _consulta_fts(termo):
+        return modelo.id.in_(_ids_fts(tipo, termo))
+
+    return _coluna_texto(tipo).icontains(q.strip(), autoescape=True)
+
+# --- Busca unificada ---
+
+def _ranking_pg(tipo, termo):
+    texto_busca = _texto_pg(tipo)
+    documento = func.to_tsvector(literal_column("'simple'"), texto_busca)
+    consulta = func.plainto_tsquery(literal_column("'simple'"), termo)
+    modelo = _modelo(tipo)
+
+    return (
+        select(
+            literal(tipo).label("tipo"),
+            modelo.id.label("registro_id"),
+            func.greatest(func.similarity(texto_busca, termo), func.ts_rank(documento, consulta)).label("rank"),
+        )
+        .where(or_(texto_busca.icontains(termo, autoescape=True), documento.op("@@")(consulta)))
+    )
+
+def _ranking_simples(tipo, q):
+    modelo = _modelo(tipo)
+    coluna = _coluna_texto(tipo)
+    termo = q.strip()
+
+    # Sem índice de busca: começa com o termo vale mais que apenas contém
+    return (
+        select(
+            literal(tipo).label("tipo"),
+            modelo.id.label("registro_id"),
+            case((coluna.istartswith(termo, autoescape=True), 1.0), else_=0.5).label("rank"),
+        )
+        .where(coluna.icontains(termo, autoescape=True))
+    )
+
+def _buscar_nomes(q, tipos, limite, offset):
+    termo = normalizar(q)
+
+    if _usa_fts():
+        if not _consulta_fts(termo):
+            return []
+
+        # O bm25 favorece títulos curtos em buscas por prefixo ("joao1" ->
+        # "Joao12" antes de "Joao1 Silva1"). Faixas do rank: palavras exatas
+        # [2, 4), título começando pelo termo [1, 2), demais [0, 1); dentro da
+        # faixa decide o bm25, comprimido para [0, 1)
+        codigos = ", ".join(str(CODIGO_TIPO[tipo]) for tipo in tipos)
+        rows = db.session.execute(
+            text(
+                "SELECT rowid % 4, rowid / 4, "
+                "2 * (rowid IN (SELECT rowid FROM busca_fts WHERE busca_fts MATCH :exata)) "
+                "+ (rowid IN (SELECT rowid FROM busca_fts WHERE busca_fts MATCH :inicio)) "
+                "- bm25(busca_fts) / (1 - bm25(busca_fts)) AS rank FROM busca_fts "
+                f"WHERE busca_fts MATCH :consulta AND rowid % 4 IN ({codigos}) "
+                "ORDER BY rank DESC, rowid LIMIT :limite OFFSET :offset"
+            ),
+            {
+                "consulta": _consulta_fts(termo),
+                "exata": _consulta_fts_exata(termo),
+                "inicio": _consulta_fts_inicio(termo),
+                "limite": limite,
+                "offset": offset,
+            },
+        ).all()
+        return [(TIPO_CODIGO[codigo], registro_id, rank) for codigo, registro_id, rank in rows]
+
+    if _dialeto() == "postgresql":
+        partes = [_ranking_pg(tipo, termo) for tipo in tipos]
+    else:
+        partes = [_ranking_simples(tipo, q) for tipo in tipos]
+
+    resultados = union_all(*partes).subquery()
+    rows = db.session.execute(
+        select(resultados.c.tipo, resultados.c.registro_id, resultados.c.rank)
+        .order_by(resultados.c.rank.desc(), resultados.c.tipo, resultados.c.registro_id)
+        .limit(limite)
+        .offset(offset)
+    ).all()
+    return [tuple(row) for row in rows]
+
+def _buscar_documento(digitos, escopo, limite, offset):
+    """CPF/RG exato (índices únicos), só entre os atletas que o usuário pode editar."""
+
+    rows = (
+        db.session.query(Atleta.id)
+        .filter(or_(Atleta.cpf == digitos, Atleta.rg == digitos))
+        .filter(escopo.filtro_equipes(Atleta.equipe_id))
+        .order_by(Atleta.id)
+        .limit(limite)
+        .offset(offset)
+        .all()
+    )
+    return [("atleta", atleta_id, 1.0) for (atleta_id,) in rows]
+
+def _detalhar(encontrados):
+    """Resolve título/subtítulo dos resultados (no máximo uma query por tipo)."""
+
+    ids = {tipo: [registro_id for t, registro_id, _ in encontrados if t == tipo] for tipo in TIPOS}
+    detalhes = {}
+
+    if ids["projeto"]:
+        for projeto_id, nome_projeto, nome_cidade in (
+            db.session.query(Projeto.id, Projeto.nome_projeto, Cidade.nome_cidade)
+            .join(Cidade, Cidade.id == Projeto.cidade_id)
+            .filter(Projeto.id.in_(ids["projeto"]))
+        ):
+            detalhes[("projeto", projeto_id)] = (nome_projeto, nome_cidade.title())
+
+    if ids["equipe"]:
+        for equipe_id, nome_equipe, nome_projeto in (
+            db.session.query(Equipe.id, Equipe.nome_equipe, Projeto.nome_projeto)
+            .join(Projeto, Projeto.id == Equipe.projeto_id)
+            .filter(Equipe.id.in_(ids["equipe"]))
+        ):
+            detalhes[("equipe", equipe_id)] = (nome_equipe, nome_projeto)
+
+    if ids["atleta"]:
+        for atleta_id, firstname, lastname, nome_equipe in (
+            db.session.query(Atleta.id, Atleta.firstname_atleta, Atleta.lastname_atleta, Equipe.nome_equipe)
+            .join(Equipe, Equipe.id == Atleta.equipe_id)
+            .filter(Atleta.id.in_(ids["atleta"]))
+        ):
+            nome_atleta = f"{firstname} {lastname}" if lastname else firstname
+            detalhes[("atleta", atleta_id)] = (nome_atleta.title(), nome_equipe)
+
+    itens = []
+    for tipo, registro_id, rank in encontrados:
+        if (tipo, registro_id) in detalhes:
+            titulo, subtitulo = detalhes[(tipo, registro_id)]
+            itens.append(ResultadoBusca(tipo=tipo, id=registro_id, titulo=titulo, subtitulo=subtitulo, rank=round(float(rank or 0), 4)))
+
+    return itens
+
+def buscar(q, tipos=None, pagina=1, limite=LIMITE_PADRAO, escopo=None):
+    """Busca projetos, equipes e atletas por nome, ordenados por relevância.
+
+    Ignora acentos e maiúsculas. Se `q` for só números (CPF/RG), procura o
+    documento exato, restrito às equipes do `escopo` (ver escopo.py).
+    """
+
+    tipos = [tipo for tipo in (tipos or TIPOS) if tipo in TIPOS] or list(TIPOS)
+    limite = max(1, min(limite or LIMITE_PADRAO, LIMITE_MAXIMO))
+    pagina = max(1, pagina or 1)
+    offset = (pagina - 1) * limite
+
+    q = (q or "").strip()
+    if len(normalizar(q)) < MIN_CARACTERES:
+        return PaginaBusca(pagina=pagina)
+
+    digitos = re.sub(r"\D", "", q)
+    if digitos and not re.search(r"[^\d.\-/\s]", q):
+        encontrados = _buscar_documento(digitos, escopo or Escopo(), limite + 1, offset) if "atleta" in tipos else []
+    else:
+        # Busca um item a mais para saber se existe próxima página
+        encontrados = _buscar_nomes(q, tipos, limite + 1, offset)
+
+    proxima_pagina = pagina + 1 if len(encontrados) > limite else None
+
+    return PaginaBusca(itens=_detalhar(encontrados[:limite]), pagina=pagina, proxima_pagina=proxima_pagina)
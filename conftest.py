@@ -0,0 +1,19 @@
+import os
+import tempfile
+import pytest
+
+# O app lê DATABASE_URL ao ser importado: os testes usam sempre um SQLite temporário
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "testes.db")
+
+@pytest.fixture
+def app():
+    from main import app
+    from models import db
+
+    app.config["TESTING"] = True
+
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
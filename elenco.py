@@ -0,0 +1,152 @@
+import base64
+import json
+from dataclasses import dataclass, field
+from sqlalchemy import func, and_, or_, literal_column
+from models import *
+
+# Tamanho das páginas do elenco (visualizar_projeto/visualizar_equipe e /elenco/atletas/)
+LIMITE_PADRAO = 50
+LIMITE_MAXIMO = 200
+
+# Chave de ordenação do elenco: (sobrenome, id). Sobrenome vazio no lugar de
+# NULL para a ordem ser a mesma em qualquer banco. A expressão precisa ser
+# idêntica à de ix_atletas_equipe_id_sobrenome_id para o índice ser usado.
+SOBRENOME = func.coalesce(Atleta.lastname_atleta, literal_column("''"))
+
+@dataclass(frozen=True)
+class PaginaElenco:
+    """Uma página do elenco (keyset em (sobrenome, id))."""
+
+    itens: list = field(default_factory=list)
+    proximo_cursor: str | None = None
+
+def query_elenco(projeto_id=None, equipe_id=None):
+    """Query dos atletas com equipe, projeto e todas as dimensões já resolvidas (joins).
+
+    Uma única instrução SQL, reaproveitada pelas telas de projeto/equipe e
+    pelas exportações. Os filtros restringem ao projeto e/ou à equipe.
+    """
+
+    elenco_query = (
+        db.session.query(
+            Atleta.id.label("id"),
+            Atleta.firstname_atleta.label("firstname_atleta"),
+            Atleta.lastname_atleta.label("lastname_atleta"),
+            Equipe.id.label("equipe_id"),
+            Equipe.nome_equipe.label("equipe"),
+            Projeto.id.label("projeto_id"),
+            Projeto.nome_projeto.label("projeto"),
+            Modalidade.nome_modalidade.label("modalidade"),
+            Posicao.nome_posicao.label("posicao"),
+            Categoria.nome_categoria.label("categoria"),
+            Nivel.nome_nivel.label("nivel"),
+            Status.nome_status.label("status"),
+        )
+        .join(Equipe, Equipe.id == Atleta.equipe_id)
+        .join(Projeto, Projeto.id == Equipe.projeto_id)
+        .join(Modalidade, Modalidade.id == Atleta.modalidade_id)
+        .join(Posicao, Posicao.id == Atleta.posicao_id)
+        .join(Categoria, Categoria.id == Atleta.categoria_id)
+        .join(Nivel, Nivel.id == Atleta.nivel_id)
+        .join(Status, Status.id == Atleta.status_id)
+    )
+
+    if projeto_id is not None:
+        elenco_query = elenco_query.filter(Equipe.projeto_id == projeto_id)
+
+    if equipe_id is not None:
+        elenco_query = elenco_query.filter(Atleta.equipe_id == equipe_id)
+
+    return elenco_query
+
+def linha_elenco(row):
+    """Converte uma linha de `query_elenco` no dicionário usado pelos templates."""
+
+    return {
+        "id": row.id,
+        "nome_atleta": row.firstname_atleta.title(),
+        "sobrenome_atleta": (row.lastname_atleta or "").title(),
+        "equipe_id": row.equipe_id,
+        "equipe": row.equipe,
+        "projeto_id": row.projeto_id,
+        "projeto": row.projeto,
+        "modalidade": row.modalidade.title(),
+        "posicao": row.posicao.title(),
+        "categoria": row.categoria.title(),
+        "nivel": row.nivel.title(),
+        "status": row.status.title(),
+    }
+
+def carregar_elenco(projeto_id=None, equipe_id=None):
+    """Lista de atletas (dicionários) do projeto/equipe em uma única query."""
+
+    rows = query_elenco(projeto_id=projeto_id, equipe_id=equipe_id).order_by(Atleta.id).all()
+    return [linha_elenco(row) for row in rows]
+
+def codificar_cursor(sobrenome, atleta_id):
+    dados = json.dumps([sobrenome or "", atleta_id]).encode()
+    return base64.urlsafe_b64encode(dados).decode().rstrip("=")
+
+def decodificar_cursor(cursor):
+    """Retorna (sobrenome, id) do cursor ou None se ele for inválido."""
+
+    try:
+        dados = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sobrenome, atleta_id = json.loads(dados)
+    except (ValueError, TypeError):
+        return None
+
+    if not isinstance(sobrenome, str) or not isinstance(atleta_id, int):
+        return None
+
+    return sobrenome, atleta_id
+
+def filtrar_elenco(elenco_query, status_id=None, categoria_id=None, posicao_id=None):
+    """Aplica os filtros opcionais das telas de elenco (status, categoria, posição)."""
+
+    if status_id:
+        elenco_query = elenco_query.filter(Atleta.status_id == status_id)
+
+    if categoria_id:
+        elenco_query = elenco_query.filter(Atleta.categoria_id == categoria_id)
+
+    if posicao_id:
+        elenco_query = elenco_query.filter(Atleta.posicao_id == posicao_id)
+
+    return elenco_query
+
+def carregar_pagina_elenco(projeto_id=None, equipe_id=None, status_id=None, categoria_id=None, posicao_id=None, ordem="asc", limite=LIMITE_PADRAO, cursor=None):
+    """Uma página do elenco ordenada por (sobrenome, id), com filtros opcionais.
+
+    `cursor` é o valor de `proximo_cursor` da página anterior; `ordem` aceita
+    "asc" ou "desc". O custo de cada página não depende de quantas já foram
+    vistas (não há OFFSET).
+    """
+
+    limite = max(1, min(limite or LIMITE_PADRAO, LIMITE_MAXIMO))
+    decrescente = ordem == "desc"
+
+    elenco_query = filtrar_elenco(query_elenco(projeto_id=projeto_id, equipe_id=equipe_id), status_id, categoria_id, posicao_id)
+
+    posicao_cursor = decodificar_cursor(cursor) if cursor else None
+    if posicao_cursor:
+        sobrenome, atleta_id = posicao_cursor
+        if decrescente:
+            elenco_query = elenco_query.filter(or_(SOBRENOME < sobrenome, and_(SOBRENOME == sobrenome, Atleta.id < atleta_id)))
+        else:
+            elenco_query = elenco_query.filter(or_(SOBRENOME > sobrenome, and_(SOBRENOME == sobrenome, Atleta.id > atleta_id)))
+
+    if decrescente:
+        elenco_query = elenco_query.order_by(SOBRENOME.desc(), Atleta.id.desc())
+    else:
+        elenco_query = elenco_query.order_by(SOBRENOME, Atleta.id)
+
+    # Busca um item a mais para saber se existe próxima página
+    rows = elenco_query.limit(limite + 1).all()
+
+    proximo_cursor = None
+    if len(rows) > limite:
+        ultimo = rows[limite - 1]
+        proximo_cursor = codificar_cursor(ultimo.lastname_atleta, ultimo.id)
+
+    return PaginaElenco(itens=[linha_elenco(row) for row in rows[:limite]], proximo_cursor=proximo_cursor)
@@ -0,0 +1,85 @@
+from dataclasses import dataclass, field
+from flask import g
+from flask_login import current_user
+from sqlalchemy import literal, select, union_all, true, false
+from models import *
+
+@dataclass(frozen=True)
+class Escopo:
+    """Projetos e equipes que o usuário pode gerenciar.
+
+    - `projetos`: projetos que ele coordena;
+    - `equipes_coordenadas`: equipes desses projetos;
+    - `equipes_tecnico`: equipes em que ele é o técnico.
+
+    Admin (`todos=True`) enxerga tudo e os conjuntos ficam vazios.
+    """
+
+    todos: bool = False
+    projetos: frozenset = field(default_factory=frozenset)
+    equipes_coordenadas: frozenset = field(default_factory=frozenset)
+    equipes_tecnico: frozenset = field(default_factory=frozenset)
+
+    @property
+    def equipes_gerenciadas(self):
+        return self.equipes_coordenadas | self.equipes_tecnico
+
+    def pode_editar_projeto(self, projeto_id):
+        return self.todos or projeto_id in self.projetos
+
+    def pode_editar_equipe(self, equipe_id):
+        # Editar a equipe em si é só para admin/coordenador do projeto
+        return self.todos or equipe_id in self.equipes_coordenadas
+
+    def pode_gerenciar_equipe(self, equipe_id):
+        # Atletas (e seus endereços) da equipe: coordenador do projeto ou técnico
+        return self.todos or equipe_id in self.equipes_gerenciadas
+
+    def filtro_projetos(self, coluna=Projeto.id):
+        """Condição `coluna IN (projetos coordenados)` para usar em queries."""
+        if self.todos:
+            return true()
+        return coluna.in_(sorted(self.projetos)) if self.projetos else false()
+
+    def filtro_equipes(self, coluna=Equipe.id):
+        """Condição `coluna IN (equipes gerenciadas)` para usar em queries."""
+        if self.todos:
+            return true()
+        equipes = self.equipes_gerenciadas
+        return coluna.in_(sorted(equipes)) if equipes else false()
+
+def carregar_escopo(usuario):
+    """Calcula o escopo do usuário com uma única query (nenhuma para admin)."""
+
+    if usuario.is_admin:
+        return Escopo(todos=True)
+
+    if not (usuario.is_coord or usuario.is_tecnico):
+        return Escopo()
+
+    partes = []
+
+    if usuario.is_coord:
+        projetos_coordenados = select(Projeto.id).where(Projeto.responsavel_id == usuario.id)
+        partes.append(select(literal("projeto").label("tipo"), Projeto.id.label("id")).where(Projeto.responsavel_id == usuario.id))
+        partes.append(select(literal("coordenada").label("tipo"), Equipe.id.label("id")).where(Equipe.projeto_id.in_(projetos_coordenados)))
+
+    if usuario.is_tecnico:
+        partes.append(select(literal("tecnico").label("tipo"), Equipe.id.label("id")).where(Equipe.tecnico_id == usuario.id))
+
+    ids = {"projeto": set(), "coordenada": set(), "tecnico": set()}
+    for tipo, registro_id in db.session.execute(union_all(*partes)):
+        ids[tipo].add(registro_id)
+
+    return Escopo(
+        projetos=frozenset(ids["projeto"]),
+        equipes_coordenadas=frozenset(ids["coordenada"]),
+        equipes_tecnico=frozenset(ids["tecnico"]),
+    )
+
+def escopo_atual():
+    """Escopo do usuário logado, calculado no máximo uma vez por requisição."""
+
+    if "escopo_usuario" not in g:
+        g.escopo_usuario = carregar_escopo(current_user)
+    return g.escopo_usuario
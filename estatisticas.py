@@ -0,0 +1,375 @@
+from collections import defaultdict
+from dataclasses import dataclass
+from sqlalchemy import event, inspect, select, update, delete, insert, func, and_, or_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from busca import condicao_nome
+from tarefas import tarefa
+import referencias
+from models import *
+
+# Nomes de status exibidos nos cards dos dashboards
+STATUS_ATIVO = "ATIVO"
+STATUS_LESIONADO = "LESIONADO"
+STATUS_SUSPENSO = "SUSPENSO"
+
+# Na tabela `estatisticas`, 0 em projeto/equipe/status quer dizer "todos"
+TODOS = 0
+
+@dataclass(frozen=True)
+class DashboardStats:
+    """Contadores (KPIs) exibidos nos cards dos dashboards."""
+
+    n_projetos_ativos: int = 0
+    n_equipes_ativas: int = 0
+    n_atletas: int = 0
+    atletas_ativos: int = 0
+    atletas_lesionados: int = 0
+    atletas_suspensos: int = 0
+
+def carregar_estatisticas(responsavel_id=None, tecnico_id=None):
+    """Lê os KPIs do dashboard da tabela `estatisticas` (uma query por chave primária).
+
+    Sem filtros o resultado é global (admin). `responsavel_id` restringe aos
+    projetos do coordenador e `tecnico_id` às equipes do técnico.
+    """
+
+    tabela = Estatistica.__table__.c
+
+    if tecnico_id is not None:
+        # Linhas das equipes do técnico + linha-resumo dos projetos delas (só para "projetos ativos")
+        equipes = select(Equipe.id).where(Equipe.tecnico_id == tecnico_id)
+        projetos = select(Equipe.projeto_id).where(Equipe.tecnico_id == tecnico_id)
+        condicao = or_(
+            tabela.equipe_id.in_(equipes),
+            and_(tabela.projeto_id.in_(projetos), tabela.equipe_id == TODOS, tabela.status_id == TODOS),
+        )
+    elif responsavel_id is not None:
+        projetos = select(Projeto.id).where(Projeto.responsavel_id == responsavel_id)
+        condicao = and_(tabela.projeto_id.in_(projetos), tabela.equipe_id == TODOS)
+    else:
+        condicao = and_(tabela.projeto_id == TODOS, tabela.equipe_id == TODOS)
+
+    rows = db.session.execute(
+        select(tabela.equipe_id, tabela.status_id, tabela.n_atletas, tabela.n_equipes_ativas, tabela.n_projetos_ativos).where(condicao)
+    ).all()
+
+    projetos_ativos = equipes_ativas = total_atletas = 0
+    por_status = defaultdict(int)
+
+    for equipe_id, status_id, n_atletas, n_equipes, n_projetos in rows:
+        if equipe_id == TODOS and status_id == TODOS:
+            projetos_ativos += n_projetos
+        if tecnico_id is not None and equipe_id == TODOS:
+            continue
+        if status_id == TODOS:
+            total_atletas += n_atletas
+            equipes_ativas += n_equipes
+        else:
+            por_status[referencias.nome("status", status_id)] += n_atletas
+
+    return DashboardStats(
+        n_projetos_ativos=projetos_ativos,
+        n_equipes_ativas=equipes_ativas,
+        n_atletas=total_atletas,
+        atletas_ativos=por_status[STATUS_ATIVO],
+        atletas_lesionados=por_status[STATUS_LESIONADO],
+        atletas_suspensos=por_status[STATUS_SUSPENSO],
+    )
+
+def listar_projetos(responsavel_id=None, q=None, status=None, cidade_id=None):
+    """Lista os projetos com cidade e totais de equipes/atletas em uma única query.
+
+    Aplica os mesmos filtros da tabela de projetos dos dashboards (busca por
+    nome, status ativo/inativo e cidade). `responsavel_id` restringe aos
+    projetos do coordenador. O total de atletas vem da tabela `estatisticas`.
+    """
+
+    n_equipes = (
+        select(func.count(Equipe.id))
+        .where(Equipe.projeto_id == Projeto.id)
+        .correlate(Projeto)
+        .scalar_subquery()
+    )
+    n_atletas = func.coalesce(Estatistica.n_atletas, 0)
+
+    projetos_query = (
+        db.session.query(
+            Projeto.id,
+            Projeto.logo_id,
+            Projeto.nome_projeto,
+            Projeto.is_active,
+            Cidade.nome_cidade,
+            n_equipes,
+            n_atletas,
+        )
+        .join(Cidade, Cidade.id == Projeto.cidade_id)
+        .outerjoin(Estatistica, and_(Estatistica.projeto_id == Projeto.id, Estatistica.equipe_id == TODOS, Estatistica.status_id == TODOS))
+    )
+
+    if responsavel_id is not None:
+        projetos_query = projetos_query.filter(Projeto.responsavel_id == responsavel_id)
+
+    if q:
+        projetos_query = projetos_query.filter(condicao_nome("projeto", q))
+
+    if status == "ativo":
+        projetos_query = projetos_query.filter(Projeto.is_active == True)
+    elif status == "inativo":
+        projetos_query = projetos_query.filter(Projeto.is_active == False)
+
+    if cidade_id:
+        projetos_query = projetos_query.filter(Projeto.cidade_id == cidade_id)
+
+    rows = projetos_query.order_by(Projeto.id).all()
+
+    projetos = []
+    for projeto_id, logo_id, nome_projeto, is_active, nome_cidade, total_equipes, total_atletas in rows:
+        projetos.append({"id":projeto_id, "logo_id":logo_id, "nome":nome_projeto, "cidade":nome_cidade.title(), "n_equipes":total_equipes, "n_atletas":total_atletas, "is_active":bool(is_active)})
+
+    return projetos
+
+def contar_atletas_por_equipe(projeto_id=None, tecnico_id=None, por_status=False):
+    """Conta os atletas de cada equipe lendo a tabela `estatisticas`.
+
+    Retorna {equipe_id: total} ou, com `por_status=True`,
+    {equipe_id: {nome_status: total}}. Equipes sem atletas não aparecem no
+    dicionário (use `.get(equipe_id, 0)`).
+    """
+
+    tabela = Estatistica.__table__.c
+    condicoes = [tabela.equipe_id != TODOS, tabela.n_atletas > 0]
+    condicoes.append(tabela.status_id != TODOS if por_status else tabela.status_id == TODOS)
+
+    if projeto_id is not None:
+        condicoes.append(tabela.projeto_id == projeto_id)
+
+    if tecnico_id is not None:
+        condicoes.append(tabela.equipe_id.in_(select(Equipe.id).where(Equipe.tecnico_id == tecnico_id)))
+
+    rows = db.session.execute(select(tabela.equipe_id, tabela.status_id, tabela.n_atletas).where(*condicoes)).all()
+
+    if not por_status:
+        return {equipe_id: total for equipe_id, _, total in rows}
+
+    contagem = {}
+    for equipe_id, status_id, total in rows:
+        contagem.setdefault(equipe_id, {})[referencias.nome("status", status_id)] = total
+
+    return contagem
+
+# --- Manutenção da tabela `estatisticas` ---
+
+class Deltas:
+    """Variações a aplicar na tabela, já propagadas para os níveis de resumo.
+
+    Cada atleta conta em (projeto, equipe, status) e nos resumos com 0:
+    (projeto, equipe, 0), (projeto, 0, status), (projeto, 0, 0), (0, 0, status)
+    e (0, 0, 0).
+    """
+
+    def __init__(self):
+        self.valores = defaultdict(lambda: [0, 0, 0])
+
+    def _somar(self, chaves, posicao, quantidade):
+        for chave in chaves:
+            self.valores[chave][posicao] += quantidade
+
+    def atletas(self, projeto_id, equipe_id, status_id, quantidade=1):
+        self._somar({
+            (projeto_id, equipe_id, status_id), (projeto_id, equipe_id, TODOS),
+            (projeto_id, TODOS, status_id), (projeto_id, TODOS, TODOS),
+            (TODOS, TODOS, status_id), (TODOS, TODOS, TODOS),
+        }, 0, quantidade)
+
+    def equipe_ativa(self, projeto_id, equipe_id, quantidade=1):
+        self._somar({(projeto_id, equipe_id, TODOS), (projeto_id, TODOS, TODOS), (TODOS, TODOS, TODOS)}, 1, quantidade)
+
+    def projeto_ativo(self, projeto_id, quantidade=1):
+        self._somar({(projeto_id, TODOS, TODOS), (TODOS, TODOS, TODOS)}, 2, quantidade)
+
+    def itens(self):
+        return [(chave, valores) for chave, valores in self.valores.items() if any(valores)]
+
+def _upsert(conexao, linhas):
+    """Soma as variações nas linhas existentes, criando as que faltarem."""
+
+    tabela = Estatistica.__table__
+    colunas = ("n_atletas", "n_equipes_ativas", "n_projetos_ativos")
+
+    insert_dialeto = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}.get(conexao.dialect.name)
+
+    if insert_dialeto is not None:
+        for (projeto_id, equipe_id, status_id), valores in linhas:
+            comando = insert_dialeto(tabela).values(projeto_id=projeto_id, equipe_id=equipe_id, status_id=status_id, **dict(zip(colunas, valores)))
+            conexao.execute(comando.on_conflict_do_update(
+                index_elements=[tabela.c.projeto_id, tabela.c.equipe_id, tabela.c.status_id],
+                set_={coluna: tabela.c[coluna] + comando.excluded[coluna] for coluna in colunas},
+            ))
+        return
+
+    for (projeto_id, equipe_id, status_id), valores in linhas:
+        chave = and_(tabela.c.projeto_id == projeto_id, tabela.c.equipe_id == equipe_id, tabela.c.status_id == status_id)
+        resultado = conexao.execute(update(tabela).where(chave).values({coluna: tabela.c[coluna] + valor for coluna, valor in zip(colunas, valores)}))
+        if resultado.rowcount == 0:
+            conexao.execute(insert(tabela).values(projeto_id=projeto_id, equipe_id=equipe_id, status_id=status_id, **dict(zip(colunas, valores))))
+
+def aplicar_deltas(conexao, deltas):
+    """Grava as variações na mesma transação da conexão informada."""
+    linhas = deltas.itens()
+    if linhas:
+        _upsert(conexao, linhas)
+
+def reconstruir(conexao=None):
+    """Recalcula a tabela `estatisticas` do zero a partir de atletas/equipes/projetos."""
+
+    conexao = conexao or db.session.connection()
+    deltas = Deltas()
+
+    atletas = conexao.execute(
+        select(Equipe.projeto_id, Atleta.equipe_id, Atleta.status_id, func.count(Atleta.id))
+        .join(Equipe, Equipe.id == Atleta.equipe_id)
+        .group_by(Equipe.projeto_id, Atleta.equipe_id, Atleta.status_id)
+    )
+    for projeto_id, equipe_id, status_id, total in atletas:
+        deltas.atletas(projeto_id, equipe_id, status_id, total)
+
+    for projeto_id, equipe_id in conexao.execute(select(Equipe.projeto_id, Equipe.id).where(Equipe.is_active == True)):
+        deltas.equipe_ativa(projeto_id, equipe_id)
+
+    for (projeto_id,) in conexao.execute(select(Projeto.id).where(Projeto.is_active == True)):
+        deltas.projeto_ativo(projeto_id)
+
+    conexao.execute(delete(Estatistica.__table__))
+    linhas = deltas.itens()
+    if linhas:
+        conexao.execute(insert(Estatistica.__table__), [
+            {"projeto_id": p, "equipe_id": e, "status_id": s, "n_atletas": a, "n_equipes_ativas": eq, "n_projetos_ativos": pr}
+            for (p, e, s), (a, eq, pr) in linhas
+        ])
+
+    return len(linhas)
+
+@tarefa("reconciliar_estatisticas")
+def reconciliar_em_segundo_plano():
+    return {"linhas": reconstruir()}
+
+# --- Atualização incremental no flush (mesma transação da alteração) ---
+
+# Colunas que mexem nos contadores; os valores de antes/depois são lidos do
+# banco em volta do flush (o histórico dos atributos não tem o valor antigo
+# quando a FK é alterada por um relacionamento num objeto expirado)
+CAMPOS = {
+    Atleta: (Atleta.equipe_id, Atleta.status_id),
+    Equipe: (Equipe.projeto_id, Equipe.is_active),
+    Projeto: (Projeto.is_active,),
+}
+
+# Atributos cujo histórico indica mudança nos contadores: as colunas de CAMPOS e os
+# relacionamentos que as preenchem (atleta.equipe = ...). O histórico acusa a
+# alteração mesmo sem o valor antigo carregado; outras edições (telefone, nome...)
+# não precisam de SELECT nenhum
+MONITORADOS = {
+    modelo: {coluna.key for coluna in colunas} | {
+        relacao.key for relacao in inspect(modelo).relationships
+        if relacao.local_columns & {coluna.property.columns[0] for coluna in colunas}
+    }
+    for modelo, colunas in CAMPOS.items()
+}
+
+def _alterou_contadores(obj):
+    atributos = inspect(obj).attrs
+    return any(atributos[nome].history.has_changes() for nome in MONITORADOS[type(obj)])
+
+def _alterados(session):
+    return [obj for obj in session.dirty if type(obj) in CAMPOS and _alterou_contadores(obj)]
+
+def _ids_por_modelo(objs):
+    ids = defaultdict(set)
+    for obj in objs:
+        if type(obj) not in CAMPOS:
+            continue
+        # Objetos recém-inseridos ainda não têm `identity` no after_flush
+        estado = inspect(obj)
+        identidade = estado.identity or estado.mapper.primary_key_from_instance(obj)
+        if identidade and identidade[0] is not None:
+            ids[type(obj)].add(identidade[0])
+    return ids
+
+def _ler_valores(conexao, ids):
+    valores = {}
+    for modelo, ids_modelo in ids.items():
+        rows = conexao.execute(select(modelo.id, *CAMPOS[modelo]).where(modelo.id.in_(ids_modelo))).all()
+        valores.update({(modelo, row[0]): tuple(row[1:]) for row in rows})
+    return valores
+
+@event.listens_for(Session, "before_flush")
+def _guardar_valores_anteriores(session, flush_context, instances):
+    ids = _ids_por_modelo((*_alterados(session), *session.deleted))
+    session.info["estatisticas_antes"] = _ler_valores(session.connection(), ids) if ids else {}
+
+@event.listens_for(Session, "after_flush")
+def _atualizar_estatisticas(session, flush_context):
+    antes = session.info.pop("estatisticas_antes", {})
+    # No after_flush o histórico dos atributos ainda é o de antes do flush
+    ids = _ids_por_modelo((*session.new, *_alterados(session), *session.deleted))
+    if not ids:
+        return
+
+    conexao = session.connection()
+    depois = _ler_valores(conexao, ids)
+    deltas = Deltas()
+    removidos = []
+
+    def mudancas(modelo):
+        for registro_id in ids.get(modelo, ()):
+            valor_antes = antes.get((modelo, registro_id))
+            valor_depois = depois.get((modelo, registro_id))
+            if valor_antes != valor_depois:
+                yield registro_id, valor_antes, valor_depois
+
+    for projeto_id, valor_antes, valor_depois in mudancas(Projeto):
+        deltas.projeto_ativo(projeto_id, int(bool(valor_depois and valor_depois[0])) - int(bool(valor_antes and valor_antes[0])))
+        if valor_depois is None:
+            removidos.append(Estatistica.projeto_id == projeto_id)
+
+    for equipe_id, valor_antes, valor_depois in mudancas(Equipe):
+        if valor_antes:
+            deltas.equipe_ativa(valor_antes[0], equipe_id, -1 if valor_antes[1] else 0)
+        if valor_depois:
+            deltas.equipe_ativa(valor_depois[0], equipe_id, 1 if valor_depois[1] else 0)
+
+        if valor_depois is None:
+            removidos.append(Estatistica.equipe_id == equipe_id)
+        elif valor_antes and valor_antes[0] != valor_depois[0]:
+            # Equipe mudou de projeto: leva os contadores atuais junto
+            contagem = conexao.execute(
+                select(Estatistica.status_id, Estatistica.n_atletas)
+                .where(Estatistica.equipe_id == equipe_id, Estatistica.status_id != TODOS)
+            ).all()
+            for status_id, total in contagem:
+                deltas.atletas(valor_antes[0], equipe_id, status_id, -total)
+                deltas.atletas(valor_depois[0], equipe_id, status_id, total)
+
+    atletas = list(mudancas(Atleta))
+    if atletas:
+        # Projeto atual de cada equipe (equipes excluídas neste flush: valor anterior)
+        ids_equipes = {valor[0] for _, *valores in atletas for valor in valores if valor}
+        projeto_da_equipe = {equipe_id: valor[0] for (modelo, equipe_id), valor in antes.items() if modelo is Equipe}
+        projeto_da_equipe.update(conexao.execute(select(Equipe.id, Equipe.projeto_id).where(Equipe.id.in_(ids_equipes))).all())
+
+        for _, valor_antes, valor_depois in atletas:
+            if valor_antes:
+                deltas.atletas(projeto_da_equipe[valor_antes[0]], valor_antes[0], valor_antes[1], -1)
+            if valor_depois:
+                deltas.atletas(projeto_da_equipe[valor_depois[0]], valor_depois[0], valor_depois[1], 1)
+
+    aplicar_deltas(conexao, deltas)
+
+    # Linhas de equipes/projetos excluídos (já zeradas pelos deltas acima)
+    if removidos:
+        conexao.execute(delete(Estatistica.__table__).where(or_(*removidos)))
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_valores_anteriores(session):
+    session.info.pop("estatisticas_antes", None)
@@ -0,0 +1,157 @@
+import csv
+import io
+import tempfile
+from flask import Response, stream_with_context
+from openpyxl import Workbook
+from sqlalchemy.orm import aliased
+from elenco import SOBRENOME, query_elenco, filtrar_elenco, linha_elenco
+from feed_transferencias import query_transferencias
+from models import *
+
+FORMATOS = ("csv", "xlsx")
+
+# Linhas buscadas do banco por vez (cursor no servidor onde o driver suporta)
+LOTE_BANCO = 1000
+# Tamanho aproximado de cada pedaço enviado na resposta
+BLOCO_RESPOSTA = 64 * 1024
+
+FORMATO_DATA = "%d/%m/%Y %H:%M"
+
+COLUNAS_ELENCO = [
+    ("ID", "id"), ("Nome", "nome_atleta"), ("Sobrenome", "sobrenome_atleta"),
+    ("Projeto", "projeto"), ("Equipe", "equipe"), ("Modalidade", "modalidade"),
+    ("Posição", "posicao"), ("Categoria", "categoria"), ("Nível", "nivel"), ("Status", "status"),
+]
+
+CABECALHO_TRANSFERENCIAS = ["ID", "Data", "Atleta", "Projeto de origem", "Equipe de origem", "Projeto de destino", "Equipe de destino", "Responsável"]
+CABECALHO_HISTORICO = ["ID", "Data", "Atleta", "Projeto", "Equipe", "Status", "Motivo", "Responsável"]
+
+def _nome(firstname, lastname):
+    return f"{firstname} {lastname or ''}".strip().title()
+
+def _data(valor):
+    return valor.strftime(FORMATO_DATA) if valor else ""
+
+# --- Linhas (geradores: uma linha por vez, nunca a lista inteira) ---
+
+def linhas_elenco(projeto_id=None, equipe_id=None, status_id=None, categoria_id=None, posicao_id=None, ordem="asc"):
+    """Elenco com os mesmos filtros e ordem (sobrenome, id) das telas de projeto/equipe."""
+
+    elenco_query = filtrar_elenco(query_elenco(projeto_id=projeto_id, equipe_id=equipe_id), status_id, categoria_id, posicao_id)
+
+    if ordem == "desc":
+        elenco_query = elenco_query.order_by(SOBRENOME.desc(), Atleta.id.desc())
+    else:
+        elenco_query = elenco_query.order_by(SOBRENOME, Atleta.id)
+
+    for row in elenco_query.yield_per(LOTE_BANCO):
+        atleta = linha_elenco(row)
+        yield [atleta[chave] for _, chave in COLUNAS_ELENCO]
+
+def linhas_transferencias(responsavel_id=None, tecnico_id=None):
+    """Transferências em ordem cronológica, com os filtros do feed dos dashboards."""
+
+    feed_query = query_transferencias(responsavel_id=responsavel_id, tecnico_id=tecnico_id).order_by(Transferencia.id)
+
+    for row in feed_query.yield_per(LOTE_BANCO):
+        yield [
+            row.id, _data(row.created_at), _nome(row.firstname_atleta, row.lastname_atleta),
+            row.proj_origem, row.eq_origem, row.proj_destino, row.eq_destino,
+            _nome(row.firstname_usuario, row.lastname_usuario),
+        ]
+
+def linhas_historico(escopo, projeto_id=None, equipe_id=None):
+    """Histórico dos atletas registrado nas equipes do `escopo`, em ordem cronológica."""
+
+    EquipeHistorico = aliased(Equipe)
+
+    historico_query = (
+        db.session.query(
+            AtletaHistorico.id,
+            AtletaHistorico.created_at,
+            Atleta.firstname_atleta,
+            Atleta.lastname_atleta,
+            Projeto.nome_projeto,
+            EquipeHistorico.nome_equipe,
+            Status.nome_status,
+            AtletaHistorico.motivo,
+            Usuario.firstname_usuario,
+            Usuario.lastname_usuario,
+        )
+        .join(Atleta, Atleta.id == AtletaHistorico.atleta_id)
+        .join(Projeto, Projeto.id == AtletaHistorico.projeto_id)
+        .join(EquipeHistorico, EquipeHistorico.id == AtletaHistorico.equipe_id)
+        .join(Status, Status.id == AtletaHistorico.status_id)
+        .join(Usuario, Usuario.id == AtletaHistorico.responsavel_id)
+        .filter(escopo.filtro_equipes(AtletaHistorico.equipe_id))
+    )
+
+    if projeto_id is not None:
+        historico_query = historico_query.filter(AtletaHistorico.projeto_id == projeto_id)
+
+    if equipe_id is not None:
+        historico_query = historico_query.filter(AtletaHistorico.equipe_id == equipe_id)
+
+    rows = historico_query.order_by(AtletaHistorico.id).yield_per(LOTE_BANCO)
+    for historico_id, created_at, firstname, lastname, projeto, equipe, status, motivo, responsavel_nome, responsavel_sobrenome in rows:
+        yield [
+            historico_id, _data(created_at), _nome(firstname, lastname), projeto, equipe,
+            status.title(), motivo or "", _nome(responsavel_nome, responsavel_sobrenome),
+        ]
+
+# --- Formatos ---
+
+def _gerar_csv(cabecalho, linhas):
+    # ";" e BOM: o Excel em português abre direto (mesmo padrão da importação)
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer, delimiter=";")
+
+    buffer.write("\ufeff")
+    escritor.writerow(cabecalho)
+
+    for linha in linhas:
+        escritor.writerow(linha)
+        if buffer.tell() >= BLOCO_RESPOSTA:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue()
+
+def _gerar_xlsx(titulo, cabecalho, linhas):
+    # Modo write_only grava as linhas em disco; o arquivo final é enviado em pedaços
+    planilha = Workbook(write_only=True)
+    aba = planilha.create_sheet(title=titulo[:31])
+    aba.append(cabecalho)
+    for linha in linhas:
+        aba.append(linha)
+
+    with tempfile.TemporaryFile() as arquivo:
+        planilha.save(arquivo)
+        arquivo.seek(0)
+        while bloco := arquivo.read(BLOCO_RESPOSTA):
+            yield bloco
+
+def resposta_exportacao(nome_arquivo, cabecalho, linhas, formato="csv"):
+    """Response em streaming (CSV ou XLSX); a memória não cresce com o número de linhas.
+
+    `linhas` é um gerador; ele só é consumido enquanto a resposta é enviada,
+    dentro do contexto da requisição. Levanta ValueError para formato
+    inválido.
+    """
+
+    if formato not in FORMATOS:
+        raise ValueError("Formato de exportação inválido.")
+
+    if formato == "xlsx":
+        corpo = _gerar_xlsx(nome_arquivo, cabecalho, linhas)
+        mimetype = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    else:
+        corpo = _gerar_csv(cabecalho, linhas)
+        mimetype = "text/csv"
+
+    return Response(
+        stream_with_context(corpo),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename={nome_arquivo}.{formato}"},
+    )
@@ -0,0 +1,96 @@
+from dataclasses import dataclass, field
+from sqlalchemy import or_
+from sqlalchemy.orm import aliased
+from models import *
+
+# Tamanho padrão do bloco de "Atividades recentes" dos dashboards
+LIMITE_PADRAO = 5
+LIMITE_MAXIMO = 50
+
+@dataclass(frozen=True)
+class PaginaTransferencias:
+    """Uma página do feed de transferências (keyset em Transferencia.id)."""
+
+    itens: list = field(default_factory=list)
+    proximo_cursor: int | None = None
+
+def query_transferencias(responsavel_id=None, tecnico_id=None):
+    """Query das transferências com projetos, equipes, atleta e responsável resolvidos (joins).
+
+    `responsavel_id` restringe às transferências que envolvem projetos do
+    coordenador e `tecnico_id` às que envolvem equipes do técnico. Usada pelo
+    feed dos dashboards e pela exportação.
+    """
+
+    ProjetoOrigem = aliased(Projeto)
+    ProjetoDestino = aliased(Projeto)
+    EquipeOrigem = aliased(Equipe)
+    EquipeDestino = aliased(Equipe)
+
+    feed_query = (
+        db.session.query(
+            Transferencia.id.label("id"),
+            Transferencia.created_at.label("created_at"),
+            ProjetoOrigem.nome_projeto.label("proj_origem"),
+            EquipeOrigem.nome_equipe.label("eq_origem"),
+            ProjetoDestino.nome_projeto.label("proj_destino"),
+            EquipeDestino.nome_equipe.label("eq_destino"),
+            Atleta.firstname_atleta.label("firstname_atleta"),
+            Atleta.lastname_atleta.label("lastname_atleta"),
+            Usuario.firstname_usuario.label("firstname_usuario"),
+            Usuario.lastname_usuario.label("lastname_usuario"),
+        )
+        .join(ProjetoOrigem, ProjetoOrigem.id == Transferencia.projeto_origem_id)
+        .join(EquipeOrigem, EquipeOrigem.id == Transferencia.equipe_origem_id)
+        .join(ProjetoDestino, ProjetoDestino.id == Transferencia.projeto_destino_id)
+        .join(EquipeDestino, EquipeDestino.id == Transferencia.equipe_destino_id)
+        .join(Atleta, Atleta.id == Transferencia.atleta_id)
+        .join(Usuario, Usuario.id == Transferencia.responsavel_id)
+    )
+
+    if responsavel_id is not None:
+        feed_query = feed_query.filter(or_(
+            ProjetoOrigem.responsavel_id == responsavel_id,
+            ProjetoDestino.responsavel_id == responsavel_id
+        ))
+
+    if tecnico_id is not None:
+        feed_query = feed_query.filter(or_(
+            EquipeOrigem.tecnico_id == tecnico_id,
+            EquipeDestino.tecnico_id == tecnico_id
+        ))
+
+    return feed_query
+
+def carregar_transferencias(responsavel_id=None, tecnico_id=None, limite=LIMITE_PADRAO, cursor=None):
+    """Monta o feed de transferências com todos os nomes resolvidos em uma única query.
+
+    Filtros como em `query_transferencias`. `cursor` é o id da última
+    transferência já exibida (retorna apenas ids menores).
+    """
+
+    limite = max(1, min(limite or LIMITE_PADRAO, LIMITE_MAXIMO))
+
+    feed_query = query_transferencias(responsavel_id=responsavel_id, tecnico_id=tecnico_id)
+
+    if cursor is not None:
+        feed_query = feed_query.filter(Transferencia.id < cursor)
+
+    # Busca um item a mais para saber se existe próxima página
+    rows = feed_query.order_by(Transferencia.id.desc()).limit(limite + 1).all()
+
+    itens = []
+    for row in rows[:limite]:
+        itens.append({
+            "id": row.id,
+            "proj_origem": row.proj_origem,
+            "eq_origem": row.eq_origem,
+            "proj_destino": row.proj_destino,
+            "eq_destino": row.eq_destino,
+            "nome_atleta": row.firstname_atleta.title(),
+            "responsavel": row.firstname_usuario.title(),
+        })
+
+    proximo_cursor = itens[-1]["id"] if len(rows) > limite else None
+
+    return PaginaTransferencias(itens=itens, proximo_cursor=proximo_cursor)
@@ -0,0 +1,239 @@
+from flask import Response, abort, current_app, g, url_for
+from werkzeug.utils import secure_filename
+from sqlalchemy.orm import undefer
+from tarefas import tarefa, enfileirar
+from models import *
+import hashlib
+import io
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # Pillow é opcional: sem ele as imagens são salvas como enviadas
+    Image = None
+
+# Cache de um ano para URLs versionadas (/imagens/<id>?v=<hash>)
+MAX_AGE_VERSIONADA = 365 * 24 * 60 * 60
+
+# Maior lado (px) de cada versão gerada no upload
+TAMANHO_FULL = 1600
+TAMANHOS_VARIANTES = {
+    "card": 800,   # feed do blog, cabeçalhos de projeto/equipe
+    "thumb": 96,   # logos de 36px nas tabelas (2x para telas retina)
+}
+
+FORMATO_VARIANTES = "WEBP" if Image is not None and features.check("webp") else "JPEG"
+MIMETYPE_VARIANTES = f"image/{FORMATO_VARIANTES.lower()}"
+QUALIDADE_VARIANTES = 82
+
+def carregar_versoes_imagens(ids):
+    """Busca em uma única query o hash das imagens que a página vai exibir.
+
+    Os hashes ficam guardados em `g` e são usados por `url_imagem` para
+    gerar URLs versionadas (cacheáveis indefinidamente pelo navegador).
+    """
+
+    versoes = g.setdefault("versoes_imagens", {})
+    faltando = {imagem_id for imagem_id in ids if imagem_id and imagem_id not in versoes}
+
+    if faltando:
+        versoes.update(
+            db.session.query(Imagem.id, Imagem.hash)
+            .filter(Imagem.id.in_(faltando))
+            .all()
+        )
+
+    return versoes
+
+def url_imagem(imagem_id, tamanho=None):
+    """URL da imagem (ou de uma variante), versionada pelo hash quando ele já foi carregado."""
+    versao = g.get("versoes_imagens", {}).get(imagem_id)
+    return url_for("get_image", id=imagem_id, tamanho=tamanho, v=versao)
+
+def obter_armazenamento():
+    return current_app.extensions.get("armazenamento")
+
+def _gravar_bytes(destino, dados):
+    """Grava `dados` em uma Imagem/ImagemVariante, no banco ou no armazenamento."""
+
+    armazenamento = obter_armazenamento()
+
+    if armazenamento is None:
+        destino.img = dados
+    else:
+        chave = hashlib.sha256(dados).hexdigest()
+        armazenamento.salvar(chave, dados)
+        destino.img = None
+        destino.hash = chave
+
+def gerar_variantes(dados, tamanhos=None):
+    """Decodifica a imagem uma única vez e gera as versões redimensionadas.
+
+    Retorna {tamanho: (bytes, mimetype, largura, altura)} para "full" e
+    para cada tamanho de TAMANHOS_VARIANTES (ou só para os `tamanhos`
+    pedidos), já sem metadados EXIF. Retorna None quando o Pillow não está
+    instalado ou o arquivo não é uma imagem.
+    """
+
+    if Image is None:
+        return None
+
+    try:
+        original = Image.open(io.BytesIO(dados))
+        # JPEG: deixa o decoder já reduzir a escala (bem mais rápido em fotos grandes)
+        original.draft("RGB", (TAMANHO_FULL, TAMANHO_FULL))
+        original = ImageOps.exif_transpose(original)
+        original.load()
+    except Exception:
+        return None
+
+    # WEBP preserva transparência; JPEG precisa de fundo branco
+    if original.mode in ("RGBA", "LA", "P", "PA"):
+        original = original.convert("RGBA")
+        if FORMATO_VARIANTES == "JPEG":
+            fundo = Image.new("RGB", original.size, (255, 255, 255))
+            fundo.paste(original, mask=original.split()[-1])
+            original = fundo
+    elif original.mode != "RGB":
+        original = original.convert("RGB")
+
+    lados = {"full": TAMANHO_FULL, **TAMANHOS_VARIANTES}
+    if tamanhos is not None:
+        lados = {tamanho: lado for tamanho, lado in lados.items() if tamanho in tamanhos}
+
+    variantes = {}
+    atual = original
+
+    # Do maior para o menor: cada redução parte da anterior, já menor
+    for tamanho, lado in sorted(lados.items(), key=lambda item: -item[1]):
+        atual = atual.copy()
+        atual.thumbnail((lado, lado), Image.LANCZOS)
+
+        # Salvar sem passar exif= descarta os metadados (GPS, câmera...)
+        saida = io.BytesIO()
+        atual.save(saida, format=FORMATO_VARIANTES, quality=QUALIDADE_VARIANTES)
+        variantes[tamanho] = (saida.getvalue(), MIMETYPE_VARIANTES, atual.width, atual.height)
+
+    return variantes
+
+def _gravar_variantes(imagem, variantes):
+    for tamanho, (dados_variante, mimetype_variante, largura, altura) in variantes.items():
+        variante = ImagemVariante(imagem_id=imagem.id, tamanho=tamanho, mimetype=mimetype_variante, largura=largura, altura=altura)
+        _gravar_bytes(variante, dados_variante)
+        db.session.add(variante)
+
+    db.session.flush()
+    return len(variantes)
+
+def _gravar_versoes(imagem, dados, mimetype, com_variantes=True):
+    # Normaliza o original e substitui as variantes (as antigas são da versão anterior)
+    variantes = gerar_variantes(dados, None if com_variantes else ("full",))
+
+    if variantes is None:
+        # Sem Pillow (ou arquivo não decodificável): guarda como enviado
+        imagem.mimetype = mimetype
+        _gravar_bytes(imagem, dados)
+    else:
+        dados_full, imagem.mimetype, _, _ = variantes.pop("full")
+        _gravar_bytes(imagem, dados_full)
+
+    db.session.flush()
+
+    ImagemVariante.query.filter_by(imagem_id=imagem.id).delete()
+
+    return _gravar_variantes(imagem, variantes or {})
+
+def salvar_imagem(file, imagem=None):
+    """Grava o arquivo enviado em uma Imagem nova (ou na `imagem` informada).
+
+    A imagem é normalizada (no máximo TAMANHO_FULL px, sem EXIF) e as
+    variantes menores são geradas no mesmo passo. Com um backend de
+    armazenamento configurado os bytes vão para ele, endereçados pelo hash,
+    e as colunas `img` ficam vazias. Com IMAGENS_EM_SEGUNDO_PLANO só o
+    original normalizado é gravado aqui (o EXIF nunca fica público) e as
+    variantes viram uma tarefa; até lá as páginas usam o original.
+    """
+
+    dados = file.read()
+
+    if imagem is None:
+        imagem = Imagem()
+        db.session.add(imagem)
+
+    imagem.name = secure_filename(file.filename)
+
+    em_segundo_plano = current_app.config.get("IMAGENS_EM_SEGUNDO_PLANO")
+    _gravar_versoes(imagem, dados, file.mimetype, com_variantes=not em_segundo_plano)
+
+    if em_segundo_plano:
+        enfileirar("processar_imagem", imagem_id=imagem.id)
+
+    return imagem
+
+@tarefa("processar_imagem")
+def processar_imagem(imagem_id):
+    """Gera as variantes de uma imagem cujo original já foi normalizado no upload."""
+
+    imagem = Imagem.query.options(undefer(Imagem.img)).filter_by(id=imagem_id).first()
+
+    # Removida, ou já processada por uma execução anterior desta tarefa
+    if imagem is None or ImagemVariante.query.filter_by(imagem_id=imagem.id).first() is not None:
+        return {"variantes": 0}
+
+    dados = imagem.img
+    if dados is None:
+        dados = obter_armazenamento().ler(imagem.hash)
+
+    return {"variantes": _gravar_variantes(imagem, gerar_variantes(dados, TAMANHOS_VARIANTES) or {})}
+
+def resposta_imagem(imagem):
+    """Monta a resposta com os bytes da imagem (ou variante), venham do banco ou do armazenamento."""
+
+    dados = imagem.img
+
+    if dados is not None:
+        return Response(dados, mimetype=imagem.mimetype)
+
+    armazenamento = obter_armazenamento()
+    if armazenamento is None or not imagem.hash:
+        abort(404)
+
+    return armazenamento.resposta(imagem.hash, imagem.mimetype)
+
+def migrar_imagens_para_armazenamento(lote=50):
+    """Move os bytes de `imagens.img` (e das variantes) para o armazenamento configurado, em lotes.
+
+    Cada lote é carregado, gravado no backend e confirmado antes do próximo,
+    então a memória usada depende só do tamanho do lote.
+    """
+
+    armazenamento = obter_armazenamento()
+    if armazenamento is None:
+        raise RuntimeError("Nenhum armazenamento configurado (ARMAZENAMENTO_IMAGENS).")
+
+    movidas = 0
+    for modelo in (Imagem, ImagemVariante):
+        ultimo_id = 0
+        while True:
+            ids = [
+                registro_id for (registro_id,) in (
+                    db.session.query(modelo.id)
+                    .filter(modelo.id > ultimo_id, modelo.img.isnot(None))
+                    .order_by(modelo.id)
+                    .limit(lote)
+                    .all()
+                )
+            ]
+
+            if not ids:
+                break
+
+            for registro in modelo.query.options(undefer(modelo.img)).filter(modelo.id.in_(ids)).all():
+                _gravar_bytes(registro, registro.img)
+
+            db.session.commit()
+            db.session.expunge_all()
+
+            movidas += len(ids)
+            ultimo_id = ids[-1]
+
+    return movidas
@@ -0,0 +1,382 @@
+import csv
+import itertools
+import zipfile
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from openpyxl import load_workbook
+from openpyxl.utils.exceptions import InvalidFileException
+from sqlalchemy import insert, select, or_
+from sqlalchemy.exc import IntegrityError
+from werkzeug.datastructures import MultiDict
+from busca import normalizar
+from estatisticas import Deltas, aplicar_deltas
+import referencias
+from models import *
+
+# Linhas gravadas por transação
+LOTE_PADRAO = 500
+# Erros guardados no relatório (as linhas com erro continuam sendo contadas)
+MAX_ERROS = 1000
+
+MOTIVO_HISTORICO = "Adicionado à equipe (importação)"
+
+# Cabeçalho do arquivo modelo (/importar/atletas/modelo.csv)
+CABECALHO_MODELO = [
+    "nome", "sobrenome", "email", "data_nascimento", "telefone1", "telefone2",
+    "rg", "cpf", "registro_cuca", "registro_cbv", "sexo", "modalidade",
+    "posicao", "categoria", "nivel", "status", "equipe",
+    "logradouro", "numero", "complemento", "bairro", "cidade", "cep",
+]
+
+# Coluna da planilha (normalizada: minúsculas, sem acento, "_" no lugar de espaço) -> campo
+COLUNAS = {coluna: coluna for coluna in CABECALHO_MODELO}
+COLUNAS.update({
+    "data_de_nascimento": "data_nascimento",
+    "telefone": "telefone1",
+    "cuca": "registro_cuca",
+    "cbv": "registro_cbv",
+})
+
+# Campo de referência -> (tabela em referencias.py, campo do AtletaForm)
+REFERENCIAS = {
+    "sexo": ("sexo", "sexo_id"),
+    "modalidade": ("modalidade", "modalidade_id"),
+    "posicao": ("posicao", "posicao_id"),
+    "categoria": ("categoria", "categoria_id"),
+    "nivel": ("nivel", "nivel_id"),
+    "status": ("status", "status_id"),
+}
+
+CAMPOS_TEXTO = ("firstname_atleta", "lastname_atleta", "email", "data_nascimento", "telefone1", "telefone2", "rg", "cpf", "registro_cuca", "registro_cbv")
+CAMPOS_ENDERECO = ("logradouro", "numero", "complemento", "bairro", "cidade", "cep")
+
+@dataclass
+class RelatorioImportacao:
+    """Resultado da importação: totais e erros por linha do arquivo."""
+
+    total: int = 0
+    importados: int = 0
+    com_erro: int = 0
+    erros: list = field(default_factory=list)
+
+    def registrar_erro(self, linha, mensagens):
+        self.com_erro += 1
+        if len(self.erros) < MAX_ERROS:
+            self.erros.append({"linha": linha, "erros": mensagens})
+
+# --- Leitura do arquivo (linha a linha) ---
+
+def _decodificar(linha):
+    # CSV salvo pelo Excel em português costuma vir em cp1252
+    try:
+        return linha.decode("utf-8")
+    except UnicodeDecodeError:
+        return linha.decode("cp1252")
+
+def _linhas_csv(arquivo):
+    linhas = (_decodificar(linha) for linha in arquivo)
+    primeira = next(linhas, "").lstrip("\ufeff")
+    delimitador = ";" if primeira.count(";") > primeira.count(",") else ","
+    return csv.reader(itertools.chain([primeira], linhas), delimiter=delimitador)
+
+def _linhas_xlsx(arquivo):
+    try:
+        planilha = load_workbook(arquivo, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, InvalidFileException, KeyError):
+        raise ValueError("Não foi possível ler o arquivo .xlsx; confira se ele é uma planilha válida.")
+    try:
+        yield from planilha.active.iter_rows(values_only=True)
+    finally:
+        planilha.close()
+
+def ler_planilha(arquivo, nome_arquivo):
+    """Gera (número da linha, {campo: valor}) lendo um CSV ou XLSX aos poucos.
+
+    Colunas desconhecidas são ignoradas; levanta ValueError se o arquivo não
+    tiver as colunas obrigatórias.
+    """
+
+    extensao = (nome_arquivo or "").rsplit(".", 1)[-1].lower()
+    if extensao not in ("csv", "xlsx"):
+        raise ValueError("Envie um arquivo .csv ou .xlsx.")
+
+    linhas = _linhas_xlsx(arquivo) if extensao == "xlsx" else _linhas_csv(arquivo)
+    cabecalho = next(linhas, None) or []
+    campos = [COLUNAS.get(normalizar(str(coluna or "")).replace(" ", "_")) for coluna in cabecalho]
+
+    faltando = [coluna for coluna in ("nome", "data_nascimento", "telefone1", "rg", "cpf") if coluna not in campos]
+    if faltando:
+        raise ValueError(f"Colunas obrigatórias ausentes: {', '.join(faltando)}.")
+
+    for numero, valores in enumerate(linhas, start=2):
+        if all(valor in (None, "") for valor in valores):
+            continue
+        yield numero, {campo: valor for campo, valor in zip(campos, valores) if campo}
+
+# --- Validação ---
+
+def _texto(valor):
+    if valor is None:
+        return ""
+    if isinstance(valor, datetime):
+        return valor.date().isoformat()
+    if isinstance(valor, date):
+        return valor.isoformat()
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return str(valor).strip()
+
+def _data_iso(texto):
+    # Aceita também o formato brasileiro (dd/mm/aaaa)
+    try:
+        return datetime.strptime(texto, "%d/%m/%Y").date().isoformat()
+    except ValueError:
+        return texto
+
+@dataclass
+class Mapas:
+    """Nomes -> ids das tabelas de referência e das equipes que o usuário pode usar."""
+
+    referencias: dict
+    cidades: dict
+    equipes: dict
+    projeto_da_equipe: dict
+    ids_referencias: dict
+    ids_cidades: dict
+
+def carregar_mapas(escopo):
+    # Lidas direto do banco (uma query por tabela por importação): o cache pode
+    # não ter ainda registros criados em outro processo
+    tabelas = {tabela: referencias.nomes(tabela, usar_cache=False) for tabela, _ in REFERENCIAS.values()}
+    mapas_referencias = {
+        tabela: {normalizar(nome): registro_id for registro_id, nome in nomes.items()}
+        for tabela, nomes in tabelas.items()
+    }
+    ids_cidades = referencias.cidades(usar_cache=False)
+    cidades = {normalizar(nome_cidade): cidade_id for cidade_id, (nome_cidade, _) in ids_cidades.items()}
+
+    rows = db.session.query(Equipe.id, Equipe.nome_equipe, Equipe.projeto_id).filter(escopo.filtro_equipes()).all()
+    equipes = {normalizar(nome_equipe): equipe_id for equipe_id, nome_equipe, _ in rows}
+    projeto_da_equipe = {equipe_id: projeto_id for equipe_id, _, projeto_id in rows}
+
+    return Mapas(mapas_referencias, cidades, equipes, projeto_da_equipe, tabelas, ids_cidades)
+
+def _resolver(mapa, ids_validos, valor):
+    """Id pelo nome (sem acento/maiúsculas) ou pelo próprio id; None se não achar."""
+    if not valor:
+        return None
+    registro_id = mapa.get(normalizar(valor))
+    if registro_id is None and valor.isdigit() and int(valor) in ids_validos:
+        registro_id = int(valor)
+    return registro_id
+
+def _mensagens(form, ignorar=()):
+    # Campos em `ignorar` já têm uma mensagem melhor ("... não encontrado")
+    return [f"{form[campo].label.text}: {mensagem}" for campo, mensagens in form.errors.items() if campo not in ignorar for mensagem in mensagens]
+
+def validar_linha(valores, mapas, formularios, normalizar_digitos, equipe_padrao_id=None):
+    """Valida uma linha com as regras do AtletaForm/EnderecoAtletaForm.
+
+    Retorna (atleta, endereco, erros); `atleta` e `endereco` são dicts prontos
+    para inserir (endereco None se a linha não tiver endereço).
+    """
+
+    form_atleta, form_endereco = formularios
+    textos = {campo: _texto(valores.get(campo)) for campo in (*CAMPOS_TEXTO, *REFERENCIAS, "equipe", *CAMPOS_ENDERECO)}
+    textos["firstname_atleta"] = _texto(valores.get("nome"))
+    textos["lastname_atleta"] = _texto(valores.get("sobrenome"))
+    textos["data_nascimento"] = _data_iso(textos["data_nascimento"])
+
+    for campo in ("telefone1", "telefone2", "rg", "cpf"):
+        textos[campo] = normalizar_digitos(textos[campo])
+    # CPF lido como número do XLSX perde os zeros à esquerda
+    if isinstance(valores.get("cpf"), (int, float)):
+        textos["cpf"] = textos["cpf"].zfill(11)
+
+    erros = []
+    dados = {campo: textos[campo] for campo in CAMPOS_TEXTO}
+    escolhidos = {}
+    nao_encontrados = set()
+
+    equipe_id = _resolver(mapas.equipes, mapas.projeto_da_equipe, textos["equipe"]) if textos["equipe"] else equipe_padrao_id
+    if textos["equipe"] and equipe_id is None:
+        erros.append(f"Equipe: '{textos['equipe']}' não encontrada.")
+        nao_encontrados.add("equipe_id")
+    escolhidos["equipe_id"] = equipe_id
+
+    for campo, (tabela, campo_form) in REFERENCIAS.items():
+        registro_id = _resolver(mapas.referencias[tabela], mapas.ids_referencias[tabela], textos[campo])
+        if textos[campo] and registro_id is None:
+            erros.append(f"{campo.title()}: '{textos[campo]}' não encontrado.")
+            nao_encontrados.add(campo_form)
+        escolhidos[campo_form] = registro_id
+
+    form = form_atleta(formdata=MultiDict({**dados, **{campo: str(valor or "") for campo, valor in escolhidos.items()}}), meta={"csrf": False})
+    for campo, valor in escolhidos.items():
+        # O id já foi conferido acima; a escolha única só satisfaz o SelectField
+        form[campo].choices = [(valor, "")] if valor else []
+
+    # O DataRequired apaga o erro de formato; a mensagem fica mais clara aqui
+    if textos["data_nascimento"] and form.data_nascimento.data is None:
+        erros.append(f"Data de Nascimento: '{textos['data_nascimento']}' não é uma data válida (use dd/mm/aaaa).")
+        nao_encontrados.add("data_nascimento")
+
+    if not form.validate():
+        erros.extend(_mensagens(form, nao_encontrados))
+
+    endereco = None
+    if any(textos[campo] for campo in CAMPOS_ENDERECO):
+        cidade_id = _resolver(mapas.cidades, mapas.ids_cidades, textos["cidade"].split(" - ")[0])
+        if textos["cidade"] and cidade_id is None:
+            erros.append(f"Cidade: '{textos['cidade']}' não encontrada.")
+            nao_encontrados.add("cidade_id")
+
+        form_end = form_endereco(formdata=MultiDict({**{campo: textos[campo] for campo in CAMPOS_ENDERECO}, "cidade_id": str(cidade_id or "")}), meta={"csrf": False})
+        form_end.cidade_id.choices = [(cidade_id, "")] if cidade_id else []
+
+        if not form_end.validate():
+            erros.extend(_mensagens(form_end, nao_encontrados))
+
+        endereco = {
+            "logradouro": textos["logradouro"].upper(),
+            "numero": textos["numero"],
+            "complemento": textos["complemento"].upper(),
+            "bairro": textos["bairro"].upper(),
+            "cidade_id": cidade_id,
+            "cep": normalizar_digitos(textos["cep"]),
+        }
+
+    if erros:
+        return None, None, erros
+
+    # Mesmas transformações do criar_atleta
+    atleta = {
+        **dados,
+        **escolhidos,
+        "firstname_atleta": dados["firstname_atleta"].upper(),
+        "lastname_atleta": dados["lastname_atleta"].upper(),
+        "email": dados["email"].lower(),
+        "data_nascimento": form.data_nascimento.data,
+    }
+    return atleta, endereco, []
+
+# --- Gravação em lotes ---
+
+def _gravar(lote, mapas, responsavel_id):
+    atletas = [atleta for _, atleta, _ in lote]
+    db.session.execute(insert(Atleta), atletas)
+
+    # Ids pelos CPFs (índice único): funciona igual com e sem RETURNING
+    ids = dict(db.session.execute(select(Atleta.cpf, Atleta.id).where(Atleta.cpf.in_([atleta["cpf"] for atleta in atletas]))).all())
+
+    enderecos = []
+    historicos = []
+    deltas = Deltas()
+
+    for _, atleta, endereco in lote:
+        atleta_id = ids[atleta["cpf"]]
+        projeto_id = mapas.projeto_da_equipe[atleta["equipe_id"]]
+
+        if endereco:
+            enderecos.append({**endereco, "atleta_id": atleta_id})
+
+        historicos.append({
+            "atleta_id": atleta_id,
+            "projeto_id": projeto_id,
+            "equipe_id": atleta["equipe_id"],
+            "status_id": atleta["status_id"],
+            "motivo": MOTIVO_HISTORICO,
+            "responsavel_id": responsavel_id,
+        })
+        deltas.atletas(projeto_id, atleta["equipe_id"], atleta["status_id"])
+
+    if enderecos:
+        db.session.execute(insert(AtletaEndereco), enderecos)
+    db.session.execute(insert(AtletaHistorico), historicos)
+
+    # Insert em massa não passa pelo flush: atualiza os contadores aqui
+    aplicar_deltas(db.session.connection(), deltas)
+
+def _gravar_lote(lote, mapas, responsavel_id, relatorio):
+    # Documentos que já existem no banco viram erro da linha (uma query por lote)
+    cpfs = [atleta["cpf"] for _, atleta, _ in lote]
+    rgs = [atleta["rg"] for _, atleta, _ in lote]
+    existentes = db.session.execute(select(Atleta.cpf, Atleta.rg).where(or_(Atleta.cpf.in_(cpfs), Atleta.rg.in_(rgs)))).all()
+    cpfs_existentes = {cpf for cpf, _ in existentes}
+    rgs_existentes = {rg for _, rg in existentes}
+
+    validos = []
+    for numero, atleta, endereco in lote:
+        erros = []
+        if atleta["cpf"] in cpfs_existentes:
+            erros.append("CPF: já cadastrado.")
+        if atleta["rg"] in rgs_existentes:
+            erros.append("RG: já cadastrado.")
+        if erros:
+            relatorio.registrar_erro(numero, erros)
+        else:
+            validos.append((numero, atleta, endereco))
+
+    if not validos:
+        return
+
+    try:
+        _gravar(validos, mapas, responsavel_id)
+        db.session.commit()
+        relatorio.importados += len(validos)
+    except IntegrityError:
+        db.session.rollback()
+        if len(validos) == 1:
+            relatorio.registrar_erro(validos[0][0], ["Não foi possível gravar a linha (dados duplicados ou inválidos)."])
+            return
+        # Cadastro concorrente no meio do lote: grava linha a linha para isolar o problema
+        for item in validos:
+            _gravar_lote([item], mapas, responsavel_id, relatorio)
+
+def importar_atletas(linhas, escopo, responsavel_id, formularios, normalizar_digitos, equipe_padrao_id=None, tamanho_lote=LOTE_PADRAO):
+    """Valida e grava os atletas de `linhas` (ver `ler_planilha`) em transações de `tamanho_lote`.
+
+    `formularios` são as classes (AtletaForm, EnderecoAtletaForm) das telas de
+    cadastro e `normalizar_digitos` a mesma limpeza de CPF/RG/telefones/CEP.
+    Atletas só entram em equipes do `escopo`; cada um ganha o histórico
+    inicial e, se a linha tiver, o endereço. Linhas com erro não impedem as
+    demais e aparecem no relatório.
+    """
+
+    relatorio = RelatorioImportacao()
+    mapas = carregar_mapas(escopo)
+
+    if equipe_padrao_id is not None and equipe_padrao_id not in mapas.projeto_da_equipe:
+        raise ValueError("Equipe padrão inválida.")
+
+    # Documentos já vistos neste arquivo: {documento: linha}
+    cpfs_vistos = {}
+    rgs_vistos = {}
+    lote = []
+
+    for numero, valores in linhas:
+        relatorio.total += 1
+        atleta, endereco, erros = validar_linha(valores, mapas, formularios, normalizar_digitos, equipe_padrao_id)
+
+        if atleta:
+            if atleta["cpf"] in cpfs_vistos:
+                erros.append(f"CPF: repetido na planilha (linha {cpfs_vistos[atleta['cpf']]}).")
+            if atleta["rg"] in rgs_vistos:
+                erros.append(f"RG: repetido na planilha (linha {rgs_vistos[atleta['rg']]}).")
+
+        if erros:
+            relatorio.registrar_erro(numero, erros)
+            continue
+
+        cpfs_vistos[atleta["cpf"]] = numero
+        rgs_vistos[atleta["rg"]] = numero
+        lote.append((numero, atleta, endereco))
+
+        if len(lote) >= tamanho_lote:
+            _gravar_lote(lote, mapas, responsavel_id, relatorio)
+            lote = []
+
+    if lote:
+        _gravar_lote(lote, mapas, responsavel_id, relatorio)
+
+    return relatorio
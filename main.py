@@ -1,18 +1,38 @@
 from flask_wtf import FlaskForm
-from flask_wtf.file import FileField, FileAllowed
-from wtforms import StringField, TextAreaField, SelectField, BooleanField, DateField, PasswordField, SubmitField
+from flask_wtf.file import FileField, FileAllowed, FileRequired
+from wtforms import StringField, TextAreaField, SelectField, SelectMultipleField, BooleanField, DateField, PasswordField, SubmitField
+from wtforms.widgets import CheckboxInput, ListWidget
 from wtforms.validators import DataRequired, Length, Email, EqualTo, Optional
-from flask import Flask, Response, request, redirect, url_for, render_template, flash, abort
-from sqlalchemy import or_
+from flask import Flask, Response, request, redirect, url_for, render_template, flash, abort, jsonify
+from sqlalchemy import or_, func
+from sqlalchemy.orm import undefer
 from flask_migrate import Migrate
 from admin import init_admin 
+from estatisticas import carregar_estatisticas, listar_projetos, contar_atletas_por_equipe, reconstruir as reconstruir_estatisticas
+from feed_transferencias import carregar_transferencias
+from elenco import carregar_pagina_elenco
+from imagens import carregar_versoes_imagens, url_imagem, salvar_imagem, resposta_imagem, migrar_imagens_para_armazenamento, MAX_AGE_VERSIONADA, TAMANHOS_VARIANTES
+from armazenamento import init_armazenamento
+from referencias import init_referencias
+from perfil_atleta import init_perfil_atleta, carregar_perfil_atleta
+from usuario_logado import init_usuario_logado, carregar_usuario_logado
+from escopo import escopo_atual
+from importacao import ler_planilha, importar_atletas, CABECALHO_MODELO
+from transferencias import transferir_atletas
+from tarefas import trabalhar, enfileirar, situacao_tarefa, INTERVALO_PADRAO
+from blog import init_blog, carregar_pagina_blog, carregar_post
+from exportacao import resposta_exportacao, linhas_elenco, linhas_transferencias, linhas_historico, COLUNAS_ELENCO, CABECALHO_TRANSFERENCIAS, CABECALHO_HISTORICO
+from busca import buscar, condicao_nome, reindexar, incluir_no_autogenerate
+import referencias
 from datetime import datetime
 from models import *
 from dotenv import load_dotenv
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
-from werkzeug.utils import secure_filename
 from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.http import is_resource_modified
 from werkzeug.security import generate_password_hash, check_password_hash
+import click
+import json
 import os
 import re
 
@@ -53,6 +73,35 @@ def format_cep(cep):
     
     return cep
 
+def filtros_elenco():
+    """Lê da query string os filtros/paginação do elenco (status, categoria, posicao, ordem, cursor, limite)."""
+
+    ordem = request.args.get("ordem", "asc")
+
+    return {
+        "status_id": request.args.get("status", type=int),
+        "categoria_id": request.args.get("categoria", type=int),
+        "posicao_id": request.args.get("posicao", type=int),
+        "ordem": ordem if ordem in ("asc", "desc") else "asc",
+        "cursor": request.args.get("cursor") or None,
+        "limite": request.args.get("limite", type=int),
+    }
+
+def opcoes_filtro_elenco():
+    return {
+        "status": referencias.choices("status"),
+        "categoria": referencias.choices("categoria"),
+        "posicao": referencias.choices("posicao"),
+    }
+
+def exportar(nome_arquivo, cabecalho, linhas):
+    # Formato vem da query string (?formato=csv|xlsx)
+    try:
+        return resposta_exportacao(nome_arquivo, cabecalho, linhas, request.args.get("formato", "csv"))
+    except ValueError as erro:
+        flash(str(erro), "danger")
+        return redirect(request.referrer or url_for("home"))
+
 def pode_criar_post(user):
     return user.is_authenticated and (user.is_admin or user.is_coord)
     
@@ -68,6 +117,10 @@ def pode_editar_post(post, user):
 
     return False
 
+def pode_editar_post_atual(post):
+    # Versão para as listagens (blog.py), com o usuário logado
+    return pode_editar_post(post=post, user=current_user)
+
 # Carrega as variáveis do arquivo .env para o sistema
 load_dotenv()
 
@@ -79,19 +132,111 @@ lm.login_message = None
 app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get("DATABASE_URL")
 app.config['SECRET_KEY'] = os.environ.get("SECRET_KEY", "chave-padrao-de-desenvolvimento")
 app.config['MAX_CONTENT_LENGTH'] = 10 * 1024 * 1024  # 10 MB
+# Onde ficam os bytes das imagens: "banco" (padrão), "local", "s3" ou "s3-local"
+app.config['ARMAZENAMENTO_IMAGENS'] = os.environ.get("ARMAZENAMENTO_IMAGENS", "banco")
+app.config['ARMAZENAMENTO_DIR'] = os.environ.get("ARMAZENAMENTO_DIR")
+app.config['S3_BUCKET'] = os.environ.get("S3_BUCKET")
+app.config['S3_ENDPOINT_URL'] = os.environ.get("S3_ENDPOINT_URL")
+app.config['USE_X_SENDFILE'] = os.environ.get("USE_X_SENDFILE") == "1"
+# Segundos que as tabelas de referência (status, sexo, cidades...) ficam em cache
+app.config['REFERENCIAS_TTL'] = int(os.environ.get("REFERENCIAS_TTL", 300))
+# Segundos que o perfil de cada atleta (visualizar_atleta) fica em cache
+app.config['PERFIL_ATLETA_TTL'] = int(os.environ.get("PERFIL_ATLETA_TTL", 60))
+# Segundos que o HTML dos cartões do blog fica em cache; edições de post e de
+# imagem aparecem na hora, só a troca do nome do autor espera esse tempo
+app.config['BLOG_CARTOES_TTL'] = int(os.environ.get("BLOG_CARTOES_TTL", 600))
+# Segundos que o usuário autenticado (user_loader) fica em cache; é também o
+# tempo máximo que outros processos levam para ver papéis alterados/exclusões
+app.config['USUARIO_LOGADO_TTL'] = int(os.environ.get("USUARIO_LOGADO_TTL", 30))
+# "1": redimensionamento das imagens enviadas vai para a fila (flask worker)
+app.config['IMAGENS_EM_SEGUNDO_PLANO'] = os.environ.get("IMAGENS_EM_SEGUNDO_PLANO") == "1"
+# Segundos que uma tarefa reservada fica com um worker antes de voltar para a fila
+app.config['TAREFAS_VISIBILIDADE'] = int(os.environ.get("TAREFAS_VISIBILIDADE", 300))
 # Inicializa o 'db' e as migrações com o aplicativo 'app'
 db.init_app(app)
-migrate = Migrate(app, db, render_as_batch=True)
+migrate = Migrate(app, db, render_as_batch=True, include_object=incluir_no_autogenerate)
 init_admin(app) 
+init_armazenamento(app)
+init_referencias(app)
+init_perfil_atleta(app)
+init_blog(app)
+init_usuario_logado(app)
+app.jinja_env.globals["url_imagem"] = url_imagem
 
 @app.errorhandler(RequestEntityTooLarge)
 def handle_file_too_large(e):
     flash("O arquivo enviado é muito grande. O limite é de 10 MB.", "danger")
     return redirect(request.referrer or "/")
 
+@app.cli.command("verificar-indices")
+def verificar_indices():
+    """Falha se alguma chave estrangeira estiver sem índice."""
+    faltando = fks_sem_indice()
+
+    if faltando:
+        for coluna in faltando:
+            click.echo(f"FK sem índice: {coluna}", err=True)
+        raise SystemExit(1)
+
+    click.echo("Todas as chaves estrangeiras possuem índice.")
+
+@app.cli.command("migrar-imagens")
+@click.option("--lote", default=50, help="Quantidade de imagens por transação.")
+def migrar_imagens(lote):
+    """Move os bytes das imagens do banco para o armazenamento configurado."""
+    movidas = migrar_imagens_para_armazenamento(lote=lote)
+    click.echo(f"{movidas} imagens movidas para o armazenamento.")
+
+@app.cli.command("reindexar-busca")
+def reindexar_busca():
+    """Recria e repopula o índice FTS5 da busca (apenas SQLite)."""
+    if reindexar():
+        db.session.commit()
+        click.echo("Índice de busca recriado.")
+    else:
+        click.echo("Nada a fazer: no Postgres a busca usa os índices pg_trgm/tsvector da migration.")
+
+@app.cli.command("reconciliar-estatisticas")
+def reconciliar_estatisticas():
+    """Recalcula do zero a tabela de estatísticas dos dashboards."""
+    linhas = reconstruir_estatisticas()
+    db.session.commit()
+    click.echo(f"Estatísticas recalculadas ({linhas} linhas).")
+
+@app.cli.command("worker")
+@click.option("--processos", default=1, help="Quantidade de processos worker.")
+@click.option("--intervalo", default=INTERVALO_PADRAO, help="Segundos entre consultas com a fila vazia.")
+@click.option("--ate-esvaziar", is_flag=True, help="Sai quando não houver tarefas disponíveis.")
+def worker(processos, intervalo, ate_esvaziar):
+    """Executa as tarefas em segundo plano (fila na tabela tarefas)."""
+    click.echo(f"Worker iniciado com {processos} processo(s).")
+    trabalhar(app, processos=processos, intervalo=intervalo, visibilidade=app.config['TAREFAS_VISIBILIDADE'], ate_esvaziar=ate_esvaziar)
+
+@app.cli.command("enfileirar-tarefa")
+@click.argument("nome")
+@click.option("--parametro", "-p", multiple=True, help="Parâmetro da tarefa no formato chave=valor (valor em JSON ou texto).")
+def enfileirar_tarefa(nome, parametro):
+    """Coloca uma tarefa na fila (ex.: reconciliar_estatisticas via cron)."""
+    parametros = {}
+    for item in parametro:
+        chave, _, valor = item.partition("=")
+        try:
+            parametros[chave] = json.loads(valor)
+        except ValueError:
+            parametros[chave] = valor
+
+    try:
+        nova = enfileirar(nome, **parametros)
+    except ValueError as erro:
+        raise click.ClickException(str(erro))
+
+    db.session.commit()
+    click.echo(f"Tarefa {nova.id} ({nome}) enfileirada.")
+
 @lm.user_loader
 def user_loader(id):
-    usuario = db.session.query(Usuario).filter_by(id=int(id)).first()
+    # Principal em cache (id, nome e papéis): checar permissão não vai ao banco
+    usuario = carregar_usuario_logado(int(id))
     return usuario
 
 # --- Classes de formulários ---
@@ -300,6 +445,32 @@ class EnderecoAtletaForm(FlaskForm):
 
     cep = StringField("CEP")
 
+class ImportarAtletasForm(FlaskForm):
+    arquivo = FileField(
+        "Planilha (CSV ou XLSX)",
+        validators=[
+            FileRequired(message="Selecione o arquivo."),
+            FileAllowed(['csv', 'xlsx'], 'Envie um arquivo .csv ou .xlsx.')
+        ]
+    )
+
+    equipe_id = SelectField("Equipe", coerce=int, validators=[Optional()])
+
+class TransferirAtletasForm(FlaskForm):
+    atleta_ids = SelectMultipleField(
+        "Atletas",
+        coerce=int,
+        widget=ListWidget(prefix_label=False),
+        option_widget=CheckboxInput(),
+        validators=[DataRequired(message="Selecione ao menos um atleta.")]
+    )
+
+    equipe_destino_id = SelectField(
+        "Equipe de destino",
+        coerce=int,
+        validators=[DataRequired(message="Selecione a equipe de destino.")]
+    )
+
 class BlogPostForm(FlaskForm):
     titulo = StringField(
         "Título",
@@ -340,8 +511,37 @@ def index():
 
 @app.route('/imagens/<int:id>')
 def get_image(id):
-    imagem = Imagem.query.get_or_404(id)
-    return Response(imagem.img, mimetype=imagem.mimetype)
+    # Carrega só os metadados (img é deferred); o binário fica para depois do GET condicional
+    imagem = Imagem.query.filter_by(id=id).first_or_404()
+
+    # Versão redimensionada (?tamanho=thumb|card); imagens sem variante usam o original
+    fonte = imagem
+    tamanho = request.args.get("tamanho")
+    if tamanho in TAMANHOS_VARIANTES:
+        variante = ImagemVariante.query.filter_by(imagem_id=imagem.id, tamanho=tamanho).first()
+        fonte = variante or imagem
+
+    if is_resource_modified(request.environ, etag=fonte.hash, last_modified=imagem.last_edited):
+        response = resposta_imagem(fonte)
+    else:
+        response = Response(status=304, mimetype=fonte.mimetype)
+
+    if fonte.hash:
+        response.set_etag(fonte.hash)
+    response.last_modified = imagem.last_edited
+
+    # URL versionada (?v=<hash>) nunca muda de conteúdo → cache longo.
+    # Variante ainda não gerada (tarefa pendente) serve o original: esse não pode ficar em cache
+    provisoria = tamanho in TAMANHOS_VARIANTES and fonte is imagem
+    if imagem.hash and request.args.get("v") == imagem.hash and not provisoria:
+        response.cache_control.public = True
+        response.cache_control.max_age = MAX_AGE_VERSIONADA
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.public = True
+        response.cache_control.no_cache = True
+
+    return response
 
 @app.route('/cadastro', methods=["GET","POST"])
 def cadastro_usuario():
@@ -395,75 +595,11 @@ def logout():
 @app.route('/home')
 @login_required
 def home():
-    # Coloque aqui querys gerais para otimizar o app reduzindo queries
-    projetos_query = db.session.query(Projeto)
-    equipes_query = db.session.query(Equipe)
-    atletas_query = db.session.query(Atleta)
-    usuarios_query = db.session.query(Usuario)
-    cidades_query = db.session.query(Cidade)
-    id_status_query = db.session.query(Status.id)
-
-    # Painel dashboard
-    total_projetos_ativos = projetos_query.filter_by(is_active=True).count()
-    total_equipes_ativas = equipes_query.filter_by(is_active=True).count()
-    total_atletas = atletas_query.count()
-
-    # Status Atletas
-    id_status_ativo = id_status_query.filter_by(nome_status="ATIVO").scalar()
-    id_status_lesionado = id_status_query.filter_by(nome_status="LESIONADO").scalar()
-    id_status_suspenso = id_status_query.filter_by(nome_status="SUSPENSO").scalar()
-
-    atletas_ativos = atletas_query.filter_by(status_id=id_status_ativo).count()
-    atletas_lesionados = atletas_query.filter_by(status_id=id_status_lesionado).count()
-    atletas_suspensos = atletas_query.filter_by(status_id=id_status_suspenso).count()
+    # Painel dashboard (todos os KPIs em uma única query)
+    estatisticas = carregar_estatisticas()
 
     # Atividades recentes(transferências)
-    # Queries base (fora do loop)
-    transferencias_db = (
-        db.session.query(Transferencia)
-        .order_by(Transferencia.id.desc())
-        .limit(5)
-        .all()
-    )
-
-    # Montagem da lista
-    transferencias = []
-
-    for transferencia in transferencias_db:
-
-        proj_origem = projetos_query.filter_by(
-            id=transferencia.projeto_origem_id
-        ).scalar()
-
-        eq_origem = equipes_query.filter_by(
-            id=transferencia.equipe_origem_id
-        ).scalar()
-
-        proj_destino = projetos_query.filter_by(
-            id=transferencia.projeto_destino_id
-        ).scalar()
-
-        eq_destino = equipes_query.filter_by(
-            id=transferencia.equipe_destino_id
-        ).scalar()
-
-        atleta = atletas_query.filter_by(
-            id=transferencia.atleta_id
-        ).scalar()
-
-        responsavel = usuarios_query.filter_by(
-            id=transferencia.responsavel_id
-        ).scalar()
-
-        transferencias.append({
-            "id": transferencia.id,
-            "proj_origem": proj_origem.nome_projeto,
-            "eq_origem": eq_origem.nome_equipe,
-            "proj_destino": proj_destino.nome_projeto,
-            "eq_destino": eq_destino.nome_equipe,
-            "nome_atleta": atleta.firstname_atleta.title(),
-            "responsavel": responsavel.firstname_usuario.title(),
-        })
+    transferencias = carregar_transferencias().itens
 
     # Tabela projetos
 
@@ -472,35 +608,13 @@ def home():
     status = request.args.get("status")
     cidade_id = request.args.get("cidade", type=int)
 
-    ### Cria cópia de projetos_query
-    filtro_query = projetos_query
+    ### Projetos com cidade e totais (1 query agrupada)
+    projetos = listar_projetos(q=q, status=status, cidade_id=cidade_id)
+    carregar_versoes_imagens([p["logo_id"] for p in projetos])
 
-    if q:
-        filtro_query = filtro_query.filter(Projeto.nome_projeto.ilike(f"%{q}%"))
+    cidades = [{"id":cidade_id, "nome_cidade":nome_cidade.title()} for cidade_id, (nome_cidade, _) in referencias.cidades().items()]
 
-    if status == "ativo":
-        filtro_query = filtro_query.filter(Projeto.is_active == True)
-    elif status == "inativo":
-        filtro_query = filtro_query.filter(Projeto.is_active == False)
-
-    if cidade_id:
-        filtro_query = filtro_query.filter(Projeto.cidade_id == cidade_id)
-
-    lista_projetos = filtro_query.all()
-
-    projetos = []
-    for projeto in lista_projetos:
-        projeto_cidade = cidades_query.filter_by(id=projeto.cidade_id).scalar().nome_cidade
-        
-        projeto_equipes = equipes_query.filter_by(projeto_id=projeto.id).count()
-
-        projeto_atletas = atletas_query.join(Equipe, Equipe.id == Atleta.equipe_id).filter(Equipe.projeto_id == projeto.id).count()
-
-        projetos.append({"id":projeto.id, "logo_id":projeto.logo_id, "nome":projeto.nome_projeto, "cidade":projeto_cidade.title(), "n_equipes":projeto_equipes, "n_atletas":projeto_atletas, "is_active":bool(projeto.is_active)})
-
-    cidades = [{"id":c.id, "nome_cidade":c.nome_cidade.title()} for c in cidades_query.all()]
-
-    return render_template('dashboard.html', n_projetos_ativos=total_projetos_ativos, n_equipes_ativas=total_equipes_ativas, n_atletas=total_atletas, atletas_ativos=atletas_ativos, atletas_lesionados=atletas_lesionados, atletas_suspensos=atletas_suspensos, transferencias=transferencias, projetos=projetos, cidades=cidades)
+    return render_template('dashboard.html', n_projetos_ativos=estatisticas.n_projetos_ativos, n_equipes_ativas=estatisticas.n_equipes_ativas, n_atletas=estatisticas.n_atletas, atletas_ativos=estatisticas.atletas_ativos, atletas_lesionados=estatisticas.atletas_lesionados, atletas_suspensos=estatisticas.atletas_suspensos, transferencias=transferencias, projetos=projetos, cidades=cidades)
 
 @app.route('/coordenador/dashboard/')
 @login_required
@@ -509,92 +623,11 @@ def coordenador_dashboard():
     if not (current_user.is_admin or current_user.is_coord):
         abort(403)
 
-    # Coloque aqui querys gerais para otimizar o app reduzindo queries
-    # Projetos onde o usuário é coordenador
-    projetos_query = db.session.query(Projeto).filter(
-        Projeto.responsavel_id == current_user.id
-    )
-
-    # Equipes vinculadas aos projetos do coordenador
-    equipes_query = db.session.query(Equipe).join(Projeto).filter(
-        Projeto.responsavel_id == current_user.id
-    )
-
-    # Atletas vinculados às equipes dos projetos do coordenador
-    atletas_query = db.session.query(Atleta) \
-        .join(Equipe) \
-        .join(Projeto) \
-        .filter(Projeto.responsavel_id == current_user.id)
-
-    cidades_query = db.session.query(Cidade)
-    id_status_query = db.session.query(Status.id)
-
-    # Painel dashboard
-    total_equipes_ativas = equipes_query.filter(
-        Equipe.is_active == True
-    ).count()
-
-    total_atletas = atletas_query.count()
-
-    # Status dos atletas
-    id_status_ativo = id_status_query.filter_by(nome_status="ATIVO").scalar()
-    id_status_lesionado = id_status_query.filter_by(nome_status="LESIONADO").scalar()
-    id_status_suspenso = id_status_query.filter_by(nome_status="SUSPENSO").scalar()
-
-    atletas_ativos = atletas_query.filter(
-        Atleta.status_id == id_status_ativo
-    ).count()
-
-    atletas_lesionados = atletas_query.filter(
-        Atleta.status_id == id_status_lesionado
-    ).count()
-
-    atletas_suspensos = atletas_query.filter(
-        Atleta.status_id == id_status_suspenso
-    ).count()
-
-    dashboard_dict = {"n_equipes_ativas":total_equipes_ativas, "n_atletas":total_atletas, "atletas_ativos":atletas_ativos, "atletas_lesionados":atletas_lesionados, "atletas_suspensos":atletas_suspensos}
+    # Painel dashboard (todos os KPIs em uma única query)
+    estatisticas = carregar_estatisticas(responsavel_id=current_user.id)
 
     # Atividades recentes(transferências)
-    transferencias_db = (
-        db.session.query(Transferencia)
-        .join(Projeto, or_(
-            Projeto.id == Transferencia.projeto_origem_id,
-            Projeto.id == Transferencia.projeto_destino_id
-        ))
-        .filter(Projeto.responsavel_id == current_user.id)
-        .distinct()
-        .order_by(Transferencia.id.desc())
-        .limit(5)
-        .all()
-    )
-
-    # Montagem da lista
-    transferencias = []
-
-    for transferencia in transferencias_db:
-
-        proj_origem = db.session.query(Projeto).filter(Projeto.id == transferencia.projeto_origem_id).first()
-
-        proj_destino = db.session.query(Projeto).filter(Projeto.id == transferencia.projeto_destino_id).first()
-
-        eq_origem = db.session.query(Equipe).filter(Equipe.id == transferencia.equipe_origem_id).first()
-
-        eq_destino = db.session.query(Equipe).filter(Equipe.id == transferencia.equipe_destino_id).first()
-
-        atleta = db.session.query(Atleta).filter(Atleta.id == transferencia.atleta_id).first()
-
-        responsavel = db.session.query(Usuario).filter(Usuario.id == transferencia.responsavel_id).first()
-
-        transferencias.append({
-            "id": transferencia.id,
-            "proj_origem": proj_origem.nome_projeto,
-            "eq_origem": eq_origem.nome_equipe,
-            "proj_destino": proj_destino.nome_projeto,
-            "eq_destino": eq_destino.nome_equipe,
-            "nome_atleta": atleta.firstname_atleta.title(),
-            "responsavel": responsavel.firstname_usuario.title(),
-        })
+    transferencias = carregar_transferencias(responsavel_id=current_user.id).itens
 
     # Tabela Projetos
     ## Lógica para o funcionamento do filtro de projetos
@@ -602,36 +635,13 @@ def coordenador_dashboard():
     status = request.args.get("status")
     cidade_id = request.args.get("cidade", type=int)
 
-    ### Cria cópia de projetos_query com apenas os projetos do coordenador
-    # filtro_query = projetos_query.filter(Projeto.responsavel_id==current_user.id)
-    filtro_query = projetos_query
+    ### Apenas os projetos do coordenador, com cidade e totais (1 query agrupada)
+    projetos = listar_projetos(responsavel_id=current_user.id, q=q, status=status, cidade_id=cidade_id)
+    carregar_versoes_imagens([p["logo_id"] for p in projetos])
 
-    if q:
-        filtro_query = filtro_query.filter(Projeto.nome_projeto.ilike(f"%{q}%"))
+    cidades = [{"id":cidade_id, "nome_cidade":nome_cidade.title()} for cidade_id, (nome_cidade, _) in referencias.cidades().items()]
 
-    if status == "ativo":
-        filtro_query = filtro_query.filter(Projeto.is_active == True)
-    elif status == "inativo":
-        filtro_query = filtro_query.filter(Projeto.is_active == False)
-
-    if cidade_id:
-        filtro_query = filtro_query.filter(Projeto.cidade_id == cidade_id)
-
-    lista_projetos = filtro_query.all()
-
-    projetos = []
-    for projeto in lista_projetos:
-        projeto_cidade = cidades_query.filter_by(id=projeto.cidade_id).scalar().nome_cidade
-        
-        projeto_equipes = equipes_query.filter(Equipe.projeto_id==projeto.id).count()
-
-        projeto_atletas = atletas_query.filter(Equipe.projeto_id == projeto.id).count()
-
-        projetos.append({"id":projeto.id, "logo_id":projeto.logo_id, "nome":projeto.nome_projeto, "cidade":projeto_cidade.title(), "n_equipes":projeto_equipes, "n_atletas":projeto_atletas, "is_active":bool(projeto.is_active)})
-
-    cidades = [{"id":c.id, "nome_cidade":c.nome_cidade.title()} for c in cidades_query.all()]
-
-    return render_template("painel_coordenador.html", dashboard=dashboard_dict, transferencias=transferencias, cidades=cidades, projetos=projetos)
+    return render_template("painel_coordenador.html", dashboard=estatisticas, transferencias=transferencias, cidades=cidades, projetos=projetos)
 
 @app.route('/tecnico/dashboard/')
 @login_required
@@ -640,85 +650,12 @@ def tecnico_dashboard():
     if not(current_user.is_admin or current_user.is_tecnico):
         abort(403)
 
-    # Coloque aqui querys gerais para otimizar o app reduzindo queries
-    # Equipes do técnico logado
-    # equipes_query = db.session.query(Equipe).filter(
-    #     Equipe.tecnico_id == current_user.id
-    # )
-
-    # Atletas vinculados às equipes do técnico
-    atletas_query = db.session.query(Atleta) \
-        .join(Equipe) \
-        .filter(Equipe.tecnico_id == current_user.id)
-
-    # Total de atletas do técnico (somatório de todas as equipes)
-    total_atletas = atletas_query.count()
-
-    id_status_query = db.session.query(Status.id)
-
-    # Status dos atletas
-    id_status_ativo = id_status_query.filter_by(nome_status="ATIVO").scalar()
-    id_status_lesionado = id_status_query.filter_by(nome_status="LESIONADO").scalar()
-    id_status_suspenso = id_status_query.filter_by(nome_status="SUSPENSO").scalar()
-
-    atletas_ativos = atletas_query.filter(
-        Atleta.status_id == id_status_ativo
-    ).count()
-
-    atletas_lesionados = atletas_query.filter(
-        Atleta.status_id == id_status_lesionado
-    ).count()
-
-    atletas_suspensos = atletas_query.filter(
-        Atleta.status_id == id_status_suspenso
-    ).count()
-
-    dashboard_dict = {"n_atletas":total_atletas, "atletas_ativos":atletas_ativos, "atletas_lesionados":atletas_lesionados, "atletas_suspensos":atletas_suspensos}
+    # Painel dashboard (todos os KPIs em uma única query)
+    estatisticas = carregar_estatisticas(tecnico_id=current_user.id)
 
     # Atividades recentes(transferências)
     # Transferências envolvendo equipes do técnico
-    transferencias_db = (
-        db.session.query(Transferencia)
-        .join(
-            Equipe,
-            or_(
-                Equipe.id == Transferencia.equipe_origem_id,
-                Equipe.id == Transferencia.equipe_destino_id
-            )
-        )
-        .filter(Equipe.tecnico_id == current_user.id)
-        .distinct()
-        .order_by(Transferencia.id.desc())
-        .limit(5)
-        .all()
-    )
-
-    # Montagem da lista
-    transferencias = []
-
-    for transferencia in transferencias_db:
-
-        proj_origem = db.session.query(Projeto).filter(Projeto.id == transferencia.projeto_origem_id).first()
-
-        proj_destino = db.session.query(Projeto).filter(Projeto.id == transferencia.projeto_destino_id).first()
-
-        eq_origem = db.session.query(Equipe).filter(Equipe.id == transferencia.equipe_origem_id).first()
-
-        eq_destino = db.session.query(Equipe).filter(Equipe.id == transferencia.equipe_destino_id).first()
-
-        atleta = db.session.query(Atleta).filter(Atleta.id == transferencia.atleta_id).first()
-
-        responsavel = db.session.query(Usuario).filter(Usuario.id == transferencia.responsavel_id).first()
-
-        transferencias.append({
-            "id": transferencia.id,
-            "proj_origem": proj_origem.nome_projeto,
-            "eq_origem": eq_origem.nome_equipe,
-            "proj_destino": proj_destino.nome_projeto,
-            "eq_destino": eq_destino.nome_equipe,
-            "nome_atleta": atleta.firstname_atleta.title(),
-            "responsavel": responsavel.firstname_usuario.title(),
-        })
+    transferencias = carregar_transferencias(tecnico_id=current_user.id).itens
 
     # Tabela Equipe
     ## Lógica para o funcionamento do filtro de Equipes
@@ -733,7 +670,7 @@ def tecnico_dashboard():
     )
 
     if q:
-        filtro_query = filtro_query.filter(or_(Equipe.nome_equipe.ilike(f"%{q}%"), Projeto.nome_projeto.ilike(f"%{q}%")))
+        filtro_query = filtro_query.filter(or_(condicao_nome("equipe", q), condicao_nome("projeto", q)))
 
     if status == "ativo":
         filtro_query = filtro_query.filter(Equipe.is_active == True)
@@ -742,13 +679,137 @@ def tecnico_dashboard():
 
     lista_equipes = filtro_query.all()
 
+    # Total de atletas por equipe (1 query agrupada)
+    atletas_por_equipe = contar_atletas_por_equipe(tecnico_id=current_user.id)
+
     equipes = []
     for equipe, projeto in lista_equipes:
-        total_atletas = atletas_query.filter(Atleta.equipe_id == equipe.id).count()
+        total_atletas = atletas_por_equipe.get(equipe.id, 0)
 
         equipes.append({"id":equipe.id, "logo_id":equipe.logo_id, "nome_equipe":equipe.nome_equipe,"nome_projeto":projeto.nome_projeto, "is_active":bool(equipe.is_active),"total_atletas":total_atletas})
 
-    return render_template("painel_tecnico.html", dashboard=dashboard_dict, transferencias=transferencias, equipes=equipes)
+    carregar_versoes_imagens([e["logo_id"] for e in equipes])
+
+    return render_template("painel_tecnico.html", dashboard=estatisticas, transferencias=transferencias, equipes=equipes)
+
+@app.route('/atividades/transferencias/')
+@login_required
+def feed_transferencias():
+    # Paginação (keyset) das atividades recentes dos dashboards
+    escopo = request.args.get("escopo", "geral")
+    cursor = request.args.get("cursor", type=int)
+    limite = request.args.get("limite", type=int)
+
+    if escopo == "geral":
+        pagina = carregar_transferencias(limite=limite, cursor=cursor)
+    elif escopo == "coordenador":
+        #Verifica se tem acesso(admin ou coordenador)
+        if not (current_user.is_admin or current_user.is_coord):
+            abort(403)
+        pagina = carregar_transferencias(responsavel_id=current_user.id, limite=limite, cursor=cursor)
+    elif escopo == "tecnico":
+        #Verifica se tem acesso(admin ou tecnico)
+        if not (current_user.is_admin or current_user.is_tecnico):
+            abort(403)
+        pagina = carregar_transferencias(tecnico_id=current_user.id, limite=limite, cursor=cursor)
+    else:
+        abort(400)
+
+    return jsonify({"transferencias": pagina.itens, "proximo_cursor": pagina.proximo_cursor})
+
+@app.route('/exportar/elenco/')
+@login_required
+def exportar_elenco():
+    # Mesmo elenco (e filtros) das telas de projeto/equipe, sem paginação
+    projeto_id = request.args.get("projeto_id", type=int)
+    equipe_id = request.args.get("equipe_id", type=int)
+
+    if projeto_id is None and equipe_id is None:
+        abort(400)
+
+    filtros = filtros_elenco()
+    nome_arquivo = f"elenco_equipe_{equipe_id}" if equipe_id is not None else f"elenco_projeto_{projeto_id}"
+
+    linhas = linhas_elenco(
+        projeto_id=projeto_id,
+        equipe_id=equipe_id,
+        status_id=filtros["status_id"],
+        categoria_id=filtros["categoria_id"],
+        posicao_id=filtros["posicao_id"],
+        ordem=filtros["ordem"],
+    )
+
+    return exportar(nome_arquivo, [cabecalho for cabecalho, _ in COLUNAS_ELENCO], linhas)
+
+@app.route('/exportar/transferencias/')
+@login_required
+def exportar_transferencias():
+    # Mesmos escopos do feed de atividades (/atividades/transferencias/)
+    escopo = request.args.get("escopo", "geral")
+
+    if escopo == "geral":
+        linhas = linhas_transferencias()
+    elif escopo == "coordenador":
+        #Verifica se tem acesso(admin ou coordenador)
+        if not (current_user.is_admin or current_user.is_coord):
+            abort(403)
+        linhas = linhas_transferencias(responsavel_id=current_user.id)
+    elif escopo == "tecnico":
+        #Verifica se tem acesso(admin ou tecnico)
+        if not (current_user.is_admin or current_user.is_tecnico):
+            abort(403)
+        linhas = linhas_transferencias(tecnico_id=current_user.id)
+    else:
+        abort(400)
+
+    return exportar(f"transferencias_{escopo}", CABECALHO_TRANSFERENCIAS, linhas)
+
+@app.route('/exportar/historico/')
+@login_required
+def exportar_historico():
+    #Verifica se tem acesso(admin, coordenador ou tecnico); cada um vê só as suas equipes
+    if not (current_user.is_admin or current_user.is_coord or current_user.is_tecnico):
+        abort(403)
+
+    linhas = linhas_historico(
+        escopo_atual(),
+        projeto_id=request.args.get("projeto_id", type=int),
+        equipe_id=request.args.get("equipe_id", type=int),
+    )
+
+    return exportar("historico_atletas", CABECALHO_HISTORICO, linhas)
+
+@app.route('/tarefas/<int:tarefa_id>/')
+@login_required
+def status_tarefa(tarefa_id):
+    # Situação de uma tarefa em segundo plano (quem pediu ou admin)
+    registro = db.session.get(Tarefa, tarefa_id)
+
+    if registro is None or not (current_user.is_admin or registro.criado_por_id == current_user.id):
+        abort(404)
+
+    return jsonify(situacao_tarefa(registro))
+
+@app.route('/buscar')
+@login_required
+def buscar_geral():
+    # Busca unificada (projetos, equipes e atletas), por relevância e paginada
+    q = request.args.get("q", "")
+    tipos = request.args.getlist("tipo") or None
+    pagina = request.args.get("pagina", 1, type=int)
+    limite = request.args.get("limite", type=int)
+
+    resultado = buscar(q, tipos=tipos, pagina=pagina, limite=limite, escopo=escopo_atual())
+
+    return jsonify({
+        "resultados": [
+            {"tipo": item.tipo, "id": item.id, "titulo": item.titulo, "subtitulo": item.subtitulo, "rank": item.rank,
+             "url": url_for(f"visualizar_{item.tipo}", **{f"{item.tipo}_id": item.id})}
+            for item in resultado.itens
+        ],
+        "pagina": resultado.pagina,
+        "proxima_pagina": resultado.proxima_pagina,
+    })
 
 @app.route('/criar/projeto/', methods=["GET","POST"])
 @login_required
@@ -761,19 +822,7 @@ def criar_projeto():
     form = ProjetoForm()
 
     # Popula cidades
-    form.cidade_id.choices = [
-        (cidade_id, f"{nome_cidade.title()} - {abreviacao}")
-        for cidade_id, nome_cidade, abreviacao in (
-            db.session.query(
-                Cidade.id,
-                Cidade.nome_cidade,
-                Estado.abreviacao
-            )
-            .join(Estado, Estado.id == Cidade.estado_id)
-            .order_by(Cidade.nome_cidade)
-            .all()
-        )
-    ]
+    form.cidade_id.choices = referencias.choices_cidades(incluir=form.cidade_id.data)
 
     # Popula responsáveis
     if current_user.is_admin:
@@ -793,17 +842,7 @@ def criar_projeto():
 
             logo_id = None
             if form.logo.data:
-                file = form.logo.data
-
-                imagem = Imagem(
-                    img=file.read(),
-                    name=secure_filename(file.filename),
-                    mimetype=file.mimetype
-                )
-
-                db.session.add(imagem)
-                db.session.flush()
-
+                imagem = salvar_imagem(form.logo.data)
                 logo_id = imagem.id
 
             novo_projeto = Projeto(
@@ -829,32 +868,17 @@ def editar_projeto():
     projeto_id = request.args.get("projeto_id", type=int)
 
     #Verifica se tem acesso(admin ou coordenador do projeto)
-    projeto_query = db.session.query(Projeto).filter(Projeto.id==projeto_id)
-
-    if current_user.is_admin:
-        pass
-    elif current_user.is_coord:
-        projeto_query = projeto_query.filter(Projeto.responsavel_id == current_user.id)
-    else:
+    if not (current_user.is_admin or current_user.is_coord):
         abort(403)
 
-    projeto = projeto_query.first_or_404()
+    if not escopo_atual().pode_editar_projeto(projeto_id):
+        abort(404)
+
+    projeto = db.session.query(Projeto).options(undefer(Projeto.descricao)).filter(Projeto.id==projeto_id).first_or_404()
 
     form = ProjetoForm(obj=projeto)
 
-    form.cidade_id.choices = [
-        (cidade_id, f"{nome_cidade.title()} - {abreviacao}")
-        for cidade_id, nome_cidade, abreviacao in (
-            db.session.query(
-                Cidade.id,
-                Cidade.nome_cidade,
-                Estado.abreviacao
-            )
-            .join(Estado, Estado.id == Cidade.estado_id)
-            .order_by(Cidade.nome_cidade)
-            .all()
-        )
-    ]
+    form.cidade_id.choices = referencias.choices_cidades(incluir=form.cidade_id.data)
 
     # Popula responsáveis
     if current_user.is_admin:
@@ -878,25 +902,14 @@ def editar_projeto():
 
             # 🔹 Se um novo arquivo foi enviado
             if form.logo.data:
-                file = form.logo.data
-
                 # Caso ainda não exista imagem (ex: projeto antigo)
                 if projeto.logo_id == None:
-                    imagem = Imagem(
-                        img=file.read(),
-                        name=secure_filename(file.filename),
-                        mimetype=file.mimetype
-                    )
-                    db.session.add(imagem)
-                    db.session.flush()
+                    imagem = salvar_imagem(form.logo.data)
                     projeto.logo_id = imagem.id
 
                 # Caso já exista → EDITA o slot atual
                 else:
-                    imagem = Imagem.query.get_or_404(projeto.logo_id)
-                    imagem.img = file.read()
-                    imagem.name = secure_filename(file.filename)
-                    imagem.mimetype = file.mimetype
+                    salvar_imagem(form.logo.data, imagem=Imagem.query.get_or_404(projeto.logo_id))
 
             db.session.commit()
             flash("Projeto atualizado com sucesso!", "success")
@@ -916,15 +929,8 @@ def criar_equipe():
 
     form = EquipeForm()
 
-    # Popula projetos
-    projetos_query = Projeto.query.filter(Projeto.is_active == True)
-
-    if current_user.is_admin:
-        pass
-    else:
-        projetos_query = projetos_query.filter(Projeto.responsavel_id == current_user.id)
-
-    projetos = projetos_query.all()
+    # Popula projetos (ativos e dentro do escopo do usuário)
+    projetos = Projeto.query.filter(Projeto.is_active == True, escopo_atual().filtro_projetos()).all()
 
     form.projeto_id.choices = [(p.id, p.nome_projeto) for p in projetos]
 
@@ -947,17 +953,7 @@ def criar_equipe():
         try:
             logo_id = None
             if form.logo.data:
-                file = form.logo.data
-
-                imagem = Imagem(
-                    img=file.read(),
-                    name=secure_filename(file.filename),
-                    mimetype=file.mimetype
-                )
-
-                db.session.add(imagem)
-                db.session.flush()
-
+                imagem = salvar_imagem(form.logo.data)
                 logo_id = imagem.id
 
             nova_equipe = Equipe(
@@ -983,35 +979,18 @@ def editar_equipe():
     equipe_id = request.args.get('equipe_id', type=int)
 
     #Verifica se tem acesso(admin ou coordenador do projeto)
-
-    equipe_query = (
-    db.session.query(Equipe)
-    .join(Projeto, Projeto.id == Equipe.projeto_id)
-    .filter(Equipe.id == equipe_id)
-    )
-        
-    if current_user.is_admin:
-        pass
-    elif current_user.is_coord:
-        equipe_query = equipe_query.filter(Projeto.responsavel_id == current_user.id)
-    # elif current_user.is_tecnico:
-    #     equipe_query = equipe_query.filter(Equipe.tecnico_id == current_user.id)
-    else:
+    if not (current_user.is_admin or current_user.is_coord):
         abort(403)
 
-    equipe = equipe_query.first_or_404()
-
-    form = EquipeForm(obj=equipe)
+    if not escopo_atual().pode_editar_equipe(equipe_id):
+        abort(404)
 
-    # Popula projetos
-    projetos_query = Projeto.query.filter(Projeto.is_active == True)
+    equipe = Equipe.query.get_or_404(equipe_id)
 
-    if current_user.is_admin:
-        pass
-    else:
-        projetos_query = projetos_query.filter(Projeto.responsavel_id == current_user.id)
+    form = EquipeForm(obj=equipe)
 
-    projetos = projetos_query.all()
+    # Popula projetos (ativos e dentro do escopo do usuário)
+    projetos = Projeto.query.filter(Projeto.is_active == True, escopo_atual().filtro_projetos()).all()
 
     form.projeto_id.choices = [(p.id, p.nome_projeto) for p in projetos]
 
@@ -1039,25 +1018,14 @@ def editar_equipe():
 
             # 🔹 Se um novo arquivo foi enviado
             if form.logo.data:
-                file = form.logo.data
-
                 # Caso ainda não exista imagem (ex: projeto antigo)
                 if equipe.logo_id == None:
-                    imagem = Imagem(
-                        img=file.read(),
-                        name=secure_filename(file.filename),
-                        mimetype=file.mimetype
-                    )
-                    db.session.add(imagem)
-                    db.session.flush()
+                    imagem = salvar_imagem(form.logo.data)
                     equipe.logo_id = imagem.id
 
                 # Caso já exista → EDITA o slot atual
                 else:
-                    imagem = Imagem.query.get_or_404(equipe.logo_id)
-                    imagem.img = file.read()
-                    imagem.name = secure_filename(file.filename)
-                    imagem.mimetype = file.mimetype
+                    salvar_imagem(form.logo.data, imagem=Imagem.query.get_or_404(equipe.logo_id))
 
             db.session.commit()
             flash("Equipe atualizada com sucesso!", "success")
@@ -1077,45 +1045,30 @@ def criar_atleta():
 
     form = AtletaForm()
 
-    # Popula selects de Equipes
+    # Popula selects de Equipes (somente as equipes do escopo do usuário)
     equipe_query = (
         db.session.query(
             Equipe.id,
             Equipe.nome_equipe,
             Projeto.nome_projeto
             ).join(Projeto, Projeto.id == Equipe.projeto_id)
+            .filter(escopo_atual().filtro_equipes())
     )
 
-    if current_user.is_admin:
-        pass
-    elif current_user.is_coord:
-        equipe_query = equipe_query.filter(
-            Projeto.responsavel_id == current_user.id
-        )
-    elif current_user.is_tecnico:
-        equipe_query = equipe_query.filter(
-            Equipe.tecnico_id == current_user.id
-        )
-
     form.equipe_id.choices = [
         (equipe_id, f"{nome_equipe} - {nome_projeto}")
         for equipe_id, nome_equipe, nome_projeto in equipe_query.all()
     ]
 
-    form.sexo_id.choices = [(s.id, s.sexo.title()) for s in Sexo.query.all()]
-    form.modalidade_id.choices = [(m.id, m.nome_modalidade.title()) for m in Modalidade.query.all()]
-    form.posicao_id.choices = [(p.id, p.nome_posicao.title()) for p in Posicao.query.all()]
-    form.categoria_id.choices = [(c.id, c.nome_categoria.title()) for c in Categoria.query.all()]
-    form.nivel_id.choices = [(n.id, n.nome_nivel.title()) for n in Nivel.query.all()]
-    form.status_id.choices = [(st.id, st.nome_status.title()) for st in Status.query.all()]
+    # Tabelas de referência vêm do cache (relidas só se o id enviado não estiver nele)
+    form.sexo_id.choices = referencias.choices("sexo", "Selecione.", incluir=form.sexo_id.data)
+    form.modalidade_id.choices = referencias.choices("modalidade", "Selecione a modalidade.", incluir=form.modalidade_id.data)
+    form.posicao_id.choices = referencias.choices("posicao", "Selecione a posição.", incluir=form.posicao_id.data)
+    form.categoria_id.choices = referencias.choices("categoria", "Selecione uma categoria.", incluir=form.categoria_id.data)
+    form.nivel_id.choices = referencias.choices("nivel", "Selecione o nível do atleta.", incluir=form.nivel_id.data)
+    form.status_id.choices = referencias.choices("status", "Selecione o status do atleta.", incluir=form.status_id.data)
 
     form.equipe_id.choices.insert(0, (0, "Selecione uma equipe."))
-    form.sexo_id.choices.insert(0, (0, "Selecione."))
-    form.modalidade_id.choices.insert(0, (0, "Selecione a modalidade."))
-    form.posicao_id.choices.insert(0, (0, "Selecione a posição."))
-    form.categoria_id.choices.insert(0, (0, "Selecione uma categoria."))
-    form.nivel_id.choices.insert(0, (0, "Selecione o nível do atleta."))
-    form.status_id.choices.insert(0, (0, "Selecione o status do atleta."))
 
     if form.validate_on_submit():
         novo_atleta = Atleta(
@@ -1166,41 +1119,155 @@ def criar_atleta():
 
     return render_template("criar_atleta.html", form=form)
 
+@app.route('/importar/atletas/', methods=["GET","POST"])
+@login_required
+def importar_atletas_planilha():
+    #Verifica se tem acesso(admin, coordenador ou tecnico)
+    if not( current_user.is_admin or current_user.is_coord or current_user.is_tecnico ):
+        abort(403)
+
+    form = ImportarAtletasForm()
+
+    # Equipe usada nas linhas sem a coluna "equipe" (somente as do escopo do usuário)
+    equipe_query = (
+        db.session.query(Equipe.id, Equipe.nome_equipe, Projeto.nome_projeto)
+        .join(Projeto, Projeto.id == Equipe.projeto_id)
+        .filter(escopo_atual().filtro_equipes())
+        .order_by(Equipe.nome_equipe)
+    )
+
+    form.equipe_id.choices = [(0, "Usar a coluna \"equipe\" da planilha")] + [
+        (equipe_id, f"{nome_equipe} - {nome_projeto}")
+        for equipe_id, nome_equipe, nome_projeto in equipe_query.all()
+    ]
+
+    relatorio = None
+
+    if form.validate_on_submit():
+        arquivo = form.arquivo.data
+
+        try:
+            relatorio = importar_atletas(
+                ler_planilha(arquivo.stream, arquivo.filename),
+                escopo=escopo_atual(),
+                responsavel_id=current_user.id,
+                formularios=(AtletaForm, EnderecoAtletaForm),
+                normalizar_digitos=somente_digitos,
+                equipe_padrao_id=form.equipe_id.data or None,
+            )
+        except ValueError as erro:
+            db.session.rollback()
+            flash(str(erro), "danger")
+        else:
+            categoria = "success" if not relatorio.com_erro else "warning"
+            flash(f"{relatorio.importados} de {relatorio.total} atletas importados.", categoria)
+
+    return render_template("importar_atletas.html", form=form, relatorio=relatorio)
+
+@app.route('/importar/atletas/modelo.csv')
+@login_required
+def modelo_importacao_atletas():
+    return Response(
+        ";".join(CABECALHO_MODELO) + "\r\n",
+        mimetype="text/csv",
+        headers={"Content-Disposition": "attachment; filename=modelo_atletas.csv"},
+    )
+
+@app.route('/transferir/atletas/', methods=["GET","POST"])
+@login_required
+def transferir_atletas_equipe():
+    equipe_id = request.args.get("equipe_id", type=int)
+
+    #Verifica se tem acesso(admin ou coordenador do projeto ou tecnico da equipe)
+    if not (current_user.is_admin or current_user.is_coord or current_user.is_tecnico):
+        abort(403)
+
+    if not escopo_atual().pode_gerenciar_equipe(equipe_id):
+        abort(404)
+
+    equipe, nome_projeto = (
+        db.session.query(Equipe, Projeto.nome_projeto)
+        .join(Projeto, Projeto.id == Equipe.projeto_id)
+        .filter(Equipe.id == equipe_id)
+        .first_or_404()
+    )
+
+    # Técnico só transfere dentro do projeto (mesma regra de editar_atleta)
+    somente_mesmo_projeto = not (current_user.is_admin or current_user.is_coord)
+
+    form = TransferirAtletasForm()
+
+    atletas_query = (
+        db.session.query(Atleta.id, Atleta.firstname_atleta, Atleta.lastname_atleta)
+        .filter(Atleta.equipe_id == equipe.id)
+        .order_by(Atleta.firstname_atleta, Atleta.lastname_atleta)
+    )
+
+    form.atleta_ids.choices = [
+        (atleta_id, f"{firstname} {lastname or ''}".strip())
+        for atleta_id, firstname, lastname in atletas_query.all()
+    ]
+
+    equipe_query = (
+        db.session.query(Equipe.id, Equipe.nome_equipe, Projeto.nome_projeto)
+        .join(Projeto, Projeto.id == Equipe.projeto_id)
+        .filter(Equipe.id != equipe.id)
+        .order_by(Equipe.nome_equipe)
+    )
+
+    if somente_mesmo_projeto:
+        equipe_query = equipe_query.filter(Projeto.id == equipe.projeto_id)
+
+    form.equipe_destino_id.choices = [(0, "Selecione uma equipe.")] + [
+        (destino_id, f"{nome_equipe} - {nome_projeto_destino}")
+        for destino_id, nome_equipe, nome_projeto_destino in equipe_query.all()
+    ]
+
+    if form.validate_on_submit():
+        try:
+            resultado = transferir_atletas(
+                form.atleta_ids.data,
+                form.equipe_destino_id.data,
+                escopo=escopo_atual(),
+                responsavel_id=current_user.id,
+                somente_mesmo_projeto=somente_mesmo_projeto,
+            )
+            db.session.commit()
+        except ValueError as erro:
+            db.session.rollback()
+            flash(str(erro), "danger")
+        except Exception:
+            db.session.rollback()
+            flash("Erro ao transferir atletas.", "danger")
+        else:
+            flash(f"{resultado.transferidos} atleta(s) transferido(s) com sucesso!", "success")
+            return redirect(url_for("visualizar_equipe", equipe_id=equipe.id))
+
+    return render_template("transferir_atletas.html", form=form, equipe=equipe, nome_projeto=nome_projeto)
+
 @app.route('/editar/atleta/', methods=["GET","POST"])
 @login_required
 def editar_atleta():
     atleta_id = request.args.get("atleta_id", type=int)
 
     #Verifica se tem acesso(admin ou coordenador do projeto ou tecnico da equipe)
-    
-    atleta_query = (
-    db.session.query(Atleta, Projeto)
-    .join(Equipe, Equipe.id == Atleta.equipe_id)
-    .join(Projeto, Projeto.id == Equipe.projeto_id)
-    .filter(Atleta.id == atleta_id)
-    )
-
-    if current_user.is_admin:
-        pass
-    elif current_user.is_coord:
-        atleta_query = atleta_query.filter(
-            Projeto.responsavel_id == current_user.id
-        )
-    elif current_user.is_tecnico:
-        atleta_query = atleta_query.filter(
-            Equipe.tecnico_id == current_user.id
-        )
-    else:
+    if not (current_user.is_admin or current_user.is_coord or current_user.is_tecnico):
         abort(403)
 
-    result = atleta_query.first_or_404()
-    atleta = result.Atleta
-    projeto_atual = result.Projeto
+    atleta, projeto_atual_id = (
+        db.session.query(Atleta, Equipe.projeto_id)
+        .join(Equipe, Equipe.id == Atleta.equipe_id)
+        .filter(Atleta.id == atleta_id)
+        .first_or_404()
+    )
+
+    if not escopo_atual().pode_gerenciar_equipe(atleta.equipe_id):
+        abort(404)
 
     # 🔒 Salvando estado anterior
     status_anterior_id = atleta.status_id
     equipe_anterior_id = atleta.equipe_id
-    projeto_anterior_id = projeto_atual.id
+    projeto_anterior_id = projeto_atual_id
 
     form = AtletaForm(obj=atleta)
 
@@ -1221,7 +1288,7 @@ def editar_atleta():
     elif current_user.is_tecnico:
         # Aparece somente equipes do projeto do atleta e não mais equipes do técnico
         equipe_query = equipe_query.filter(
-            Projeto.id == projeto_atual.id
+            Projeto.id == projeto_atual_id
         )
 
     form.equipe_id.choices = [
@@ -1232,20 +1299,15 @@ def editar_atleta():
     # =========================
     # DEMAIS SELECTS
     # =========================
-    form.sexo_id.choices = [(s.id, s.sexo.title()) for s in Sexo.query.all()]
-    form.modalidade_id.choices = [(m.id, m.nome_modalidade.title()) for m in Modalidade.query.all()]
-    form.posicao_id.choices = [(p.id, p.nome_posicao.title()) for p in Posicao.query.all()]
-    form.categoria_id.choices = [(c.id, c.nome_categoria.title()) for c in Categoria.query.all()]
-    form.nivel_id.choices = [(n.id, n.nome_nivel.title()) for n in Nivel.query.all()]
-    form.status_id.choices = [(st.id, st.nome_status.title()) for st in Status.query.all()]
+    # Tabelas de referência vêm do cache (relidas só se o id enviado não estiver nele)
+    form.sexo_id.choices = referencias.choices("sexo", "Selecione.", incluir=form.sexo_id.data)
+    form.modalidade_id.choices = referencias.choices("modalidade", "Selecione a modalidade.", incluir=form.modalidade_id.data)
+    form.posicao_id.choices = referencias.choices("posicao", "Selecione a posição.", incluir=form.posicao_id.data)
+    form.categoria_id.choices = referencias.choices("categoria", "Selecione uma categoria.", incluir=form.categoria_id.data)
+    form.nivel_id.choices = referencias.choices("nivel", "Selecione o nível do atleta.", incluir=form.nivel_id.data)
+    form.status_id.choices = referencias.choices("status", "Selecione o status do atleta.", incluir=form.status_id.data)
 
     form.equipe_id.choices.insert(0, (0, "Selecione uma equipe."))
-    form.sexo_id.choices.insert(0, (0, "Selecione."))
-    form.modalidade_id.choices.insert(0, (0, "Selecione a modalidade."))
-    form.posicao_id.choices.insert(0, (0, "Selecione a posição."))
-    form.categoria_id.choices.insert(0, (0, "Selecione uma categoria."))
-    form.nivel_id.choices.insert(0, (0, "Selecione o nível do atleta."))
-    form.status_id.choices.insert(0, (0, "Selecione o status do atleta."))
 
     if form.validate_on_submit():
 
@@ -1329,45 +1391,19 @@ def editar_atleta():
 def criar_endereco_atleta():
     atleta_id = request.args.get("atleta_id", type=int)
 
-    atleta_endereco_query = (
-        db.session.query(Atleta)
-        .join(Equipe, Equipe.id == Atleta.equipe_id)
-        .join(Projeto, Projeto.id == Equipe.projeto_id)
-        .filter(Atleta.id == atleta_id)
-    )
-
     #Verifica se tem acesso(admin, coordenador do projeto ou tecnico da equipe do atleta)
-    if current_user.is_admin:
-        pass
-    elif current_user.is_coord:
-        atleta_endereco_query = atleta_endereco_query.filter(
-            Projeto.responsavel_id == current_user.id
-        )
-    elif current_user.is_tecnico:
-        atleta_endereco_query = atleta_endereco_query.filter(
-            Equipe.tecnico_id == current_user.id
-        )
-    else:
+    if not (current_user.is_admin or current_user.is_coord or current_user.is_tecnico):
         abort(403)
 
-    atleta = atleta_endereco_query.first_or_404()
+    atleta = Atleta.query.get_or_404(atleta_id)
+
+    if not escopo_atual().pode_gerenciar_equipe(atleta.equipe_id):
+        abort(404)
 
     form = EnderecoAtletaForm()
 
     # Popula cidades
-    form.cidade_id.choices = [
-        (cidade_id, f"{nome_cidade.title()} - {abreviacao}")
-        for cidade_id, nome_cidade, abreviacao in (
-            db.session.query(
-                Cidade.id,
-                Cidade.nome_cidade,
-                Estado.abreviacao
-            )
-            .join(Estado, Estado.id == Cidade.estado_id)
-            .order_by(Cidade.nome_cidade)
-            .all()
-        )
-    ]
+    form.cidade_id.choices = referencias.choices_cidades(incluir=form.cidade_id.data)
 
     # Placeholder padrão
     form.cidade_id.choices.insert(0, (0, "Selecione a cidade"))
@@ -1419,45 +1455,17 @@ def editar_endereco_atleta():
         )
     
     #Verifica se tem acesso(admin ou coordenador do projeto ou tecnico da equipe)
-
-    endereco_atleta_query = (
-    db.session.query(AtletaEndereco)
-    .join(Atleta, Atleta.id == AtletaEndereco.atleta_id)
-    .join(Equipe, Equipe.id == Atleta.equipe_id)
-    .join(Projeto, Projeto.id == Equipe.projeto_id)
-    .filter(AtletaEndereco.atleta_id == atleta.id)
-    )
-
-    if current_user.is_admin:
-        pass
-    elif current_user.is_coord:
-        endereco_atleta_query = endereco_atleta_query.filter(
-            Projeto.responsavel_id == current_user.id
-        )
-    elif current_user.is_tecnico:
-        endereco_atleta_query = endereco_atleta_query.filter(
-            Equipe.tecnico_id == current_user.id
-        )
-    else:
+    if not (current_user.is_admin or current_user.is_coord or current_user.is_tecnico):
         abort(403)
 
-    endereco_atleta = endereco_atleta_query.first_or_404()
+    if not escopo_atual().pode_gerenciar_equipe(atleta.equipe_id):
+        abort(404)
+
+    endereco_atleta = endereco_existe
 
     form = EnderecoAtletaForm(obj=endereco_atleta)
 
-    form.cidade_id.choices = [
-        (cidade_id, f"{nome_cidade.title()} - {abreviacao}")
-        for cidade_id, nome_cidade, abreviacao in (
-            db.session.query(
-                Cidade.id,
-                Cidade.nome_cidade,
-                Estado.abreviacao
-            )
-            .join(Estado, Estado.id == Cidade.estado_id)
-            .order_by(Cidade.nome_cidade)
-            .all()
-        )
-    ]
+    form.cidade_id.choices = referencias.choices_cidades(incluir=form.cidade_id.data)
 
     # Placeholder padrão
     form.cidade_id.choices.insert(0, (0, "Selecione a cidade"))
@@ -1491,208 +1499,165 @@ def visualizar_projeto():
     projeto_id = request.args.get('projeto_id', type=int)
 
     # Querys principais para a rota
-    projeto = db.session.query(Projeto).filter(Projeto.id == projeto_id).scalar()
+    projeto = db.session.query(Projeto).options(undefer(Projeto.descricao)).filter(Projeto.id == projeto_id).scalar()
     dados_projeto = {"id":projeto.id, "logo_id":projeto.logo_id, "nome_projeto":projeto.nome_projeto, "descricao":projeto.descricao, "is_active":bool(projeto.is_active)}
 
-    projeto_equipes = db.session.query(Equipe).filter_by(projeto_id=projeto.id)
-    projeto_atletas = db.session.query(Atleta).join(Equipe, Equipe.id == Atleta.equipe_id).filter(Equipe.projeto_id == projeto.id)
-    cidade = db.session.query(Cidade).filter(Cidade.id == projeto.cidade_id).scalar()
+    cidade = referencias.cidade(projeto.cidade_id)
+    nome_cidade = cidade[0] if cidade else ""
 
-    usuarios_query = db.session.query(Usuario)
-    modalidades_query = db.session.query(Modalidade)
-    posicoes_query = db.session.query(Posicao)
-    categorias_query = db.session.query(Categoria)
-    niveis_query = db.session.query(Nivel)
-    status_query = db.session.query(Status)
-
-    responsavel = usuarios_query.filter(Usuario.id == projeto.responsavel_id).scalar()
+    responsavel = db.session.query(Usuario).filter(Usuario.id == projeto.responsavel_id).scalar()
     nome_responsavel = f"{responsavel.firstname_usuario} {responsavel.lastname_usuario}".title()
 
-    #Dicionário tabela equipes-projeto
-    equipes = []
-    for equipe in projeto_equipes:
-        tecnico_equipe = usuarios_query.filter(Usuario.id == equipe.tecnico_id).scalar()
-        total_atletas = projeto_atletas.filter(Atleta.equipe_id == equipe.id).count()
-
-        equipes.append({"id":equipe.id, "logo_id":equipe.logo_id, "nome_equipe":equipe.nome_equipe,"tecnico":tecnico_equipe.firstname_usuario.title(), "is_active":bool(equipe.is_active),"total_atletas":total_atletas})
-
-    #Dicionário tabela atletas-equipe
-    atletas = []
-    for atleta in projeto_atletas:
-        equipe_atleta = projeto_equipes.filter(Equipe.id == atleta.equipe_id).scalar()
-
-        modalidade_atleta = modalidades_query.filter(Modalidade.id==atleta.modalidade_id).scalar().nome_modalidade
+    # Total de atletas por equipe (1 query agrupada)
+    atletas_por_equipe = contar_atletas_por_equipe(projeto_id=projeto.id)
 
-        posicao_atleta = posicoes_query.filter(Posicao.id==atleta.posicao_id).scalar().nome_posicao
+    #Dicionário tabela equipes-projeto (equipes + técnico em 1 query)
+    projeto_equipes = (
+        db.session.query(Equipe, Usuario.firstname_usuario)
+        .join(Usuario, Usuario.id == Equipe.tecnico_id)
+        .filter(Equipe.projeto_id == projeto.id)
+        .order_by(Equipe.id)
+    )
 
-        categoria_atleta = categorias_query.filter(Categoria.id==atleta.categoria_id).scalar().nome_categoria
+    equipes = []
+    for equipe, nome_tecnico in projeto_equipes:
+        total_atletas = atletas_por_equipe.get(equipe.id, 0)
 
-        nivel_atleta = niveis_query.filter(Nivel.id==atleta.nivel_id).scalar().nome_nivel
+        equipes.append({"id":equipe.id, "logo_id":equipe.logo_id, "nome_equipe":equipe.nome_equipe,"tecnico":nome_tecnico.title(), "is_active":bool(equipe.is_active),"total_atletas":total_atletas})
 
-        status_atleta = status_query.filter(Status.id==atleta.status_id).scalar().nome_status
+    carregar_versoes_imagens([projeto.logo_id] + [e["logo_id"] for e in equipes])
 
-        atletas.append({"id":atleta.id, "nome_atleta":atleta.firstname_atleta.title(), "equipe":equipe_atleta.nome_equipe, "modalidade":modalidade_atleta.title(), "posicao":posicao_atleta.title(), "categoria":categoria_atleta.title(), "nivel":nivel_atleta.title(), "status":status_atleta.title()})
+    #Tabela atletas-equipe: uma página do elenco (keyset, com filtros)
+    filtros = filtros_elenco()
+    pagina = carregar_pagina_elenco(projeto_id=projeto.id, **filtros)
     
     can_edit = ((current_user.is_admin) or (current_user.is_coord and current_user.id==projeto.responsavel_id))
         
-    return render_template('visualizar_projeto.html', projeto=dados_projeto, nome_cidade=cidade.nome_cidade.title(), nome_responsavel=nome_responsavel, n_equipes=projeto_equipes.count(), n_atletas=projeto_atletas.count(), equipes=equipes, atletas=atletas, can_edit=can_edit)
+    return render_template('visualizar_projeto.html', projeto=dados_projeto, nome_cidade=nome_cidade.title(), nome_responsavel=nome_responsavel, n_equipes=len(equipes), n_atletas=sum(atletas_por_equipe.values()), equipes=equipes, atletas=pagina.itens, proximo_cursor=pagina.proximo_cursor, filtros=filtros, opcoes_filtro=opcoes_filtro_elenco(), can_edit=can_edit)
 
 @app.route('/view/equipe/')
 @login_required
 def visualizar_equipe():
     equipe_id = request.args.get('equipe_id', type=int)
 
-    #Dados da equipe
-    equipe = Equipe.query.get_or_404(equipe_id)
-    projeto_equipe = db.session.query(Projeto).filter(Projeto.id==equipe.projeto_id).scalar()
-    tecnico_equipe = db.session.query(Usuario).filter(Usuario.id==equipe.tecnico_id).scalar()
+    #Dados da equipe (equipe, projeto e técnico em 1 query)
+    equipe, projeto_equipe, tecnico_equipe = (
+        db.session.query(Equipe, Projeto, Usuario)
+        .join(Projeto, Projeto.id == Equipe.projeto_id)
+        .join(Usuario, Usuario.id == Equipe.tecnico_id)
+        .filter(Equipe.id == equipe_id)
+        .first_or_404()
+    )
     tecnico_nome = f"{tecnico_equipe.firstname_usuario} {tecnico_equipe.lastname_usuario}"
 
-    atletas_equipe = Atleta.query.filter(Atleta.equipe_id==equipe.id)
+    #Atletas da equipe: uma página do elenco (keyset, com filtros)
+    filtros = filtros_elenco()
+    pagina = carregar_pagina_elenco(equipe_id=equipe.id, **filtros)
+    total_atletas = db.session.query(func.count(Atleta.id)).filter(Atleta.equipe_id == equipe.id).scalar()
 
-    modalidades_query = db.session.query(Modalidade)
-    posicoes_query = db.session.query(Posicao)
-    categorias_query = db.session.query(Categoria)
-    niveis_query = db.session.query(Nivel)
-    status_query = db.session.query(Status)
-
-    dados_equipe = {"id":equipe.id, "logo_id":equipe.logo_id, "nome_equipe":equipe.nome_equipe, "projeto_id":projeto_equipe.id, "projeto":projeto_equipe.nome_projeto,"tecnico":tecnico_nome.title(),"is_active":bool(equipe.is_active),"total_atletas":atletas_equipe.count()}
-
-    #Atletas da equipe
-    #Dicionário tabela atletas-equipe
-    atletas = []
-    for atleta in atletas_equipe:
-
-        modalidade_atleta = modalidades_query.filter(Modalidade.id==atleta.modalidade_id).scalar().nome_modalidade
-
-        posicao_atleta = posicoes_query.filter(Posicao.id==atleta.posicao_id).scalar().nome_posicao
-
-        categoria_atleta = categorias_query.filter(Categoria.id==atleta.categoria_id).scalar().nome_categoria
+    dados_equipe = {"id":equipe.id, "logo_id":equipe.logo_id, "nome_equipe":equipe.nome_equipe, "projeto_id":projeto_equipe.id, "projeto":projeto_equipe.nome_projeto,"tecnico":tecnico_nome.title(),"is_active":bool(equipe.is_active),"total_atletas":total_atletas}
+    carregar_versoes_imagens([equipe.logo_id])
+    
+    can_edit = ((current_user.is_admin) or (current_user.is_coord and current_user.id==projeto_equipe.responsavel_id) or (current_user.is_tecnico and current_user.id==equipe.tecnico_id))
 
-        nivel_atleta = niveis_query.filter(Nivel.id==atleta.nivel_id).scalar().nome_nivel
+    return render_template("visualizar_equipe.html", equipe=dados_equipe, atletas=pagina.itens, proximo_cursor=pagina.proximo_cursor, filtros=filtros, opcoes_filtro=opcoes_filtro_elenco(), can_edit=can_edit)
 
-        status_atleta = status_query.filter(Status.id==atleta.status_id).scalar().nome_status
+@app.route('/elenco/atletas/')
+@login_required
+def feed_elenco():
+    # Paginação (keyset) do elenco de um projeto ou equipe
+    projeto_id = request.args.get("projeto_id", type=int)
+    equipe_id = request.args.get("equipe_id", type=int)
 
-        atletas.append({"id":atleta.id, "nome_atleta":atleta.firstname_atleta.title(), "equipe":equipe.nome_equipe, "modalidade":modalidade_atleta.title(), "posicao":posicao_atleta.title(), "categoria":categoria_atleta.title(), "nivel":nivel_atleta.title(), "status":status_atleta.title()})
+    if projeto_id is None and equipe_id is None:
+        abort(400)
 
-        if (current_user.is_admin) or (current_user.is_coord and current_user.id==projeto_equipe.responsavel_id):
-            can_edit = True
-    
-    can_edit = ((current_user.is_admin) or (current_user.is_coord and current_user.id==projeto_equipe.responsavel_id) or (current_user.is_tecnico and current_user.id==equipe.tecnico_id))
+    pagina = carregar_pagina_elenco(projeto_id=projeto_id, equipe_id=equipe_id, **filtros_elenco())
 
-    return render_template("visualizar_equipe.html", equipe=dados_equipe, atletas=atletas, can_edit=can_edit)
+    return jsonify({"atletas": pagina.itens, "proximo_cursor": pagina.proximo_cursor})
 
 @app.route('/view/atleta/')
 @login_required
 def visualizar_atleta():
     atleta_id = request.args.get('atleta_id', type=int)
 
-    status_query = db.session.query(Status)
-    equipes_query = db.session.query(Equipe)
-    projetos_query = db.session.query(Projeto)
-
-    atleta = Atleta.query.get_or_404(atleta_id)
-    nome_atleta = (f"{atleta.firstname_atleta} {atleta.lastname_atleta}" if atleta.lastname_atleta else atleta.firstname_atleta)
-    equipe_atleta = equipes_query.filter(Equipe.id==atleta.equipe_id).scalar()
-    projeto_atleta = projetos_query.filter(Projeto.id==equipe_atleta.projeto_id).scalar()
-    status_atleta = status_query.filter(Status.id==atleta.status_id).scalar()
-    modalidade_atleta = db.session.query(Modalidade.nome_modalidade).filter(Modalidade.id==atleta.modalidade_id).scalar()
-    posicao_atleta = db.session.query(Posicao.nome_posicao).filter(Posicao.id==atleta.posicao_id).scalar()
-    categoria_atleta = db.session.query(Categoria.nome_categoria).filter(Categoria.id==atleta.categoria_id).scalar()
-    nivel_atleta = db.session.query(Nivel.nome_nivel).filter(Nivel.id==atleta.nivel_id).scalar()
-    sexo_atleta = db.session.query(Sexo.sexo).filter(Sexo.id==atleta.sexo_id).scalar()
-
-    dados_atleta = {"id":atleta.id, "nome_atleta":nome_atleta.title(), "equipe_id":equipe_atleta.id, "equipe":equipe_atleta.nome_equipe, "projeto": projeto_atleta.nome_projeto, "status":status_atleta.nome_status.title(), "modalidade":modalidade_atleta.title(), "posicao":posicao_atleta.title(), "categoria":categoria_atleta.title(), "nivel":nivel_atleta.title(), "sexo":sexo_atleta.title()}
+    # Atleta + dimensões + endereço e histórico (2 queries, com cache curto por atleta)
+    perfil = carregar_perfil_atleta(atleta_id)
+    if perfil is None:
+        abort(404)
 
     dados_pessoais_atleta = None
     dados_endereco = None
 
     # DADOS PRIVADOS
 
-    can_edit = ((current_user.is_admin) or (current_user.is_coord and current_user.id==projeto_atleta.responsavel_id) or (current_user.is_tecnico and current_user.id==equipe_atleta.tecnico_id))
-        
+    # Permissão resolvida a cada requisição (fora do cache): equipe atual do
+    # atleta contra o escopo do usuário (admin e usuários sem equipes não consultam)
+    escopo = escopo_atual()
+    can_edit = escopo.todos
+    if not can_edit and escopo.equipes_gerenciadas:
+        equipe_id = db.session.query(Atleta.equipe_id).filter(Atleta.id == atleta_id).scalar()
+        can_edit = escopo.pode_gerenciar_equipe(equipe_id)
+
     if can_edit:
 
+        pessoais = perfil.dados_pessoais
         dados_pessoais_atleta = {
-            "email":atleta.email,
-            "telefone1":format_telefone(atleta.telefone1),
-            "telefone2":format_telefone(atleta.telefone2),
-            "rg":format_rg(atleta.rg),
-            "cpf":format_cpf(atleta.cpf),
-            "cuca":atleta.registro_cuca,
-            "cbv":atleta.registro_cbv,
-            "data_nascimento":datetime.strftime(atleta.data_nascimento,"%d/%m/%Y")
+            "email":pessoais["email"],
+            "telefone1":format_telefone(pessoais["telefone1"]),
+            "telefone2":format_telefone(pessoais["telefone2"]),
+            "rg":format_rg(pessoais["rg"]),
+            "cpf":format_cpf(pessoais["cpf"]),
+            "cuca":pessoais["cuca"],
+            "cbv":pessoais["cbv"],
+            "data_nascimento":datetime.strftime(pessoais["data_nascimento"],"%d/%m/%Y")
         }
 
-        endereco_atleta = db.session.query(AtletaEndereco).filter(AtletaEndereco.atleta_id==atleta.id).scalar()
+        endereco_atleta = perfil.endereco
 
         if endereco_atleta:
 
-            cidade_atleta = db.session.query(Cidade).filter(Cidade.id == endereco_atleta.cidade_id).scalar()
-            estado_abr_atleta = db.session.query(Estado.abreviacao).filter(Estado.id == cidade_atleta.estado_id).scalar()
-
-            dados_endereco = {"logradouro":endereco_atleta.logradouro.title(), "numero":endereco_atleta.numero, "complemento": endereco_atleta.complemento.title(), "bairro":endereco_atleta.bairro.title(), "cidade":cidade_atleta.nome_cidade.title(), "estado_abreviacao":estado_abr_atleta.upper(), "cep":format_cep(endereco_atleta.cep)}
-
-    # HISTÓRICO (1 QUERY)
-    
-    historico_rows = (
-        db.session.query(
-            AtletaHistorico,
-            Status.nome_status,
-            Projeto.nome_projeto,
-            Equipe.nome_equipe,
-            Usuario.firstname_usuario
-        )
-        .join(Status, Status.id == AtletaHistorico.status_id)
-        .join(Projeto, Projeto.id == AtletaHistorico.projeto_id)
-        .join(Equipe, Equipe.id == AtletaHistorico.equipe_id)
-        .join(Usuario, Usuario.id == AtletaHistorico.responsavel_id)
-        .filter(AtletaHistorico.atleta_id == atleta.id)
-        .order_by(AtletaHistorico.created_at.desc())
-        .all()
-    )
-
-    historico = []
-    for h, status_nome, projeto_nome, equipe_nome, responsavel_nome in historico_rows:
-        historico.append({
-            "status": status_nome.title(),
-            "motivo": h.motivo,
-            "projeto": projeto_nome,
-            "equipe": equipe_nome,
-            "responsavel": responsavel_nome.title(),
-            "created_at": h.created_at.strftime("%d/%m/%Y %H:%M"),
-        })
+            dados_endereco = {"logradouro":endereco_atleta["logradouro"].title(), "numero":endereco_atleta["numero"], "complemento": endereco_atleta["complemento"].title(), "bairro":endereco_atleta["bairro"].title(), "cidade":endereco_atleta["cidade"].title(), "estado_abreviacao":endereco_atleta["estado_abreviacao"].upper(), "cep":format_cep(endereco_atleta["cep"])}
 
-    return render_template("visualizar_atleta.html", atleta=dados_atleta, endereco=dados_endereco, historico=historico, dados_pessoais_atleta= dados_pessoais_atleta, can_edit=can_edit)
+    return render_template("visualizar_atleta.html", atleta=perfil.atleta, endereco=dados_endereco, historico=perfil.historico, dados_pessoais_atleta= dados_pessoais_atleta, can_edit=can_edit)
 
 @app.route("/blog")
 @login_required
 def blog_feed():
-    posts = BlogPost.query.order_by(BlogPost.created_at.desc()).all()
-
-    autores = {
-        u.id: u.firstname_usuario.title()
-        for u in Usuario.query.filter(
-            Usuario.id.in_([p.autor_id for p in posts])
-        ).all()
-    }
-
-    posts_formatados = []
-    for post in posts:
-
-        if post.updated_at != post.created_at:
-            data_atualizacao = post.updated_at.strftime("%d/%m/%Y")
-        else:
-            data_atualizacao = None
-        
-        posts_formatados.append({"id":post.id, "autor":autores.get(post.autor_id, "Desconhecido"), "data_criacao":post.created_at.strftime("%d/%m/%Y"), "data_atualizacao":data_atualizacao, "can_edit":pode_editar_post(post=post, user=current_user), "imagem_id":post.imagem_id, "titulo":post.titulo, "subtitulo":post.subtitulo, "texto":post.texto, "link_acao":post.link_acao})
+    # Primeira página (ou a do ?cursor=); as seguintes vêm de /blog/posts/
+    pagina = carregar_pagina_blog(pode_editar_post_atual, cursor=request.args.get("cursor") or None)
 
     return render_template(
         "blog/feed.html",
-        posts=posts_formatados,
+        posts=pagina.itens,
+        cartoes=pagina.cartoes,
+        proximo_cursor=pagina.proximo_cursor,
         can_create=pode_criar_post(current_user)
     )
 
+@app.route("/blog/posts/")
+@login_required
+def feed_blog():
+    # Paginação (keyset) do feed: itens, HTML pronto para anexar e próximo cursor
+    pagina = carregar_pagina_blog(pode_editar_post_atual, limite=request.args.get("limite", type=int), cursor=request.args.get("cursor") or None)
+
+    return jsonify({
+        "posts": pagina.itens,
+        "html": render_template("blog/_posts.html", posts=pagina.itens, cartoes=pagina.cartoes),
+        "proximo_cursor": pagina.proximo_cursor,
+    })
+
+@app.route("/blog/<int:post_id>")
+@login_required
+def visualizar_post(post_id):
+    post = carregar_post(post_id, pode_editar_post_atual)
+    if post is None:
+        abort(404)
+
+    carregar_versoes_imagens([post["imagem_id"]])
+
+    return render_template("blog/post.html", post=post)
+
 @app.route("/blog/novo", methods=["GET", "POST"])
 @login_required
 def criar_post():
@@ -1707,16 +1672,7 @@ def criar_post():
 
             # 🔹 salva imagem primeiro
             if form.imagem.data:
-                file = form.imagem.data
-
-                imagem = Imagem(
-                    img=file.read(),
-                    name=secure_filename(file.filename),
-                    mimetype=file.mimetype
-                )
-                db.session.add(imagem)
-                db.session.flush()
-
+                imagem = salvar_imagem(form.imagem.data)
                 imagem_id = imagem.id
 
             post = BlogPost(
@@ -1743,7 +1699,7 @@ def criar_post():
 @app.route("/blog/<int:post_id>/editar", methods=["GET", "POST"])
 @login_required
 def editar_post(post_id):
-    post = BlogPost.query.get_or_404(post_id)
+    post = BlogPost.query.options(undefer(BlogPost.texto)).filter_by(id=post_id).first_or_404()
 
     # permissão
     if not pode_editar_post(post=post, user=current_user):
@@ -1760,25 +1716,18 @@ def editar_post(post_id):
 
             # 🔹 nova imagem enviada
             if form.imagem.data:
-                file = form.imagem.data
-
                 if post.imagem_id:
                     # edita imagem existente
-                    imagem = Imagem.query.get_or_404(post.imagem_id)
-                    imagem.img = file.read()
-                    imagem.name = secure_filename(file.filename)
-                    imagem.mimetype = file.mimetype
+                    salvar_imagem(form.imagem.data, imagem=Imagem.query.get_or_404(post.imagem_id))
                 else:
                     # cria imagem
-                    imagem = Imagem(
-                        img=file.read(),
-                        name=secure_filename(file.filename),
-                        mimetype=file.mimetype
-                    )
-                    db.session.add(imagem)
-                    db.session.flush()
+                    imagem = salvar_imagem(form.imagem.data)
                     post.imagem_id = imagem.id
 
+                # troca só da imagem não mexe nas colunas do post; o updated_at
+                # novo descarta o cartão em cache (inclusive em outros processos)
+                post.updated_at = datetime.now()
+
             db.session.commit()
             flash("Post atualizado com sucesso!", "success")
             return redirect(url_for("blog_feed"))
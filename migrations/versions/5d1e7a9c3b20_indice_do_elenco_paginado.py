@@ -0,0 +1,38 @@
+"""indice do elenco paginado
+
+Revision ID: 5d1e7a9c3b20
+Revises: fc188dec79f2
+Create Date: 2026-10-17 19:02:11.418532
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d1e7a9c3b20'
+down_revision = 'fc188dec79f2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Índice por expressão: o autogenerate não consegue compará-lo, por isso é
+    # criado fora do batch_alter_table (escrito à mão)
+    op.create_index(
+        'ix_atletas_equipe_id_sobrenome_id',
+        'atletas',
+        ['equipe_id', sa.text("coalesce(lastname_atleta, '')"), 'id'],
+        unique=False,
+    )
+
+    # O índice acima começa por equipe_id e já cobre a FK
+    with op.batch_alter_table('atletas', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_atletas_equipe_id'))
+
+
+def downgrade():
+    with op.batch_alter_table('atletas', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_atletas_equipe_id'), ['equipe_id'], unique=False)
+
+    op.drop_index('ix_atletas_equipe_id_sobrenome_id', table_name='atletas')
@@ -0,0 +1,78 @@
+"""indices de busca (pg_trgm/tsvector no Postgres, FTS5 no SQLite)
+
+Revision ID: 9b4f2c7e1a68
+Revises: 5d1e7a9c3b20
+Create Date: 2026-10-17 19:41:37.205114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b4f2c7e1a68'
+down_revision = '5d1e7a9c3b20'
+branch_labels = None
+depends_on = None
+
+# Expressões indexadas; precisam ser idênticas às geradas por busca.py
+TEXTOS = {
+    'projetos': "f_unaccent(lower(nome_projeto))",
+    'equipes': "f_unaccent(lower(nome_equipe))",
+    'atletas': "f_unaccent(lower(firstname_atleta || ' ' || coalesce(lastname_atleta, '')))",
+}
+
+DDL_FTS = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS busca_fts USING fts5(titulo, tokenize = 'unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS busca_projetos_ai AFTER INSERT ON projetos BEGIN INSERT INTO busca_fts(rowid, titulo) VALUES (new.id * 4 + 1, new.nome_projeto); END",
+    "CREATE TRIGGER IF NOT EXISTS busca_projetos_au AFTER UPDATE OF nome_projeto ON projetos BEGIN UPDATE busca_fts SET titulo = new.nome_projeto WHERE rowid = new.id * 4 + 1; END",
+    "CREATE TRIGGER IF NOT EXISTS busca_projetos_ad AFTER DELETE ON projetos BEGIN DELETE FROM busca_fts WHERE rowid = old.id * 4 + 1; END",
+    "CREATE TRIGGER IF NOT EXISTS busca_equipes_ai AFTER INSERT ON equipes BEGIN INSERT INTO busca_fts(rowid, titulo) VALUES (new.id * 4 + 2, new.nome_equipe); END",
+    "CREATE TRIGGER IF NOT EXISTS busca_equipes_au AFTER UPDATE OF nome_equipe ON equipes BEGIN UPDATE busca_fts SET titulo = new.nome_equipe WHERE rowid = new.id * 4 + 2; END",
+    "CREATE TRIGGER IF NOT EXISTS busca_equipes_ad AFTER DELETE ON equipes BEGIN DELETE FROM busca_fts WHERE rowid = old.id * 4 + 2; END",
+    "CREATE TRIGGER IF NOT EXISTS busca_atletas_ai AFTER INSERT ON atletas BEGIN INSERT INTO busca_fts(rowid, titulo) VALUES (new.id * 4 + 3, new.firstname_atleta || ' ' || coalesce(new.lastname_atleta, '')); END",
+    "CREATE TRIGGER IF NOT EXISTS busca_atletas_au AFTER UPDATE OF firstname_atleta, lastname_atleta ON atletas BEGIN UPDATE busca_fts SET titulo = new.firstname_atleta || ' ' || coalesce(new.lastname_atleta, '') WHERE rowid = new.id * 4 + 3; END",
+    "CREATE TRIGGER IF NOT EXISTS busca_atletas_ad AFTER DELETE ON atletas BEGIN DELETE FROM busca_fts WHERE rowid = old.id * 4 + 3; END",
+    "INSERT INTO busca_fts(rowid, titulo) SELECT id * 4 + 1, nome_projeto FROM projetos",
+    "INSERT INTO busca_fts(rowid, titulo) SELECT id * 4 + 2, nome_equipe FROM equipes",
+    "INSERT INTO busca_fts(rowid, titulo) SELECT id * 4 + 3, firstname_atleta || ' ' || coalesce(lastname_atleta, '') FROM atletas",
+]
+
+
+def upgrade():
+    dialeto = op.get_bind().dialect.name
+
+    if dialeto == 'sqlite':
+        for comando in DDL_FTS:
+            op.execute(comando)
+
+    elif dialeto == 'postgresql':
+        # Requer permissão para criar extensões (ou que já estejam instaladas)
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+        # unaccent() não é IMMUTABLE; o wrapper permite usá-lo em índices
+        op.execute(
+            "CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text "
+            "LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT "
+            "AS $$ SELECT public.unaccent('public.unaccent', $1) $$"
+        )
+
+        for tabela, expressao in TEXTOS.items():
+            op.execute(f"CREATE INDEX ix_{tabela}_busca_trgm ON {tabela} USING gin ({expressao} gin_trgm_ops)")
+            op.execute(f"CREATE INDEX ix_{tabela}_busca_tsv ON {tabela} USING gin (to_tsvector('simple', {expressao}))")
+
+
+def downgrade():
+    dialeto = op.get_bind().dialect.name
+
+    if dialeto == 'sqlite':
+        for tabela in ('projetos', 'equipes', 'atletas'):
+            for sufixo in ('ai', 'au', 'ad'):
+                op.execute(f"DROP TRIGGER IF EXISTS busca_{tabela}_{sufixo}")
+        op.execute("DROP TABLE IF EXISTS busca_fts")
+
+    elif dialeto == 'postgresql':
+        for tabela in TEXTOS:
+            op.execute(f"DROP INDEX IF EXISTS ix_{tabela}_busca_tsv")
+            op.execute(f"DROP INDEX IF EXISTS ix_{tabela}_busca_trgm")
+        op.execute("DROP FUNCTION IF EXISTS f_unaccent(text)")
@@ -1,9 +1,10 @@
 from datetime import datetime
-from sqlalchemy import MetaData, event
+from sqlalchemy import Column, MetaData, PrimaryKeyConstraint, UniqueConstraint, event
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from sqlalchemy.engine import Engine
 import sqlite3
+import hashlib
 
 @event.listens_for(Engine, "connect")
 def enable_sqlite_fk(dbapi_connection, connection_record):
@@ -62,7 +63,9 @@ class Cidade(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     nome_cidade = db.Column(db.String(40), unique=True, nullable=False)
-    estado_id = db.Column(db.Integer, db.ForeignKey('estados.id', ondelete="RESTRICT"), nullable=False)
+    estado_id = db.Column(db.Integer, db.ForeignKey('estados.id', ondelete="RESTRICT"), nullable=False, index=True)
+
+    estado = db.relationship('Estado')
     
     def __repr__(self):
         return f'<Cidade {self.nome_cidade}>'
@@ -71,14 +74,19 @@ class Projeto(db.Model):
     __tablename__ = 'projetos' 
 
     id = db.Column(db.Integer, primary_key=True)
-    logo_id = db.Column(db.Integer, db.ForeignKey('imagens.id', ondelete='RESTRICT'),nullable=True)
+    logo_id = db.Column(db.Integer, db.ForeignKey('imagens.id', ondelete='RESTRICT'),nullable=True, index=True)
     nome_projeto = db.Column(db.String(80), unique=True, nullable=False)
-    descricao = db.Column(db.Text, nullable=True)
+    descricao = db.deferred(db.Column(db.Text, nullable=True)) # Carregado só quando acessado
     is_active = db.Column(db.Boolean, default=True, nullable=False)
-    cidade_id = db.Column(db.Integer, db.ForeignKey('cidades.id', ondelete="RESTRICT"), nullable=False)
-    responsavel_id = db.Column(db.Integer, db.ForeignKey('usuarios.id', ondelete="RESTRICT"), nullable=False)
+    cidade_id = db.Column(db.Integer, db.ForeignKey('cidades.id', ondelete="RESTRICT"), nullable=False, index=True)
+    responsavel_id = db.Column(db.Integer, db.ForeignKey('usuarios.id', ondelete="RESTRICT"), nullable=False, index=True)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.now) 
     last_edited = db.Column(db.DateTime, nullable=False, default=datetime.now, onupdate=datetime.now) 
+
+    # Só muitos-para-um, sem backref (usados pelo admin com joinedload)
+    cidade = db.relationship('Cidade')
+    responsavel = db.relationship('Usuario')
+    logo = db.relationship('Imagem')
      
     def __repr__(self):
         return f'<Projeto {self.nome_projeto} (Is_active:{self.is_active})>'
@@ -87,13 +95,16 @@ class Equipe(db.Model):
     __tablename__ = 'equipes' 
 
     id = db.Column(db.Integer, primary_key=True)
-    logo_id = db.Column(db.Integer, db.ForeignKey('imagens.id', ondelete='RESTRICT'),nullable=True)
+    logo_id = db.Column(db.Integer, db.ForeignKey('imagens.id', ondelete='RESTRICT'),nullable=True, index=True)
     nome_equipe = db.Column(db.String(80), unique=True, nullable=False)
-    projeto_id = db.Column(db.Integer, db.ForeignKey('projetos.id', ondelete="RESTRICT"), nullable=False)
-    tecnico_id = db.Column(db.Integer, db.ForeignKey('usuarios.id', ondelete="RESTRICT"), nullable=False)
+    projeto_id = db.Column(db.Integer, db.ForeignKey('projetos.id', ondelete="RESTRICT"), nullable=False, index=True)
+    tecnico_id = db.Column(db.Integer, db.ForeignKey('usuarios.id', ondelete="RESTRICT"), nullable=False, index=True)
     is_active = db.Column(db.Boolean, default=True, nullable=False)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.now) 
     last_edited = db.Column(db.DateTime, nullable=False, default=datetime.now, onupdate=datetime.now) 
+
+    tecnico = db.relationship('Usuario')
+    logo = db.relationship('Imagem')
      
     def __repr__(self):
         return f'<Equipe {self.nome_equipe} (ProjetoID:{self.projeto_id} - Is_active:{self.is_active})>'
@@ -154,9 +165,15 @@ class Sexo(db.Model):
 
 class Atleta(db.Model):
     __tablename__ = 'atletas' 
+    __table_args__ = (
+        # Contagens por status dentro das equipes (dashboards)
+        db.Index('ix_atletas_status_id_equipe_id', 'status_id', 'equipe_id'),
+        # Elenco paginado por (sobrenome, id) dentro da equipe (elenco.py)
+        db.Index('ix_atletas_equipe_id_sobrenome_id', 'equipe_id', db.text("coalesce(lastname_atleta, '')"), 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    equipe_id = db.Column(db.Integer, db.ForeignKey('equipes.id', ondelete="RESTRICT"), nullable=False)
+    equipe_id = db.Column(db.Integer, db.ForeignKey('equipes.id', ondelete="RESTRICT"), nullable=False) # Coberto por ix_atletas_equipe_id_sobrenome_id
     firstname_atleta = db.Column(db.String(80), nullable=False)
     lastname_atleta = db.Column(db.String(80), nullable=True) # NO
     email = db.Column(db.String(120), nullable=True) #NO
@@ -167,14 +184,17 @@ class Atleta(db.Model):
     data_nascimento =  db.Column(db.Date, nullable=False)
     telefone1 = db.Column(db.String(20), nullable=False)
     telefone2 = db.Column(db.String(20), nullable=True) #NO
-    sexo_id = db.Column(db.Integer, db.ForeignKey('sexos.id', ondelete="RESTRICT"), nullable=False)
-    modalidade_id = db.Column(db.Integer, db.ForeignKey('modalidades.id', ondelete="RESTRICT"), nullable=False)
-    posicao_id = db.Column(db.Integer, db.ForeignKey('posicoes.id', ondelete="RESTRICT"), nullable=False)
-    categoria_id = db.Column(db.Integer, db.ForeignKey('categorias.id', ondelete="RESTRICT"), nullable=False)
-    nivel_id = db.Column(db.Integer, db.ForeignKey('niveis.id', ondelete="RESTRICT"), nullable=False)
+    sexo_id = db.Column(db.Integer, db.ForeignKey('sexos.id', ondelete="RESTRICT"), nullable=False, index=True)
+    modalidade_id = db.Column(db.Integer, db.ForeignKey('modalidades.id', ondelete="RESTRICT"), nullable=False, index=True)
+    posicao_id = db.Column(db.Integer, db.ForeignKey('posicoes.id', ondelete="RESTRICT"), nullable=False, index=True)
+    categoria_id = db.Column(db.Integer, db.ForeignKey('categorias.id', ondelete="RESTRICT"), nullable=False, index=True)
+    nivel_id = db.Column(db.Integer, db.ForeignKey('niveis.id', ondelete="RESTRICT"), nullable=False, index=True)
     status_id = db.Column(db.Integer, db.ForeignKey('status.id', ondelete="RESTRICT"), nullable=False)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.now) 
     last_edited = db.Column(db.DateTime, nullable=False, default=datetime.now, onupdate=datetime.now) 
+
+    equipe = db.relationship('Equipe')
+    status = db.relationship('Status')
      
     def __repr__(self):
         return f'<Atleta {self.firstname_atleta} (EquipeID:{self.equipe_id} - StatusID:{self.status_id})>'
@@ -183,16 +203,19 @@ class AtletaEndereco(db.Model):
     __tablename__ = 'enderecos'
 
     id = db.Column(db.Integer, primary_key=True)
-    atleta_id = db.Column(db.Integer, db.ForeignKey('atletas.id', ondelete="CASCADE"), nullable=False)
+    atleta_id = db.Column(db.Integer, db.ForeignKey('atletas.id', ondelete="CASCADE"), nullable=False, index=True)
     logradouro = db.Column(db.String(255), nullable=False)
     numero = db.Column(db.String(20), nullable=True) #NO
     complemento = db.Column(db.String(100), nullable=True) #NO
     bairro = db.Column(db.String(100), nullable=True) #NO
-    cidade_id = db.Column(db.Integer, db.ForeignKey('cidades.id', ondelete="RESTRICT"), nullable=False)
+    cidade_id = db.Column(db.Integer, db.ForeignKey('cidades.id', ondelete="RESTRICT"), nullable=False, index=True)
     cep = db.Column(db.String(8), nullable=True) #NO
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.now) 
     last_edited = db.Column(db.DateTime, nullable=False, default=datetime.now, onupdate=datetime.now) 
 
+    atleta = db.relationship('Atleta')
+    cidade = db.relationship('Cidade')
+
     def __repr__(self):
         return f'<AtletaEndereco {self.logradouro} (AtletaID:{self.atleta_id})>'
 
@@ -200,29 +223,44 @@ class Transferencia(db.Model):
     __tablename__ = 'transferencias'
 
     id = db.Column(db.Integer, primary_key=True)
-    atleta_id = db.Column(db.Integer, db.ForeignKey('atletas.id', ondelete="RESTRICT"), nullable=False)
-    projeto_origem_id = db.Column(db.Integer, db.ForeignKey('projetos.id', ondelete="RESTRICT"), nullable=False)
-    equipe_origem_id = db.Column(db.Integer, db.ForeignKey('equipes.id', ondelete="RESTRICT"), nullable=False)
-    projeto_destino_id = db.Column(db.Integer, db.ForeignKey('projetos.id', ondelete="RESTRICT"), nullable=False)
-    equipe_destino_id = db.Column(db.Integer, db.ForeignKey('equipes.id', ondelete="RESTRICT"), nullable=False)
+    atleta_id = db.Column(db.Integer, db.ForeignKey('atletas.id', ondelete="RESTRICT"), nullable=False, index=True)
+    projeto_origem_id = db.Column(db.Integer, db.ForeignKey('projetos.id', ondelete="RESTRICT"), nullable=False, index=True)
+    equipe_origem_id = db.Column(db.Integer, db.ForeignKey('equipes.id', ondelete="RESTRICT"), nullable=False, index=True)
+    projeto_destino_id = db.Column(db.Integer, db.ForeignKey('projetos.id', ondelete="RESTRICT"), nullable=False, index=True)
+    equipe_destino_id = db.Column(db.Integer, db.ForeignKey('equipes.id', ondelete="RESTRICT"), nullable=False, index=True)
     motivo = db.Column(db.String(255), nullable=True)
-    responsavel_id = db.Column(db.Integer, db.ForeignKey('usuarios.id', ondelete="RESTRICT"), nullable=False)
+    responsavel_id = db.Column(db.Integer, db.ForeignKey('usuarios.id', ondelete="RESTRICT"), nullable=False, index=True)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.now) 
 
+    atleta = db.relationship('Atleta')
+    equipe_origem = db.relationship('Equipe', foreign_keys=[equipe_origem_id])
+    equipe_destino = db.relationship('Equipe', foreign_keys=[equipe_destino_id])
+    responsavel = db.relationship('Usuario')
+
     def __repr__(self):
         return f'<Transferencia {self.projeto_origem_id}/{self.equipe_origem_id} -> {self.projeto_destino_id}/{self.equipe_destino_id} (AtletaID:{self.atleta_id})>'
 
 class AtletaHistorico(db.Model):
     __tablename__ = 'historicos'
+    __table_args__ = (
+        # Histórico do atleta ordenado por data (visualizar_atleta)
+        db.Index('ix_historicos_atleta_id_created_at', 'atleta_id', 'created_at'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     atleta_id = db.Column(db.Integer, db.ForeignKey('atletas.id', ondelete="RESTRICT"), nullable=False)
-    projeto_id = db.Column(db.Integer, db.ForeignKey('projetos.id', ondelete="RESTRICT"), nullable=False)
-    equipe_id = db.Column(db.Integer, db.ForeignKey('equipes.id', ondelete="RESTRICT"), nullable=False)
-    status_id = db.Column(db.Integer, db.ForeignKey('status.id', ondelete="RESTRICT"), nullable=False)
+    projeto_id = db.Column(db.Integer, db.ForeignKey('projetos.id', ondelete="RESTRICT"), nullable=False, index=True)
+    equipe_id = db.Column(db.Integer, db.ForeignKey('equipes.id', ondelete="RESTRICT"), nullable=False, index=True)
+    status_id = db.Column(db.Integer, db.ForeignKey('status.id', ondelete="RESTRICT"), nullable=False, index=True)
     motivo = db.Column(db.String(255), nullable=True)
-    responsavel_id = db.Column(db.Integer, db.ForeignKey('usuarios.id', ondelete="RESTRICT"), nullable=False)
+    responsavel_id = db.Column(db.Integer, db.ForeignKey('usuarios.id', ondelete="RESTRICT"), nullable=False, index=True)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.now) 
+
+    atleta = db.relationship('Atleta')
+    projeto = db.relationship('Projeto')
+    equipe = db.relationship('Equipe')
+    status = db.relationship('Status')
+    responsavel = db.relationship('Usuario')
     
     def __repr__(self):
         return f'<AtletaHistorico Status:{self.status_id}  (AtletaID:{self.atleta_id})>'
@@ -231,22 +269,145 @@ class Imagem(db.Model):
     __tablename__ = 'imagens' 
 
     id = db.Column(db.Integer, primary_key=True)
-    img = db.Column(db.LargeBinary, nullable=False)
+    img = db.deferred(db.Column(db.LargeBinary, nullable=True)) # Vazio quando o arquivo está no armazenamento externo
     name = db.Column(db.Text, nullable=False)
     mimetype = db.Column(db.Text, nullable=False)
+    hash = db.Column(db.String(64), nullable=True) # SHA-256 do conteúdo (ETag)
+    last_edited = db.Column(db.DateTime, nullable=False, default=datetime.now, onupdate=datetime.now) 
     
     def __repr__(self):
         return f'<Imagem {self.name}>'
+
+class ImagemVariante(db.Model):
+    __tablename__ = 'imagem_variantes'
+    __table_args__ = (
+        db.UniqueConstraint('imagem_id', 'tamanho'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    imagem_id = db.Column(db.Integer, db.ForeignKey('imagens.id', ondelete="CASCADE"), nullable=False)
+    tamanho = db.Column(db.String(10), nullable=False) # thumb, card
+    img = db.deferred(db.Column(db.LargeBinary, nullable=True)) # Vazio quando o arquivo está no armazenamento externo
+    mimetype = db.Column(db.Text, nullable=False)
+    hash = db.Column(db.String(64), nullable=True)
+    largura = db.Column(db.Integer, nullable=False)
+    altura = db.Column(db.Integer, nullable=False)
+
+    def __repr__(self):
+        return f'<ImagemVariante {self.tamanho} (ImagemID:{self.imagem_id})>'
+
+@event.listens_for(Imagem.img, "set")
+@event.listens_for(ImagemVariante.img, "set")
+def atualizar_hash_imagem(target, value, oldvalue, initiator):
+    # Mantém o hash sincronizado com o conteúdo em qualquer escrita
+    target.hash = hashlib.sha256(value).hexdigest() if value is not None else None
     
+# Tamanho máximo do resumo exibido no feed do blog
+RESUMO_MAX = 280
+
+def gerar_resumo(texto, limite=RESUMO_MAX):
+    """Primeiros `limite` caracteres do texto, cortados no fim de uma palavra (com "…")."""
+
+    texto = " ".join((texto or "").split())
+    if len(texto) <= limite:
+        return texto
+
+    corte = texto[:limite - 1].rsplit(" ", 1)[0] or texto[:limite - 1]
+    return corte.rstrip(" ,.;:") + "…"
+
 class BlogPost(db.Model):
     __tablename__ = "blog_posts"
+    __table_args__ = (
+        # Ordem do feed (keyset em created_at, id)
+        db.Index('ix_blog_posts_created_at_id', 'created_at', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    autor_id = db.Column(db.Integer, db.ForeignKey("usuarios.id", ondelete="RESTRICT"), nullable=False)
-    imagem_id = db.Column(db.Integer, db.ForeignKey("imagens.id", ondelete="RESTRICT"), nullable=True)
+    autor_id = db.Column(db.Integer, db.ForeignKey("usuarios.id", ondelete="RESTRICT"), nullable=False, index=True)
+    imagem_id = db.Column(db.Integer, db.ForeignKey("imagens.id", ondelete="RESTRICT"), nullable=True, index=True)
     titulo = db.Column(db.String(150), nullable=False)
     subtitulo = db.Column(db.String(255), nullable=True)
-    texto = db.Column(db.Text, nullable=False)
+    texto = db.deferred(db.Column(db.Text, nullable=False)) # Carregado só quando acessado
+    resumo = db.Column(db.String(300), nullable=False, default="") # Gerado a partir do texto (gerar_resumo)
     link_acao = db.Column(db.String(255), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.now, nullable=False)
-    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now, nullable=False)
\ No newline at end of file
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now, nullable=False)
+
+    autor = db.relationship('Usuario')
+    imagem = db.relationship('Imagem')
+
+@event.listens_for(BlogPost.texto, "set")
+def atualizar_resumo_post(target, value, oldvalue, initiator):
+    # O feed lê só o resumo; ele acompanha o texto em qualquer escrita
+    target.resumo = gerar_resumo(value)
+
+class Estatistica(db.Model):
+    # Contadores dos dashboards, mantidos por estatisticas.py. Tabela derivada
+    # (sem FKs): 0 em projeto_id/equipe_id/status_id significa "todos"
+    __tablename__ = 'estatisticas'
+    __table_args__ = (
+        # Equipes do técnico (painel do técnico)
+        db.Index('ix_estatisticas_equipe_id_status_id', 'equipe_id', 'status_id'),
+    )
+
+    projeto_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    equipe_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    status_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    n_atletas = db.Column(db.Integer, nullable=False, default=0)
+    n_equipes_ativas = db.Column(db.Integer, nullable=False, default=0)
+    n_projetos_ativos = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<Estatistica P:{self.projeto_id} E:{self.equipe_id} S:{self.status_id} (Atletas:{self.n_atletas})>'
+
+class Tarefa(db.Model):
+    # Fila de tarefas em segundo plano (tarefas.py / flask worker)
+    __tablename__ = 'tarefas'
+    __table_args__ = (
+        db.Index('ix_tarefas_status_disponivel_em', 'status', 'disponivel_em'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    tipo = db.Column(db.String(60), nullable=False)
+    parametros = db.Column(db.Text, nullable=False, default="{}") # JSON
+    status = db.Column(db.String(20), nullable=False, default="pendente") # pendente, executando, concluida, falhou
+    tentativas = db.Column(db.Integer, nullable=False, default=0)
+    max_tentativas = db.Column(db.Integer, nullable=False, default=3)
+    disponivel_em = db.Column(db.DateTime, nullable=False, default=datetime.now) # Executando: fim do prazo de visibilidade
+    trabalhador = db.Column(db.String(120), nullable=True, index=True) # Reserva atual (host:pid:token)
+    resultado = db.Column(db.Text, nullable=True) # JSON
+    erro = db.Column(db.Text, nullable=True)
+    criado_por_id = db.Column(db.Integer, db.ForeignKey('usuarios.id', ondelete='SET NULL'), nullable=True, index=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    iniciada_em = db.Column(db.DateTime, nullable=True)
+    concluida_em = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f'<Tarefa {self.tipo} {self.status} (ID:{self.id})>'
+
+def fks_sem_indice(metadata=metadata):
+    """Lista as colunas de chave estrangeira que não são a primeira coluna de nenhum índice.
+
+    O Postgres não cria índices para FKs automaticamente, então toda FK
+    nova precisa de `index=True` ou de um índice composto que comece por ela.
+    """
+
+    faltando = []
+    for tabela in metadata.sorted_tables:
+        # Só conta índices cuja primeira parte é a própria coluna (não uma expressão)
+        colunas_indexadas = {
+            indice.expressions[0].name
+            for indice in tabela.indexes
+            if indice.expressions and isinstance(indice.expressions[0], Column)
+        }
+        colunas_indexadas.update(
+            constraint.columns[0].name
+            for constraint in tabela.constraints
+            if isinstance(constraint, (PrimaryKeyConstraint, UniqueConstraint)) and constraint.columns
+        )
+
+        for fk in tabela.foreign_keys:
+            if fk.parent.name not in colunas_indexadas:
+                faltando.append(f"{tabela.name}.{fk.parent.name}")
+
+    return faltando
@@ -0,0 +1,146 @@
+from dataclasses import dataclass, field
+from referencias import CacheReferencias, registrar_invalidacao
+from models import *
+
+# Perfis ficam pouco tempo em cache: edições de equipe/projeto/tabelas de
+# referência só aparecem no perfil depois do TTL
+TTL_PADRAO = 60
+MAX_PERFIS = 1000
+
+@dataclass(frozen=True)
+class PerfilAtleta:
+    """Dados do perfil do atleta já resolvidos (sem objetos ORM, pode ir para o cache).
+
+    Só dados de exibição: quem pode ver os dados privados é decidido pela
+    rota a cada requisição, nunca a partir do cache.
+    """
+
+    atleta: dict
+    dados_pessoais: dict
+    endereco: dict | None = None
+    historico: list = field(default_factory=list)
+
+cache = CacheReferencias(ttl=TTL_PADRAO, max_itens=MAX_PERFIS)
+
+def init_perfil_atleta(app):
+    cache.ttl = app.config.get("PERFIL_ATLETA_TTL", TTL_PADRAO)
+    cache.invalidar()
+
+def _carregar_perfil(atleta_id):
+    row = (
+        db.session.query(
+            Atleta,
+            Equipe.nome_equipe,
+            Projeto.nome_projeto,
+            Status.nome_status,
+            Modalidade.nome_modalidade,
+            Posicao.nome_posicao,
+            Categoria.nome_categoria,
+            Nivel.nome_nivel,
+            Sexo.sexo,
+            AtletaEndereco,
+            Cidade.nome_cidade,
+            Estado.abreviacao,
+        )
+        .join(Equipe, Equipe.id == Atleta.equipe_id)
+        .join(Projeto, Projeto.id == Equipe.projeto_id)
+        .join(Status, Status.id == Atleta.status_id)
+        .join(Modalidade, Modalidade.id == Atleta.modalidade_id)
+        .join(Posicao, Posicao.id == Atleta.posicao_id)
+        .join(Categoria, Categoria.id == Atleta.categoria_id)
+        .join(Nivel, Nivel.id == Atleta.nivel_id)
+        .join(Sexo, Sexo.id == Atleta.sexo_id)
+        .outerjoin(AtletaEndereco, AtletaEndereco.atleta_id == Atleta.id)
+        .outerjoin(Cidade, Cidade.id == AtletaEndereco.cidade_id)
+        .outerjoin(Estado, Estado.id == Cidade.estado_id)
+        .filter(Atleta.id == atleta_id)
+        .order_by(AtletaEndereco.id)
+        .first()
+    )
+
+    if row is None:
+        return None
+
+    (atleta, nome_equipe, nome_projeto, nome_status, nome_modalidade,
+     nome_posicao, nome_categoria, nome_nivel, nome_sexo, endereco, nome_cidade, abreviacao) = row
+
+    nome_atleta = (f"{atleta.firstname_atleta} {atleta.lastname_atleta}" if atleta.lastname_atleta else atleta.firstname_atleta)
+
+    dados_atleta = {"id":atleta.id, "nome_atleta":nome_atleta.title(), "equipe_id":atleta.equipe_id, "equipe":nome_equipe, "projeto": nome_projeto, "status":nome_status.title(), "modalidade":nome_modalidade.title(), "posicao":nome_posicao.title(), "categoria":nome_categoria.title(), "nivel":nome_nivel.title(), "sexo":nome_sexo.title()}
+
+    # Valores crus; a formatação (CPF, telefone...) fica com a rota
+    dados_pessoais = {
+        "email":atleta.email,
+        "telefone1":atleta.telefone1,
+        "telefone2":atleta.telefone2,
+        "rg":atleta.rg,
+        "cpf":atleta.cpf,
+        "cuca":atleta.registro_cuca,
+        "cbv":atleta.registro_cbv,
+        "data_nascimento":atleta.data_nascimento,
+    }
+
+    dados_endereco = None
+    if endereco:
+        dados_endereco = {"logradouro":endereco.logradouro, "numero":endereco.numero, "complemento":endereco.complemento, "bairro":endereco.bairro, "cidade":nome_cidade, "estado_abreviacao":abreviacao, "cep":endereco.cep}
+
+    # HISTÓRICO (1 QUERY)
+    historico_rows = (
+        db.session.query(
+            AtletaHistorico,
+            Status.nome_status,
+            Projeto.nome_projeto,
+            Equipe.nome_equipe,
+            Usuario.firstname_usuario
+        )
+        .join(Status, Status.id == AtletaHistorico.status_id)
+        .join(Projeto, Projeto.id == AtletaHistorico.projeto_id)
+        .join(Equipe, Equipe.id == AtletaHistorico.equipe_id)
+        .join(Usuario, Usuario.id == AtletaHistorico.responsavel_id)
+        .filter(AtletaHistorico.atleta_id == atleta.id)
+        .order_by(AtletaHistorico.created_at.desc())
+        .all()
+    )
+
+    historico = []
+    for h, status_nome, projeto_nome, equipe_nome, responsavel_nome in historico_rows:
+        historico.append({
+            "status": status_nome.title(),
+            "motivo": h.motivo,
+            "projeto": projeto_nome,
+            "equipe": equipe_nome,
+            "responsavel": responsavel_nome.title(),
+            "created_at": h.created_at.strftime("%d/%m/%Y %H:%M"),
+        })
+
+    return PerfilAtleta(atleta=dados_atleta, dados_pessoais=dados_pessoais, endereco=dados_endereco, historico=historico)
+
+def carregar_perfil_atleta(atleta_id, usar_cache=True):
+    """Perfil completo do atleta em 2 queries (atleta + dimensões + endereço, e histórico).
+
+    Com `usar_cache` o perfil é reaproveitado por até PERFIL_ATLETA_TTL
+    segundos; qualquer alteração commitada no atleta, no endereço ou no
+    histórico descarta a entrada. Retorna None se o atleta não existir.
+    """
+
+    if not usar_cache or not atleta_id:
+        return _carregar_perfil(atleta_id)
+
+    perfil = cache.obter(atleta_id, lambda: _carregar_perfil(atleta_id))
+    if perfil is None:
+        # Não guarda "não encontrado": o atleta pode ser criado logo em seguida
+        cache.invalidar(atleta_id)
+
+    return perfil
+
+# --- Invalidação automática (ver referencias.registrar_invalidacao) ---
+
+def _perfis_afetados(obj):
+    if isinstance(obj, Atleta):
+        return (obj.id,)
+    if isinstance(obj, (AtletaEndereco, AtletaHistorico, Transferencia)):
+        return (obj.atleta_id,)
+    return None
+
+# `marcar_perfis_alterados(session, ids)`: para UPDATE/INSERT em massa, que não passam pelo flush
+marcar_perfis_alterados = registrar_invalidacao(cache, "perfis_alterados", _perfis_afetados)
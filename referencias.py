@@ -0,0 +1,217 @@
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from models import *
+
+# Tempo (segundos) que cada tabela fica em memória antes de ser relida
+TTL_PADRAO = 300
+
+# Tabelas de referência simples: nome -> (model, coluna exibida)
+TABELAS = {
+    "estado": (Estado, Estado.nome_estado),
+    "sexo": (Sexo, Sexo.sexo),
+    "modalidade": (Modalidade, Modalidade.nome_modalidade),
+    "posicao": (Posicao, Posicao.nome_posicao),
+    "categoria": (Categoria, Categoria.nome_categoria),
+    "nivel": (Nivel, Nivel.nome_nivel),
+    "status": (Status, Status.nome_status),
+}
+
+# Tabelas afetadas quando um registro de cada model muda
+# (a lista de cidades inclui a sigla do estado)
+INVALIDA = {
+    Estado: ("estado", "cidade"),
+    Cidade: ("cidade",),
+    Sexo: ("sexo",),
+    Modalidade: ("modalidade",),
+    Posicao: ("posicao",),
+    Categoria: ("categoria",),
+    Nivel: ("nivel",),
+    Status: ("status",),
+}
+
+class CacheReferencias:
+    """Cache em memória (por processo) com TTL, usado para tabelas de
+    referência, perfis de atleta, usuário logado e cartões do blog.
+
+    Cada chave é carregada uma vez e reaproveitada até expirar o TTL ou ser
+    invalidada por uma alteração commitada (ver `registrar_invalidacao`). O
+    TTL limita quanto tempo outros processos/workers ficam desatualizados.
+
+    Com `max_itens`, descarta a entrada usada há mais tempo (LRU).
+    `carregar()` roda fora do lock do cache, com uma trava por chave: um miss
+    lento (query, renderização) só segura quem pede a mesma chave.
+    """
+
+    def __init__(self, ttl=TTL_PADRAO, max_itens=None):
+        self.ttl = ttl
+        self.max_itens = max_itens
+        self._dados = OrderedDict()
+        self._travas = {}
+        self._geracao = 0
+        self._lock = threading.Lock()
+
+    def _valida(self, chave):
+        entrada = self._dados.get(chave)
+        if entrada and time.monotonic() - entrada[0] < self.ttl:
+            return entrada
+        return None
+
+    def obter(self, chave, carregar):
+        entrada = self._valida(chave)
+        if entrada:
+            if self.max_itens:
+                try:
+                    self._dados.move_to_end(chave)
+                except KeyError:  # descartada por outra thread
+                    pass
+            return entrada[1]
+
+        with self._lock:
+            trava = self._travas.setdefault(chave, threading.Lock())
+
+        with trava:
+            entrada = self._valida(chave)
+            if entrada:
+                return entrada[1]
+
+            geracao = self._geracao
+            valor = carregar()
+
+            with self._lock:
+                self._travas.pop(chave, None)
+
+                # Invalidado durante a carga: o valor pode ser anterior ao commit
+                if geracao != self._geracao:
+                    return valor
+
+                self._dados.pop(chave, None)
+                self._dados[chave] = (time.monotonic(), valor)
+
+                # Descarta as entradas usadas há mais tempo além do limite
+                while self.max_itens and len(self._dados) > self.max_itens:
+                    self._dados.popitem(last=False)
+
+            return valor
+
+    def invalidar(self, *chaves):
+        """Descarta as chaves informadas (ou todas, sem argumentos)."""
+        with self._lock:
+            self._geracao += 1
+            if not chaves:
+                self._dados.clear()
+            for chave in chaves:
+                self._dados.pop(chave, None)
+
+cache = CacheReferencias()
+
+def init_referencias(app):
+    cache.ttl = app.config.get("REFERENCIAS_TTL", TTL_PADRAO)
+    cache.invalidar()
+
+def _carregar_tabela(tabela):
+    model, coluna = TABELAS[tabela]
+    return dict(db.session.query(model.id, coluna).order_by(model.id).all())
+
+def _carregar_cidades():
+    rows = (
+        db.session.query(Cidade.id, Cidade.nome_cidade, Estado.abreviacao)
+        .join(Estado, Estado.id == Cidade.estado_id)
+        .order_by(Cidade.id)
+        .all()
+    )
+    return {cidade_id: (nome_cidade, abreviacao) for cidade_id, nome_cidade, abreviacao in rows}
+
+def _obter(chave, carregar, incluir=None):
+    # `incluir` fora do cache: o registro pode ter sido criado em outro
+    # processo dentro do TTL, então a tabela é relida antes de desistir
+    valores = cache.obter(chave, carregar)
+    if incluir and incluir not in valores:
+        cache.invalidar(chave)
+        valores = cache.obter(chave, carregar)
+    return valores
+
+def nomes(tabela, incluir=None, usar_cache=True):
+    """Mapa {id: nome} de uma tabela de referência (compartilhado: não altere).
+
+    Com `incluir` (ex.: o id enviado em um formulário) a tabela é relida se
+    o id não estiver no cache. `usar_cache=False` lê direto do banco.
+    """
+    if not usar_cache:
+        return _carregar_tabela(tabela)
+    return _obter(tabela, lambda: _carregar_tabela(tabela), incluir)
+
+def nome(tabela, registro_id):
+    """Nome de um registro de referência (None se não existir)."""
+    return nomes(tabela, incluir=registro_id).get(registro_id)
+
+def choices(tabela, placeholder=None, incluir=None):
+    """Lista pronta para `SelectField.choices`, com opção inicial (id 0) opcional.
+
+    Passe em `incluir` o valor atual do campo para que um id criado em outro
+    processo não seja recusado pela validação.
+    """
+    opcoes = [(item_id, item_nome.title()) for item_id, item_nome in nomes(tabela, incluir).items()]
+    if placeholder is not None:
+        opcoes.insert(0, (0, placeholder))
+    return opcoes
+
+def cidades(incluir=None, usar_cache=True):
+    """Mapa {id: (nome_cidade, abreviacao do estado)}, em ordem de id (mesmas opções de `nomes`)."""
+    if not usar_cache:
+        return _carregar_cidades()
+    return _obter("cidade", _carregar_cidades, incluir)
+
+def cidade(cidade_id):
+    """(nome_cidade, abreviacao do estado) de uma cidade (None se não existir)."""
+    return cidades(incluir=cidade_id).get(cidade_id)
+
+def choices_cidades(placeholder=None, incluir=None):
+    """Choices "Cidade - UF" em ordem alfabética, com opção inicial opcional (`incluir` como em `choices`)."""
+    opcoes = [
+        (cidade_id, f"{nome_cidade.title()} - {abreviacao}")
+        for cidade_id, (nome_cidade, abreviacao) in sorted(cidades(incluir).items(), key=lambda item: item[1][0])
+    ]
+    if placeholder is not None:
+        opcoes.insert(0, (0, placeholder))
+    return opcoes
+
+# --- Invalidação automática ---
+# As chaves alteradas são anotadas no flush e só descartadas no commit; assim
+# outra requisição não recarrega o valor antigo entre o flush e o commit.
+
+def registrar_invalidacao(cache, chave_info, seletor):
+    """Descarta do `cache`, a cada commit, as chaves dos objetos alterados.
+
+    `seletor(obj)` recebe cada objeto novo/alterado/excluído no flush e
+    devolve as chaves afetadas (ou None). As chaves ficam em
+    `session.info[chave_info]` até o commit e são esquecidas no rollback.
+    Retorna `marcar(session, chaves)`, para alterações que não passam pelo
+    flush (UPDATE/INSERT em massa).
+    """
+
+    def marcar(session, chaves):
+        session.info.setdefault(chave_info, set()).update(chaves)
+
+    @event.listens_for(Session, "after_flush")
+    def _registrar_alteracoes(session, flush_context):
+        for obj in (*session.new, *session.dirty, *session.deleted):
+            chaves = seletor(obj)
+            if chaves:
+                marcar(session, chaves)
+
+    @event.listens_for(Session, "after_commit")
+    def _invalidar_alteracoes(session):
+        chaves = session.info.pop(chave_info, None)
+        if chaves:
+            cache.invalidar(*chaves)
+
+    @event.listens_for(Session, "after_rollback")
+    def _descartar_alteracoes(session):
+        session.info.pop(chave_info, None)
+
+    return marcar
+
+registrar_invalidacao(cache, "referencias_alteradas", lambda obj: INVALIDA.get(type(obj)))
@@ -0,0 +1,241 @@
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import time
+import traceback
+import uuid
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import and_, select, update
+from models import *
+
+PENDENTE = "pendente"
+EXECUTANDO = "executando"
+CONCLUIDA = "concluida"
+FALHOU = "falhou"
+
+TENTATIVAS_PADRAO = 3
+# Segundos que uma tarefa reservada fica invisível; se o worker morrer, ela volta para a fila
+VISIBILIDADE_PADRAO = 300
+# Espera antes de tentar de novo: ESPERA_BASE, 2x, 4x...
+ESPERA_BASE = 30
+# Segundos entre consultas quando a fila está vazia
+INTERVALO_PADRAO = 2.0
+MAX_ERRO = 4000
+
+# nome -> (função, tentativas)
+_registro = {}
+
+def tarefa(nome, tentativas=TENTATIVAS_PADRAO):
+    """Registra a função como tarefa `nome`. Ela recebe os parâmetros do
+    `enfileirar` e roda dentro do app context do worker; o retorno (JSON)
+    vira o resultado. Pode rodar mais de uma vez (retry ou visibilidade
+    esgotada), então deve ser idempotente.
+    """
+
+    def registrar(funcao):
+        _registro[nome] = (funcao, tentativas)
+        return funcao
+
+    return registrar
+
+def enfileirar(nome, criado_por_id=None, atraso=0, **parametros):
+    """Adiciona a tarefa na sessão atual; ela entra na fila com o commit de quem chama.
+
+    Assim a tarefa só existe se a transação que a pediu for confirmada.
+    """
+
+    if nome not in _registro:
+        raise ValueError(f"Tarefa desconhecida: {nome}")
+
+    _, tentativas = _registro[nome]
+    nova = Tarefa(
+        tipo=nome,
+        parametros=json.dumps(parametros),
+        max_tentativas=tentativas,
+        disponivel_em=datetime.now() + timedelta(seconds=atraso),
+        criado_por_id=criado_por_id,
+    )
+    db.session.add(nova)
+    return nova
+
+def situacao_tarefa(registro):
+    """Dicionário público da tarefa (endpoint de status)."""
+
+    erro = registro.erro.strip().splitlines()[-1] if registro.erro else None
+
+    return {
+        "id": registro.id,
+        "tipo": registro.tipo,
+        "status": registro.status,
+        "tentativas": registro.tentativas,
+        "max_tentativas": registro.max_tentativas,
+        "resultado": json.loads(registro.resultado) if registro.resultado else None,
+        "erro": erro,
+        "created_at": registro.created_at.isoformat(),
+        "concluida_em": registro.concluida_em.isoformat() if registro.concluida_em else None,
+    }
+
+# --- Fila ---
+
+def _disponiveis(agora):
+    # Pendentes no horário, ou reservadas cujo prazo de visibilidade acabou
+    return and_(
+        Tarefa.status.in_((PENDENTE, EXECUTANDO)),
+        Tarefa.disponivel_em <= agora,
+        Tarefa.tentativas < Tarefa.max_tentativas,
+    )
+
+def reservar(trabalhador, visibilidade=VISIBILIDADE_PADRAO):
+    """Reserva a próxima tarefa disponível para `trabalhador` (ou None).
+
+    A reserva é um único UPDATE (atômico no SQLite; no Postgres o SKIP
+    LOCKED evita que dois workers disputem a mesma linha), feito só quando
+    um SELECT encontra algo disponível. O token gravado em `trabalhador`
+    identifica a reserva sem depender de RETURNING.
+    """
+
+    agora = datetime.now()
+
+    # Fila ociosa: um SELECT simples basta, sem tomar o lock de escrita (SQLite) a cada consulta
+    pendente = db.session.execute(
+        select(Tarefa.id)
+        .where(Tarefa.status.in_((PENDENTE, EXECUTANDO)), Tarefa.disponivel_em <= agora)
+        .limit(1)
+    ).first()
+    if pendente is None:
+        db.session.rollback()
+        return None
+
+    # Estourou o prazo sem tentativas sobrando: falha de vez
+    db.session.execute(
+        update(Tarefa)
+        .where(Tarefa.status == EXECUTANDO, Tarefa.disponivel_em <= agora, Tarefa.tentativas >= Tarefa.max_tentativas)
+        .values(status=FALHOU, erro="Tempo de execução esgotado.", concluida_em=agora),
+        execution_options={"synchronize_session": False},
+    )
+
+    token = f"{trabalhador}:{uuid.uuid4().hex[:8]}"
+    proxima = (
+        select(Tarefa.id)
+        .where(_disponiveis(agora))
+        .order_by(Tarefa.disponivel_em, Tarefa.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+
+    db.session.execute(
+        update(Tarefa)
+        .where(Tarefa.id == proxima, _disponiveis(agora))
+        .values(
+            status=EXECUTANDO,
+            tentativas=Tarefa.tentativas + 1,
+            disponivel_em=agora + timedelta(seconds=visibilidade),
+            trabalhador=token,
+            iniciada_em=agora,
+        ),
+        execution_options={"synchronize_session": False},
+    )
+    db.session.commit()
+
+    return db.session.execute(select(Tarefa).where(Tarefa.trabalhador == token)).scalar()
+
+def _finalizar(tarefa_id, token, **valores):
+    # Só grava se a reserva ainda for deste worker (o prazo pode ter expirado)
+    db.session.execute(
+        update(Tarefa).where(Tarefa.id == tarefa_id, Tarefa.trabalhador == token).values(**valores),
+        execution_options={"synchronize_session": False},
+    )
+    db.session.commit()
+
+def executar(reservada):
+    """Roda uma tarefa reservada e registra o resultado, o retry ou a falha."""
+
+    tarefa_id, tipo, token = reservada.id, reservada.tipo, reservada.trabalhador
+    tentativas, max_tentativas = reservada.tentativas, reservada.max_tentativas
+    parametros = json.loads(reservada.parametros or "{}")
+
+    try:
+        if tipo not in _registro:
+            raise LookupError(f"Tarefa desconhecida: {tipo}")
+
+        funcao, _ = _registro[tipo]
+        resultado = funcao(**parametros)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        current_app.logger.exception("Tarefa %s (%s) falhou na tentativa %s", tarefa_id, tipo, tentativas)
+
+        erro = traceback.format_exc()[-MAX_ERRO:]
+        if tentativas >= max_tentativas:
+            _finalizar(tarefa_id, token, status=FALHOU, erro=erro, trabalhador=None, concluida_em=datetime.now())
+        else:
+            espera = ESPERA_BASE * 2 ** (tentativas - 1)
+            _finalizar(tarefa_id, token, status=PENDENTE, erro=erro, trabalhador=None, disponivel_em=datetime.now() + timedelta(seconds=espera))
+        return False
+
+    _finalizar(tarefa_id, token, status=CONCLUIDA, resultado=json.dumps(resultado), erro=None, trabalhador=None, concluida_em=datetime.now())
+    return True
+
+# --- Worker ---
+
+def _laco(app, intervalo, visibilidade, ate_esvaziar):
+    parar = []
+
+    # Termina a tarefa atual antes de sair
+    def pedir_parada(*_):
+        parar.append(True)
+
+    signal.signal(signal.SIGTERM, pedir_parada)
+    signal.signal(signal.SIGINT, pedir_parada)
+
+    nome = f"{socket.gethostname()}:{os.getpid()}"
+
+    with app.app_context():
+        # Processo filho (fork) não pode reaproveitar conexões do pai
+        db.engine.dispose(close=False)
+
+    while not parar:
+        # Um app context por tarefa: sessão e `g` limpos a cada execução
+        with app.app_context():
+            reservada = reservar(nome, visibilidade)
+            if reservada is not None:
+                executar(reservada)
+                continue
+
+        if ate_esvaziar:
+            break
+        time.sleep(intervalo)
+
+def trabalhar(app, processos=1, intervalo=INTERVALO_PADRAO, visibilidade=VISIBILIDADE_PADRAO, ate_esvaziar=False):
+    """Processa a fila em `processos` workers até receber SIGTERM/SIGINT.
+
+    Com `ate_esvaziar` cada worker sai quando não houver tarefa disponível.
+    """
+
+    if processos <= 1:
+        _laco(app, intervalo, visibilidade, ate_esvaziar)
+        return
+
+    contexto = multiprocessing.get_context("fork")
+    filhos = [
+        contexto.Process(target=_laco, args=(app, intervalo, visibilidade, ate_esvaziar), name=f"worker-{numero}")
+        for numero in range(processos)
+    ]
+
+    for filho in filhos:
+        filho.start()
+
+    def repassar(sinal, _):
+        for filho in filhos:
+            if filho.is_alive():
+                os.kill(filho.pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, repassar)
+    signal.signal(signal.SIGINT, repassar)
+
+    for filho in filhos:
+        filho.join()
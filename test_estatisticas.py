@@ -0,0 +1,98 @@
+from datetime import date
+from sqlalchemy import select
+from werkzeug.security import generate_password_hash
+from models import *
+from estatisticas import reconstruir
+import estatisticas
+
+def _tabela():
+    colunas = Estatistica.__table__.c
+    rows = db.session.execute(select(
+        colunas.projeto_id, colunas.equipe_id, colunas.status_id,
+        colunas.n_atletas, colunas.n_equipes_ativas, colunas.n_projetos_ativos,
+    )).all()
+    # Linhas zeradas equivalem a linhas ausentes
+    return {tuple(row[:3]): tuple(row[3:]) for row in rows if any(row[3:])}
+
+def _cenario():
+    estado = Estado(nome_estado="SAO PAULO", abreviacao="SP")
+    db.session.add(estado)
+    db.session.flush()
+    cidade = Cidade(nome_cidade="CAMPINAS", estado_id=estado.id)
+    usuario = Usuario(firstname_usuario="ADM", lastname_usuario="A", email="a@a.com", password=generate_password_hash("x"), telefone1="1", is_admin=True)
+    db.session.add_all([cidade, usuario, Sexo(sexo="MASCULINO"), Modalidade(nome_modalidade="QUADRA"), Posicao(nome_posicao="LIBERO"), Categoria(nome_categoria="SUB-15"), Nivel(nome_nivel="INICIANTE")])
+    db.session.add_all([Status(nome_status=nome) for nome in ("ATIVO", "LESIONADO", "SUSPENSO")])
+    db.session.flush()
+
+    projetos = [Projeto(nome_projeto=f"PROJETO {i}", cidade_id=cidade.id, responsavel_id=usuario.id) for i in range(2)]
+    db.session.add_all(projetos)
+    db.session.flush()
+    equipes = [Equipe(nome_equipe=f"EQUIPE {i}", projeto_id=projetos[i % 2].id, tecnico_id=usuario.id) for i in range(3)]
+    db.session.add_all(equipes)
+    db.session.flush()
+    return projetos, equipes
+
+def _atleta(numero, equipe, status_id=1):
+    return Atleta(
+        equipe=equipe, firstname_atleta=f"ATLETA{numero}", rg=str(numero), cpf=str(numero),
+        data_nascimento=date(2010, 1, 1), telefone1="1", sexo_id=1, modalidade_id=1,
+        posicao_id=1, categoria_id=1, nivel_id=1, status_id=status_id,
+    )
+
+def test_atualizacao_incremental_bate_com_reconstruir(app):
+    projetos, equipes = _cenario()
+    atletas = [_atleta(i, equipes[i % 3], status_id=1 + i % 3) for i in range(9)]
+    db.session.add_all(atletas)
+    db.session.commit()
+
+    # Edição que não mexe nos contadores
+    atletas[0].telefone1 = "2"
+    # Troca de status e transferência (pela FK e pelo relacionamento, com o objeto expirado)
+    atletas[1].status_id = 3
+    db.session.expire(atletas[2])
+    atletas[2].equipe = equipes[0]
+    atletas[3].equipe_id = equipes[2].id
+    db.session.commit()
+
+    # Equipe muda de projeto; outra é desativada; um projeto é desativado
+    equipes[1].projeto_id = projetos[1].id
+    equipes[2].is_active = False
+    projetos[0].is_active = False
+    db.session.commit()
+
+    # Exclusões e um atleta novo no mesmo flush
+    db.session.delete(atletas[4])
+    db.session.add(_atleta(99, equipes[1], status_id=2))
+    db.session.commit()
+
+    # Equipe excluída junto com os atletas dela
+    for atleta in Atleta.query.filter_by(equipe_id=equipes[2].id).all():
+        db.session.delete(atleta)
+    db.session.delete(equipes[2])
+    db.session.commit()
+
+    incremental = _tabela()
+    reconstruir()
+    db.session.commit()
+
+    assert incremental == _tabela()
+
+def test_edicao_sem_contadores_nao_consulta_valores(app, monkeypatch):
+    _, equipes = _cenario()
+    atleta = _atleta(1, equipes[0])
+    db.session.add(atleta)
+    db.session.commit()
+
+    leituras = []
+    ler_valores = estatisticas._ler_valores
+    monkeypatch.setattr(estatisticas, "_ler_valores", lambda conexao, ids: leituras.append(ids) or ler_valores(conexao, ids))
+
+    # Telefone/nome não mexem nos contadores: nem SELECT dos valores nem escrita em `estatisticas`
+    atleta.telefone1 = "2"
+    equipes[0].nome_equipe = "OUTRO NOME"
+    db.session.commit()
+    assert leituras == []
+
+    atleta.status_id = 2
+    db.session.commit()
+    assert len(leituras) == 2
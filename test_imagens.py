@@ -0,0 +1,44 @@
+import io
+import pytest
+from werkzeug.datastructures import FileStorage
+from models import *
+from imagens import TAMANHOS_VARIANTES, processar_imagem, salvar_imagem
+
+Image = pytest.importorskip("PIL.Image")
+
+def _foto_com_gps():
+    exif = Image.Exif()
+    exif[0x8825] = {1: "S", 2: (23.0, 32.0, 0.0)}  # GPSInfo
+    saida = io.BytesIO()
+    Image.new("RGB", (2400, 1200), (200, 80, 40)).save(saida, format="JPEG", exif=exif)
+    return saida.getvalue()
+
+def test_segundo_plano_grava_original_sem_exif(app):
+    app.config["IMAGENS_EM_SEGUNDO_PLANO"] = True
+    try:
+        imagem = salvar_imagem(FileStorage(io.BytesIO(_foto_com_gps()), filename="foto.jpg", content_type="image/jpeg"))
+        db.session.commit()
+    finally:
+        app.config["IMAGENS_EM_SEGUNDO_PLANO"] = False
+
+    # Antes do worker rodar o original já é público: tem que estar normalizado
+    gravada = Image.open(io.BytesIO(imagem.img))
+    assert not gravada.getexif()
+    assert max(gravada.size) <= 1600
+    assert ImagemVariante.query.filter_by(imagem_id=imagem.id).count() == 0
+    assert Tarefa.query.filter_by(tipo="processar_imagem").count() == 1
+
+    # Variante pendente cai no original, que não pode ficar em cache com a URL da variante
+    resposta = app.test_client().get(f"/imagens/{imagem.id}?tamanho=card&v={imagem.hash}")
+    assert resposta.status_code == 200
+    assert not resposta.cache_control.immutable
+
+    versao = imagem.hash
+    assert processar_imagem(imagem.id) == {"variantes": len(TAMANHOS_VARIANTES)}
+    db.session.commit()
+
+    # O worker só acrescenta as variantes; o original (e a URL versionada) não muda
+    assert imagem.hash == versao
+    assert ImagemVariante.query.filter_by(imagem_id=imagem.id).count() == len(TAMANHOS_VARIANTES)
+    resposta = app.test_client().get(f"/imagens/{imagem.id}?tamanho=card&v={imagem.hash}")
+    assert resposta.cache_control.immutable
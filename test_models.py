@@ -0,0 +1,33 @@
+from sqlalchemy import Column, ForeignKey, Index, Integer, MetaData, String, Table, func
+from models import fks_sem_indice
+
+def test_todas_as_fks_tem_indice():
+    # Uma FK nova sem index=True (ou índice composto começando por ela) quebra este teste
+    assert fks_sem_indice() == []
+
+def test_fks_sem_indice_aponta_coluna_faltando():
+    metadata = MetaData()
+    Table("pais", metadata, Column("id", Integer, primary_key=True))
+    Table(
+        "filhos", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("pai_id", Integer, ForeignKey("pais.id")),
+        Column("outro_pai_id", Integer, ForeignKey("pais.id"), index=True),
+    )
+
+    assert fks_sem_indice(metadata) == ["filhos.pai_id"]
+
+def test_fks_sem_indice_ignora_indice_comecando_por_expressao():
+    metadata = MetaData()
+    Table("pais", metadata, Column("id", Integer, primary_key=True))
+    filhos = Table(
+        "filhos", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("nome", String),
+        Column("pai_id", Integer, ForeignKey("pais.id")),
+    )
+    # (coalesce(nome, ''), pai_id) não serve para a FK; índice só de expressão também não
+    Index("ix_filhos_nome_pai", func.coalesce(filhos.c.nome, ""), filhos.c.pai_id)
+    Index("ix_filhos_lower_nome", func.lower(filhos.c.nome))
+
+    assert fks_sem_indice(metadata) == ["filhos.pai_id"]
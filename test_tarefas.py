@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from models import *
+from tarefas import CONCLUIDA, EXECUTANDO, FALHOU, PENDENTE, _finalizar, enfileirar, executar, reservar, tarefa
+
+@tarefa("teste_ok")
+def tarefa_ok(valor):
+    return {"dobro": valor * 2}
+
+@tarefa("teste_falha", tentativas=2)
+def tarefa_falha():
+    raise RuntimeError("quebrou")
+
+def _criar(nome, **parametros):
+    registro = enfileirar(nome, **parametros)
+    db.session.commit()
+    return registro.id
+
+def _liberar(tarefa_id):
+    # Simula a passagem do tempo (backoff ou prazo de visibilidade)
+    db.session.execute(db.update(Tarefa).where(Tarefa.id == tarefa_id).values(disponivel_em=datetime.now() - timedelta(seconds=1)))
+    db.session.commit()
+
+def test_reserva_executa_e_conclui(app):
+    tarefa_id = _criar("teste_ok", valor=21)
+
+    reservada = reservar("w1")
+    assert reservada.id == tarefa_id
+    assert reservada.status == EXECUTANDO
+    assert reservada.tentativas == 1
+
+    # Já reservada: outro worker não pega a mesma tarefa
+    assert reservar("w2") is None
+
+    assert executar(reservada) is True
+    registro = db.session.get(Tarefa, tarefa_id)
+    assert registro.status == CONCLUIDA
+    assert registro.resultado == '{"dobro": 42}'
+    assert registro.trabalhador is None
+
+def test_falha_volta_para_fila_e_esgota_tentativas(app):
+    tarefa_id = _criar("teste_falha")
+
+    assert executar(reservar("w1")) is False
+    registro = db.session.get(Tarefa, tarefa_id)
+    assert registro.status == PENDENTE
+    assert "quebrou" in registro.erro
+    assert registro.disponivel_em > datetime.now()
+
+    # Espera do retry ainda não passou
+    assert reservar("w1") is None
+
+    _liberar(tarefa_id)
+    reservada = reservar("w1")
+    assert reservada.tentativas == 2
+    assert executar(reservada) is False
+
+    db.session.expire_all()
+    registro = db.session.get(Tarefa, tarefa_id)
+    assert registro.status == FALHOU
+    assert registro.concluida_em is not None
+
+def test_visibilidade_esgotada_devolve_tarefa(app):
+    tarefa_id = _criar("teste_ok", valor=1)
+
+    token_perdido = reservar("w1").trabalhador
+    # O worker w1 "morre": o prazo de visibilidade acaba e outro worker reserva
+    _liberar(tarefa_id)
+    reservada = reservar("w2")
+    assert reservada.id == tarefa_id
+    assert reservada.tentativas == 2
+    assert reservada.trabalhador != token_perdido
+
+    assert executar(reservada) is True
+
+    # w1 volta depois do prazo: a reserva antiga não sobrescreve o resultado de w2
+    _finalizar(tarefa_id, token_perdido, status=FALHOU, erro="tarde demais")
+    db.session.expire_all()
+    registro = db.session.get(Tarefa, tarefa_id)
+    assert registro.status == CONCLUIDA
+    assert registro.erro is None
+
+def test_fila_vazia_nao_escreve(app):
+    escritas = []
+
+    def registrar(conn, cursor, statement, *args):
+        if not statement.lstrip().upper().startswith("SELECT"):
+            escritas.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", registrar)
+    try:
+        assert reservar("w1") is None
+    finally:
+        event.remove(db.engine, "before_cursor_execute", registrar)
+
+    assert escritas == []
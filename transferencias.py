@@ -0,0 +1,92 @@
+from dataclasses import dataclass
+from sqlalchemy import insert, select, update
+from estatisticas import Deltas, aplicar_deltas
+from perfil_atleta import marcar_perfis_alterados
+from models import *
+
+# Mesmo motivo usado na transferência individual (editar_atleta)
+MOTIVO_TRANSFERENCIA = "Transferência de equipe"
+
+@dataclass(frozen=True)
+class ResultadoTransferencia:
+    """Quantos atletas mudaram de equipe e quantos já estavam no destino."""
+
+    transferidos: int = 0
+    ja_no_destino: int = 0
+
+def transferir_atletas(atleta_ids, equipe_destino_id, escopo, responsavel_id, somente_mesmo_projeto=False):
+    """Transfere vários atletas para `equipe_destino_id` em uma única transação.
+
+    Gera uma Transferencia e um AtletaHistorico por atleta, como a edição
+    individual, mas com um UPDATE e INSERTs em lote. Todos os atletas precisam
+    estar em equipes do `escopo`; com `somente_mesmo_projeto` (técnico) o
+    destino tem que ser do mesmo projeto de cada atleta. Qualquer problema
+    levanta ValueError antes de alterar o banco. O commit fica com quem chama.
+    """
+
+    atleta_ids = set(atleta_ids)
+    if not atleta_ids:
+        raise ValueError("Selecione ao menos um atleta.")
+
+    projeto_destino_id = db.session.execute(
+        select(Equipe.projeto_id).where(Equipe.id == equipe_destino_id)
+    ).scalar()
+    if projeto_destino_id is None:
+        raise ValueError("Equipe de destino não encontrada.")
+
+    # Estado atual dos atletas (travado até o commit nos bancos que suportam)
+    atletas = db.session.execute(
+        select(Atleta.id, Atleta.equipe_id, Atleta.status_id, Equipe.projeto_id)
+        .join(Equipe, Equipe.id == Atleta.equipe_id)
+        .where(Atleta.id.in_(sorted(atleta_ids)))
+        .with_for_update(of=Atleta)
+    ).all()
+
+    if len(atletas) != len(atleta_ids) or not all(escopo.pode_gerenciar_equipe(equipe_id) for _, equipe_id, _, _ in atletas):
+        raise ValueError("Há atletas inexistentes ou fora das suas equipes.")
+
+    if somente_mesmo_projeto and any(projeto_id != projeto_destino_id for _, _, _, projeto_id in atletas):
+        raise ValueError("A equipe de destino precisa ser do mesmo projeto dos atletas.")
+
+    mover = [atleta for atleta in atletas if atleta.equipe_id != equipe_destino_id]
+    if not mover:
+        return ResultadoTransferencia(ja_no_destino=len(atletas))
+
+    ids = [atleta.id for atleta in mover]
+    db.session.execute(
+        update(Atleta).where(Atleta.id.in_(ids)).values(equipe_id=equipe_destino_id),
+        execution_options={"synchronize_session": "fetch"},
+    )
+
+    transferencias = []
+    historicos = []
+    deltas = Deltas()
+
+    for atleta_id, equipe_origem_id, status_id, projeto_origem_id in mover:
+        transferencias.append({
+            "atleta_id": atleta_id,
+            "equipe_origem_id": equipe_origem_id,
+            "equipe_destino_id": equipe_destino_id,
+            "projeto_origem_id": projeto_origem_id,
+            "projeto_destino_id": projeto_destino_id,
+            "responsavel_id": responsavel_id,
+        })
+        historicos.append({
+            "atleta_id": atleta_id,
+            "projeto_id": projeto_destino_id,
+            "equipe_id": equipe_destino_id,
+            "status_id": status_id,
+            "motivo": MOTIVO_TRANSFERENCIA,
+            "responsavel_id": responsavel_id,
+        })
+        deltas.atletas(projeto_origem_id, equipe_origem_id, status_id, -1)
+        deltas.atletas(projeto_destino_id, equipe_destino_id, status_id)
+
+    db.session.execute(insert(Transferencia), transferencias)
+    db.session.execute(insert(AtletaHistorico), historicos)
+
+    # UPDATE/INSERT em massa não passam pelo flush: contadores e cache aqui
+    aplicar_deltas(db.session.connection(), deltas)
+    marcar_perfis_alterados(db.session, ids)
+
+    return ResultadoTransferencia(transferidos=len(mover), ja_no_destino=len(atletas) - len(mover))
@@ -0,0 +1,65 @@
+from dataclasses import dataclass
+from flask_login import UserMixin
+from referencias import CacheReferencias, registrar_invalidacao
+from models import *
+
+# O principal de cada usuário (com os papéis) fica em memória por pouco tempo.
+# Alterações commitadas em `usuarios` descartam a entrada na hora, mas só no
+# processo que fez o commit: nos outros workers (gunicorn, `flask worker`) um
+# papel removido ou um usuário excluído continua valendo por até o TTL
+TTL_PADRAO = 30
+MAX_USUARIOS = 1000
+
+@dataclass(frozen=True)
+class UsuarioLogado(UserMixin):
+    """Dados do usuário autenticado usados pelas rotas (sem objeto ORM, pode ir para o cache)."""
+
+    id: int
+    firstname_usuario: str
+    lastname_usuario: str
+    email: str
+    is_admin: bool = False
+    is_coord: bool = False
+    is_tecnico: bool = False
+
+cache = CacheReferencias(ttl=TTL_PADRAO, max_itens=MAX_USUARIOS)
+
+def init_usuario_logado(app):
+    cache.ttl = app.config.get("USUARIO_LOGADO_TTL", TTL_PADRAO)
+    cache.invalidar()
+
+def _carregar_usuario(usuario_id):
+    row = (
+        db.session.query(
+            Usuario.id,
+            Usuario.firstname_usuario,
+            Usuario.lastname_usuario,
+            Usuario.email,
+            Usuario.is_admin,
+            Usuario.is_coord,
+            Usuario.is_tecnico,
+        )
+        .filter(Usuario.id == usuario_id)
+        .first()
+    )
+
+    if row is None:
+        return None
+
+    return UsuarioLogado(row.id, row.firstname_usuario, row.lastname_usuario, row.email, bool(row.is_admin), bool(row.is_coord), bool(row.is_tecnico))
+
+def carregar_usuario_logado(usuario_id):
+    """Principal do usuário para o `user_loader` (None se o usuário não existir mais).
+
+    Checar papéis não vai ao banco enquanto a entrada estiver no cache; ver
+    TTL_PADRAO para a janela de desatualização entre processos.
+    """
+
+    usuario = cache.obter(usuario_id, lambda: _carregar_usuario(usuario_id))
+    if usuario is None:
+        cache.invalidar(usuario_id)
+
+    return usuario
+
+# Alterações commitadas em `usuarios` descartam a entrada (neste processo)
+registrar_invalidacao(cache, "usuarios_alterados", lambda obj: (obj.id,) if isinstance(obj, Usuario) else None)